@@ -1,16 +1,262 @@
-from fastapi import FastAPI, Response, BackgroundTasks, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Response, BackgroundTasks, Request, Query
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
+from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import hashlib
+import io
 import logging
-from contextlib import asynccontextmanager
-from hdhomerun_epg import HDHomeRunClient, XMLTVGenerator, settings
-import uvicorn
+import os
+import tempfile
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from hdhomerun_epg import settings, profiling
+from hdhomerun_epg.admission import AdmissionGate, LastKnownGood
+from hdhomerun_epg.filters import EPGFilter
+from hdhomerun_epg.render_cache import FileRenderCache, RenderCache
+from typing import Optional, Tuple
 import time
 
 # Setup Logging
 logger = logging.getLogger("uvicorn")
 
 
+def run_cache_maintenance():
+    """Apply cache retention/eviction and reclaim free pages."""
+    from hdhomerun_epg.cache import CacheManager
+
+    cache = CacheManager.from_settings(settings)
+    return cache.run_maintenance(
+        retention_seconds=settings.cache_retention_seconds,
+        max_bytes=settings.cache_max_bytes,
+        policy=settings.cache_eviction_policy,
+        vacuum_pages=settings.cache_vacuum_pages,
+    )
+
+
+def import_startup_snapshot():
+    """Warm the cache from the configured snapshot before serving requests."""
+    from hdhomerun_epg.cache import CacheManager
+    from hdhomerun_epg.snapshot import load_snapshot
+
+    try:
+        load_snapshot(CacheManager.from_settings(settings), settings.snapshot_source)
+    except Exception as e:
+        logger.error(f"🚨 Importing snapshot {settings.snapshot_source} failed: {e}")
+
+
+def export_snapshot_file():
+    from hdhomerun_epg.cache import CacheManager
+    from hdhomerun_epg.snapshot import save_snapshot
+
+    save_snapshot(CacheManager.from_settings(settings), settings.snapshot_export_path)
+
+
+def push_epg():
+    """
+    Push the default epg.xml to the configured sinks if its content changed.
+    A guide that is not fully cached is fetched first. If that fetch was
+    cut short (the fill is running elsewhere, or fetches were deferred by
+    the rate limiter), the partial document is not pushed.
+    """
+    from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+    from hdhomerun_epg.delivery import get_publisher
+
+    cache = CacheManager.from_settings(settings)
+    start_times = plan_chunk_starts(settings.epg_days, settings.epg_hours)
+    if cache.get_signature(start_times, settings.cache_ttl_seconds) is None:
+        fill_epg_horizon()
+
+    response = build_epg(
+        EPGFilter(), image_proxy_url=settings.image_proxy_base_url or None
+    )
+    if response.status_code != 200 or "x-epg-fallback" in response.headers:
+        logger.warning(f"⚠️ Not pushing epg.xml (HTTP {response.status_code})")
+        return None
+    if response.headers.get("X-EPG-Complete") != "true":
+        logger.info("⏳ Not pushing epg.xml until the whole horizon is cached")
+        return None
+    return get_publisher().publish(response.body)
+
+
+def warm_imports():
+    """Load the fetch and render modules ahead of the first guide request."""
+    from hdhomerun_epg import client, xmltv  # noqa: F401
+
+    xmltv.get_local_tz()
+
+
+def warm_up():
+    """
+    Get the worker ready for traffic: load modules, fill the cache and
+    render the default epg.xml, so /ready can report it warm.
+    """
+    try:
+        warm_imports()
+        if settings.startup_warmup:
+            started = time.monotonic()
+            if settings.cache_enabled:
+                fill_epg_horizon()
+            response = build_epg(
+                EPGFilter(), image_proxy_url=settings.image_proxy_base_url or None
+            )
+            logger.info(
+                f"🔥 Warm-up done in {time.monotonic() - started:.1f}s "
+                f"(epg.xml: HTTP {response.status_code})"
+            )
+    except Exception as e:
+        logger.error(f"🚨 Warm-up failed: {e}")
+    finally:
+        warmup_done.set()
+
+
+def refresh_now_next() -> bool:
+    """
+    Rebuild the now/next index when the chunks it covers have changed or the
+    chunk grid has moved on. Returns True if the index was rebuilt.
+    """
+    global now_next_index
+    from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+    from hdhomerun_epg.client import HDHomeRunClient
+    from hdhomerun_epg.schedule import ScheduleIndex
+
+    horizon = settings.now_next_horizon_hours
+    start_times = plan_chunk_starts(settings.epg_days, settings.epg_hours, horizon)
+    versions = {}
+    if settings.cache_enabled:
+        versions = CacheManager.from_settings(settings).get_versions(start_times)
+    version = (tuple(start_times), tuple(sorted(versions.items())))
+    if now_next_index is not None and now_next_index.version == version:
+        return False
+
+    client = HDHomeRunClient(host=settings.host)
+    epg_data = client.fetch_epg_data(
+        days=settings.epg_days,
+        hours=settings.epg_hours,
+        epg_filter=EPGFilter(hours=horizon),
+    )
+    now_next_index = ScheduleIndex(epg_data, version=version)
+    logger.info(
+        f"📇 Rebuilt now/next index for {len(now_next_index.channels)} channels"
+    )
+    return True
+
+
+def fill_epg_horizon():
+    """
+    Fetch the rest of the guide horizon after a progressive /epg.xml
+    response, at background priority. Runs at most once at a time across
+    the workers sharing the cache; should a fill outlast its lease, chunk
+    refresh leases still keep a second one from repeating its fetches.
+    """
+    if not horizon_fill_lock.acquire(blocking=False):
+        return
+    cache = None
+    try:
+        from hdhomerun_epg.cache import CacheManager
+        from hdhomerun_epg.client import HDHomeRunClient
+
+        if settings.cache_enabled:
+            cache = CacheManager.from_settings(settings)
+            if not cache.acquire_role("horizon_fill", settings.refresher_lease_seconds):
+                cache = None
+                return
+        client = HDHomeRunClient(host=settings.host)
+        epg_data = client.fetch_epg_data(
+            days=settings.epg_days, hours=settings.epg_hours, background=True, lazy=True
+        )
+        # Only the fetching matters, so chunks are dropped as they are merged
+        for _ in epg_data["programmes"]:
+            pass
+        logger.info(f"🌄 Filled guide horizon up to {epg_data['coverage']['until']}")
+    except Exception as e:
+        logger.error(f"🚨 Filling guide horizon failed: {e}")
+    finally:
+        if cache:
+            cache.release_role("horizon_fill")
+        horizon_fill_lock.release()
+
+
+def sync_local_search():
+    """Index chunks other replicas saved, if this replica has its own index."""
+    from hdhomerun_epg.cache import CacheManager
+
+    cache = CacheManager.from_settings(settings)
+    if cache.search_is_local:
+        cache.sync_search_index()
+
+
+async def now_next_loop():
+    """Jobs every worker runs for itself, whoever holds the refresher role."""
+    while True:
+        try:
+            await run_in_threadpool(refresh_now_next)
+        except Exception as e:
+            logger.error(f"🚨 Now/next index refresh failed: {e}")
+        if settings.cache_enabled and settings.search_enabled:
+            try:
+                await run_in_threadpool(sync_local_search)
+            except Exception as e:
+                logger.error(f"🚨 Search index sync failed: {e}")
+        await asyncio.sleep(settings.now_next_refresh_seconds)
+
+
+def holds_refresher_role() -> bool:
+    from hdhomerun_epg.cache import CacheManager
+
+    cache = CacheManager.from_settings(settings)
+    return cache.acquire_role("refresher", settings.refresher_lease_seconds)
+
+
+async def refresher_loop():
+    """
+    Background jobs that must run once per cache, not once per worker: only
+    the worker holding the refresher lease runs them, and another worker
+    takes over if it stops renewing the lease.
+    """
+    last_maintenance = None
+    last_snapshot = None
+    last_push = None
+    while True:
+        try:
+            if await run_in_threadpool(holds_refresher_role):
+                interval = settings.cache_maintenance_interval_seconds
+                if (
+                    last_maintenance is None
+                    or time.monotonic() - last_maintenance >= interval
+                ):
+                    last_maintenance = time.monotonic()
+                    await run_in_threadpool(run_cache_maintenance)
+                interval = settings.snapshot_export_interval_seconds
+                if settings.snapshot_export_path and (
+                    last_snapshot is None
+                    or time.monotonic() - last_snapshot >= interval
+                ):
+                    last_snapshot = time.monotonic()
+                    await run_in_threadpool(export_snapshot_file)
+                interval = settings.push_interval_seconds
+                if settings.push_sinks and (
+                    last_push is None or time.monotonic() - last_push >= interval
+                ):
+                    last_push = time.monotonic()
+                    await run_in_threadpool(push_epg)
+            else:
+                last_maintenance = None
+                last_snapshot = None
+                last_push = None
+        except Exception as e:
+            logger.error(f"🚨 Cache maintenance failed: {e}")
+        # Renew well before the lease runs out
+        await asyncio.sleep(settings.refresher_lease_seconds / 3)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -24,12 +270,92 @@ async def lifespan(app: FastAPI):
     )
     lib_logger.addHandler(handler)
 
+    # A new replica starts from a peer's cache instead of fetching everything
+    if settings.cache_enabled and settings.snapshot_source:
+        await run_in_threadpool(import_startup_snapshot)
+
+    # Serve health checks right away and warm up in the background; /ready
+    # tells the orchestrator when it is done
+    warmup = asyncio.create_task(run_in_threadpool(warm_up))
+
+    refresher_task = None
+    if settings.cache_enabled:
+        refresher_task = asyncio.create_task(refresher_loop())
+    now_next_task = asyncio.create_task(now_next_loop())
+
     yield
+    await warmup
+    if refresher_task:
+        refresher_task.cancel()
+        # Let another worker take over without waiting for the lease to expire
+        from hdhomerun_epg.cache import CacheManager
+
+        CacheManager.from_settings(settings).release_role("refresher")
+    now_next_task.cancel()
+    from hdhomerun_epg.xmltv import shutdown_render_pool
+
+    shutdown_render_pool()
     logger.info("🛑 Stopping HDHomeRun EPG Service")
 
 
 app = FastAPI(title="HDHomeRun EPG to XMLTV", version="2.0.0", lifespan=lifespan)
 templates = Jinja2Templates(directory="app/templates")
+STATIC_DIR = "app/static"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static assets; pages link them by content hash, so they never go stale."""
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+app.mount("/static", ImmutableStaticFiles(directory=STATIC_DIR), name="static")
+
+
+@lru_cache(maxsize=None)
+def static_url(path: str) -> str:
+    """URL of a static asset, versioned by its content."""
+    with open(os.path.join(STATIC_DIR, path), "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    return f"/static/{path}?v={digest}"
+
+
+def proxied_image(url: str, width: Optional[int] = None) -> str:
+    """Template filter pointing artwork at the /image proxy."""
+    from hdhomerun_epg.images import proxy_hosts, proxy_url
+
+    return proxy_url(url, proxy_hosts(), width=width)
+
+
+templates.env.filters["proxied_image"] = proxied_image
+templates.env.globals["static_url"] = static_url
+# Rendered epg.xml variants, keyed by filter and cached data signature.
+# Kept in files when set up to be shared by several worker processes.
+if settings.render_cache_dir:
+    render_cache = FileRenderCache(
+        settings.render_cache_dir, settings.render_cache_entries
+    )
+else:
+    render_cache = RenderCache(settings.render_cache_entries)
+# Heavy /epg.xml and /guide builds; over the limit, the last good document
+# of the variant is served instead of piling up threads doing the same work
+build_gate = AdmissionGate(settings.build_max_concurrent, settings.build_queue_size)
+last_good = LastKnownGood(settings.render_cache_entries + 1)
+# Rendered guide rows, one per channel and time window, keyed by chunk versions
+guide_fragments = RenderCache(settings.guide_fragment_entries)
+# The guide is laid out in windows matching the chunks it is fetched in
+GUIDE_CHUNK_HOURS = 4
+# Replaced wholesale by refresh_now_next(), read without locking
+now_next_index = None
+# Set once warm_up() has finished, and while this worker passes /ready
+warmup_done = threading.Event()
+was_ready = threading.Event()
+# Held while fill_epg_horizon() runs in this process
+horizon_fill_lock = threading.Lock()
 
 
 @app.get("/healthcheck")
@@ -40,6 +366,55 @@ def healthcheck():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def readiness():
+    """
+    Readiness probe: 200 once this worker can serve the guide without
+    upstream fetches (warm-up finished, enough fresh cached hours ahead,
+    the tuner answered, epg.xml rendered), 503 until then. A ready worker
+    only needs readiness_keep_hours of coverage to stay ready, so chunks
+    aging between refreshes do not take every replica out at once.
+    """
+    from hdhomerun_epg import client as epg_client
+
+    checks = {"warmup": {"ok": warmup_done.is_set()}}
+    if settings.startup_warmup:
+        if settings.cache_enabled:
+            from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+
+            start_times = plan_chunk_starts(settings.epg_days, settings.epg_hours)
+            coverage = CacheManager.from_settings(settings).get_horizon_coverage(
+                start_times, settings.epg_hours, settings.cache_ttl_seconds
+            )
+            hours = max(coverage["until"] - time.time(), 0) / 3600
+            min_hours = settings.readiness_min_hours
+            if was_ready.is_set():
+                min_hours = min(min_hours, settings.readiness_keep_hours)
+            checks["coverage"] = {
+                "ok": coverage["complete"] or hours >= min_hours,
+                "hours": round(hours, 1),
+                "min_hours": min_hours,
+                "complete": coverage["complete"],
+            }
+        age = epg_client.lineup_age()
+        max_age = settings.readiness_max_lineup_age_seconds
+        checks["lineup"] = {
+            "ok": age is not None and (max_age <= 0 or age <= max_age),
+            "age_seconds": None if age is None else int(age),
+        }
+        checks["rendered"] = {"ok": len(last_good) > 0}
+
+    ready = all(check["ok"] for check in checks.values())
+    if ready:
+        was_ready.set()
+    else:
+        was_ready.clear()
+    return JSONResponse(
+        content={"ready": ready, "checks": checks},
+        status_code=200 if ready else 503,
+    )
+
+
 @app.get("/", response_class=HTMLResponse)
 def read_root(request: Request):
     """
@@ -52,7 +427,7 @@ def read_root(request: Request):
         try:
             from hdhomerun_epg.cache import CacheManager
 
-            cache = CacheManager(settings.cache_db_path)
+            cache = CacheManager.from_settings(settings)
             stats = cache.get_status()
             return JSONResponse(
                 content={
@@ -87,179 +462,624 @@ def read_root(request: Request):
     )
 
 
+@contextmanager
+def instrumented(name: str):
+    """Record per-phase timings for a request and profile it if it is slow."""
+    with (
+        profiling.recording() as recorder,
+        profiling.profile_if_slow(name, settings.profile_slow_ms, settings.profile_dir),
+    ):
+        yield recorder
+
+
+def with_timing(response: Response, recorder, debug: Optional[str]) -> Response:
+    """Attach the phase breakdown, or replace the body with it for ?debug=timing."""
+    if debug == "timing":
+        return JSONResponse(content=recorder.breakdown())
+    if settings.server_timing or debug:
+        response.headers["Server-Timing"] = recorder.server_timing()
+    return response
+
+
 @app.get("/guide", response_class=HTMLResponse)
-def tv_guide(request: Request):
+def tv_guide(request: Request, debug: Optional[str] = None):
     """
     Render a visual TV Guide using fetched EPG data.
+    Pass debug=timing for a per-phase timing breakdown instead of the page.
     """
+    with instrumented("guide") as recorder:
+        with build_gate.admit() as admitted:
+            if admitted:
+                response = render_guide(request)
+            else:
+                response = (
+                    fallback_response(("guide",), "text/html", "overloaded")
+                    or overloaded_response()
+                )
+    return with_timing(response, recorder, debug)
+
+
+def render_guide(request: Request) -> Response:
     logger.info("📺 Rendering TV Guide")
     try:
+        from hdhomerun_epg import guide
+        from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+        from hdhomerun_epg.client import HDHomeRunClient
+        from hdhomerun_epg.images import proxy_hosts
+
+        window_seconds = GUIDE_CHUNK_HOURS * 3600
+        window_starts = plan_chunk_starts(settings.epg_days, GUIDE_CHUNK_HOURS)
+
+        # Chunk versions are read before fetching, so a fragment can only
+        # ever be cached with data at least as new as its key says
+        versions = {}
+        if settings.cache_enabled:
+            versions = CacheManager.from_settings(settings).get_versions(window_starts)
+
         # Fetch EPG Data (uses Cache + API)
         client = HDHomeRunClient(host=settings.host)
         # Fetch EPG days as configured to allow full timeline scrolling
-        epg_data = client.fetch_epg_data(days=settings.epg_days, hours=4)
-
-        # Prepare data for template
+        epg_data = client.fetch_epg_data(
+            days=settings.epg_days, hours=GUIDE_CHUNK_HOURS
+        )
         channels = epg_data.get("channels", [])
-        programmes = epg_data.get("programmes", [])
-        programmes.sort(key=lambda x: x.get("StartTime", 0))
 
-        from collections import defaultdict
-        import datetime
+        # Cards are only laid out for fragments that are not cached
+        with profiling.phase("layout"):
+            windows_by_channel = guide.group_by_window(
+                epg_data.get("programmes", []), window_starts, window_seconds
+            )
+            rows = []
+            for ch in channels:
+                gn = ch.get("GuideNumber")
+                windows = []
+                for window_start, progs in sorted(
+                    windows_by_channel.get(gn, {}).items()
+                ):
+                    key = guide.fragment_key(
+                        gn, window_start, window_starts, window_seconds, versions
+                    )
+                    html = guide_fragments.get(key) if key else None
+                    windows.append(
+                        {
+                            "left_px": guide.to_px(window_start - window_starts[0]),
+                            "html": html,
+                            "key": key,
+                            "cards": (
+                                guide.layout_window(progs, window_start)
+                                if html is None
+                                else None
+                            ),
+                        }
+                    )
+                rows.append({"channel": ch, "windows": windows})
 
-        now = time.time()
-        pixels_per_minute = 5  # Scale factor for width
+        with profiling.phase("fragments"):
+            window_template = templates.get_template("guide_window.html")
+            for row in rows:
+                for window in row["windows"]:
+                    if window["html"] is None:
+                        window["html"] = window_template.render(cards=window["cards"])
+                        if window["key"]:
+                            guide_fragments.put(window["key"], window["html"])
 
-        # Filter out past programs
-        programmes = [p for p in programmes if p["EndTime"] > now]
+        origin = window_starts[0] if window_starts else int(time.time())
+        # Leave room for programmes running past the last window
+        timeline_width_px = guide.to_px(
+            settings.epg_days * 86400 + GUIDE_CHUNK_HOURS * 3600
+        )
 
-        grouped_programmes = defaultdict(list)
-        for p in programmes:
-            # Pre-calculate strings for template - DEFAULT to server time, will be overridden by JS
-            p["start_ts"] = p["StartTime"]
-            p["end_ts"] = p["EndTime"]
-            p["start_str"] = datetime.datetime.fromtimestamp(p["StartTime"]).strftime(
-                "%H:%M"
-            )
-            p["end_str"] = datetime.datetime.fromtimestamp(p["EndTime"]).strftime(
-                "%H:%M"
+        with profiling.phase("template"):
+            response = templates.TemplateResponse(
+                request=request,
+                name="guide.html",
+                context={
+                    "channels": channels,
+                    "rows": rows,
+                    "timeline_width_px": timeline_width_px,
+                    "guide_config": {
+                        "origin": origin,
+                        "pixels_per_minute": guide.PIXELS_PER_MINUTE,
+                        "image_proxy_hosts": sorted(proxy_hosts()),
+                    },
+                },
             )
+        if epg_data.get("error"):
+            return fallback_response(("guide",), "text/html", "error") or response
+        last_good.put(("guide",), response.body)
+        return response
 
-            # --- Visual Width Calculation ---
-            # For programs currently playing, we only want to show the REMAINING portion
-            # starting from the left edge (Now).
-            visual_start = max(p["StartTime"], now)
-            visual_duration_seconds = p["EndTime"] - visual_start
-            
-            # Width calculation
-            visual_duration_minutes = visual_duration_seconds / 60
-            p["width_px"] = int(visual_duration_minutes * pixels_per_minute)
-
-            # Progress calculation (still based on total duration)
-            total_duration = p["EndTime"] - p["StartTime"]
-            if now < p["StartTime"]:
-                p["progress_percent"] = 0
-            elif now > p["EndTime"]:
-                p["progress_percent"] = 100
-            else:
-                p["progress_percent"] = int(
-                    ((now - p["StartTime"]) / total_duration) * 100
+    except Exception as e:
+        logger.error(f"Error rendering guide: {e}")
+        return fallback_response(("guide",), "text/html", "error") or HTMLResponse(
+            content=f"<h1>Error rendering guide</h1><p>{e}</p>", status_code=500
+        )
+
+
+@app.get("/programme/{guide_number}/{start_time}")
+def get_programme(guide_number: str, start_time: int):
+    """
+    Full details of one programme in the guide, which the guide page only
+    loads when the programme is clicked. Read from the cache, stale or not,
+    or fetched if its window is not cached (or caching is disabled).
+    """
+    try:
+        from hdhomerun_epg import guide
+        from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+        from hdhomerun_epg.client import HDHomeRunClient
+
+        programme = None
+        window_starts = plan_chunk_starts(settings.epg_days, GUIDE_CHUNK_HOURS)
+        if window_starts:
+            window = guide.window_for(start_time, window_starts)
+            chunk = None
+            if settings.cache_enabled:
+                chunk = CacheManager.from_settings(settings).get_chunk(
+                    window, ttl_seconds=float("inf")
+                )
+            if chunk is None:
+                chunk = HDHomeRunClient(host=settings.host).fetch_chunk(
+                    window, GUIDE_CHUNK_HOURS
                 )
+            programme = guide.find_programme(chunk or [], guide_number, start_time)
+        if programme is None:
+            return JSONResponse(
+                content={"error": "Programme not found"}, status_code=404
+            )
+        return JSONResponse(
+            content=programme,
+            headers={"Cache-Control": f"max-age={settings.cache_ttl_seconds}"},
+        )
+    except Exception as e:
+        logger.error(f"🚨 Error loading programme details: {e}")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
 
-            grouped_programmes[p["GuideNumber"]].append(p)
-
-        # --- Gap Filling Logic ---
-        # Ensure programs are aligned to the timeline by inserting spacer blocks for gaps.
-        # This fixes the issue where gaps cause subsequent programs to shift left (desync),
-        # leaving the end of the timeline empty.
-        
-        timeline_end_time = now + (settings.epg_days * 24 * 60 * 60)
-        
-        for guide_number, progs in grouped_programmes.items():
-            # Ensure sorted
-            progs.sort(key=lambda x: x["StartTime"])
-            
-            filled_progs = []
-            # Cursor tracks the end of the last added element (starting at Now)
-            cursor = now
-            
-            for p in progs:
-                # Calculate gap from cursor to program start
-                # We only care if program starts after cursor.
-                if p["StartTime"] > cursor:
-                    gap_seconds = p["StartTime"] - cursor
-                    # Only render gap if significant (> 1 minute visual)
-                    if gap_seconds > 0: # render even small gaps to maintain perfect sync
-                        gap_minutes = gap_seconds / 60
-                        gap_px = int(gap_minutes * pixels_per_minute)
-                        if gap_px > 0:
-                            filled_progs.append({
-                                "is_gap": True,
-                                "width_px": gap_px,
-                                "StartTime": cursor,
-                                "EndTime": p["StartTime"],
-                                "title": "No Data" # Helper
-                            })
-                
-                filled_progs.append(p)
-                # update cursor to end of this program
-                cursor = max(cursor, p["EndTime"])
-            
-            # Optional: Fill remainder of timeline
-            # if cursor < timeline_end_time:
-            #     gap_seconds = timeline_end_time - cursor
-            #     gap_minutes = gap_seconds / 60
-            #     gap_px = int(gap_minutes * pixels_per_minute)
-            #     if gap_px > 0:
-            #         filled_progs.append({"is_gap": True, "width_px": gap_px})
-
-            grouped_programmes[guide_number] = filled_progs
-
-        # Group everything nicely
-        grouped_data = {}
-        for ch in channels:
-            gn = ch.get("GuideNumber")
-            grouped_data[gn] = {
-                "channel": ch,
-                "programmes": grouped_programmes.get(gn, []),
-            }
 
-        return templates.TemplateResponse(
-            request=request,
-            name="guide.html",
-            context={
-                "channels": channels, 
-                "grouped_data": grouped_data,
-                "epg_days": settings.epg_days
-            },
+@app.get("/now-next")
+async def get_now_next(
+    channels: Optional[str] = Query(
+        None, description="Comma-separated GuideNumbers, e.g. 5.1,7.1"
+    ),
+):
+    """
+    What is on now and next per channel, answered from the in-memory index
+    without touching the cache or the network.
+    """
+    # async: a pure in-memory lookup, so skip the threadpool hop
+    index = now_next_index
+    if index is None:
+        return JSONResponse(
+            content={"error": "Now/next index is still being built"},
+            status_code=503,
+            headers={"Retry-After": "5"},
         )
+    now = time.time()
+    guide_numbers = channels.split(",") if channels else None
+    return JSONResponse(
+        content={
+            "time": int(now),
+            "channels": index.now_next(now, guide_numbers),
+        }
+    )
+
+
+@app.get("/changes")
+def get_changes(
+    since: int = Query(0, ge=0, description="The version returned by the last call"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Change feed of the cached guide: programmes added, removed or modified by
+    chunk refreshes after version `since`. Refreshes that returned identical
+    data do not appear and do not advance the version.
+    """
+    try:
+        from hdhomerun_epg.cache import CacheManager
 
+        cache = CacheManager.from_settings(settings)
+        return cache.get_changes(since, limit)
     except Exception as e:
-        logger.error(f"Error rendering guide: {e}")
-        return HTMLResponse(
-            content=f"<h1>Error rendering guide</h1><p>{e}</p>", status_code=500
+        logger.error(f"🚨 Error reading change feed: {e}")
+        return {"error": str(e)}
+
+
+@app.get("/upstream")
+def get_upstream_stats():
+    """
+    Upstream request limiter state: requests made and deferred by this
+    process, time spent queueing for a slot, and the shared daily budget.
+    """
+    try:
+        from hdhomerun_epg.cache import CacheManager
+        from hdhomerun_epg.ratelimit import get_upstream_limiter
+
+        cache = CacheManager.from_settings(settings) if settings.cache_enabled else None
+        return get_upstream_limiter().stats(cache)
+    except Exception as e:
+        logger.error(f"🚨 Error reading upstream stats: {e}")
+        return {"error": str(e)}
+
+
+@app.get("/search")
+def search_guide(
+    q: str = Query(
+        ..., description="Words to find in titles, episode titles and synopses"
+    ),
+    channels: Optional[str] = Query(
+        None, description="Comma-separated GuideNumbers, e.g. 5.1,7.1"
+    ),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    Full-text search over the cached guide. Returns upcoming and airing
+    showings in airing order.
+    """
+    try:
+        from hdhomerun_epg.cache import CacheManager
+
+        cache = CacheManager.from_settings(settings)
+        guide_numbers = channels.split(",") if channels else None
+        return {
+            "query": q,
+            "results": cache.search_programmes(q, guide_numbers, limit),
+        }
+    except Exception as e:
+        logger.error(f"🚨 Error searching guide: {e}")
+        return {"error": str(e)}
+
+
+@app.get("/history")
+def get_history(
+    start: Optional[int] = Query(
+        None, description="Unix time to start at, default one day before end"
+    ),
+    end: Optional[int] = Query(None, description="Unix time to end at, default now"),
+    channels: Optional[str] = Query(
+        None, description="Comma-separated GuideNumbers, e.g. 5.1,7.1"
+    ),
+):
+    """
+    Programmes that aired in a past window, from the guide archive and the
+    past chunks still cached. Windows are limited to a week.
+    """
+    end = int(time.time()) if end is None else end
+    start = end - 86400 if start is None else start
+    if not 0 < end - start <= 7 * 86400:
+        return JSONResponse(
+            content={"error": "start must be before end, at most a week apart"},
+            status_code=400,
         )
+    try:
+        from hdhomerun_epg.cache import CacheManager
+
+        cache = CacheManager.from_settings(settings)
+        guide_numbers = channels.split(",") if channels else None
+        return {
+            "start": start,
+            "end": end,
+            "programmes": cache.get_history(start, end, guide_numbers),
+        }
+    except Exception as e:
+        logger.error(f"🚨 Error reading guide history: {e}")
+        return {"error": str(e)}
+
+
+@app.get("/snapshot")
+def get_snapshot():
+    """
+    Unexpired cache chunks as a tar archive, for another replica to import
+    at startup (HDHOMERUN_SNAPSHOT_SOURCE) or through POST /snapshot.
+    """
+    from hdhomerun_epg.cache import CacheManager
+    from hdhomerun_epg.snapshot import export_snapshot
+
+    # Spooled first, so a slow peer does not keep chunk reads open
+    spool = tempfile.TemporaryFile()
+    try:
+        count = export_snapshot(CacheManager.from_settings(settings), spool)
+    except Exception as e:
+        spool.close()
+        logger.error(f"🚨 Error exporting snapshot: {e}")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+    spool.seek(0)
+
+    def stream():
+        with spool:
+            while block := spool.read(64 * 1024):
+                yield block
+
+    logger.info(f"📦 Exporting snapshot of {count} chunks")
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-tar",
+        headers={
+            "Content-Disposition": 'attachment; filename="epg_snapshot.tar"',
+            "X-Snapshot-Chunks": str(count),
+        },
+    )
+
+
+@app.post("/snapshot")
+async def post_snapshot(request: Request):
+    """Import a snapshot sent as the request body, as produced by GET /snapshot."""
+    from hdhomerun_epg.cache import CacheManager
+    from hdhomerun_epg.snapshot import SnapshotError, import_snapshot
+
+    body = await request.body()
+    try:
+        result = await run_in_threadpool(
+            import_snapshot, CacheManager.from_settings(settings), io.BytesIO(body)
+        )
+    except SnapshotError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except Exception as e:
+        logger.error(f"🚨 Error importing snapshot: {e}")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+    logger.info(f"📦 Imported {result['imported']} chunks from an uploaded snapshot")
+    return {"status": "success", **result}
 
 
 @app.get("/epg.xml")
-def get_epg(background_tasks: BackgroundTasks):
+def get_epg(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    channels: Optional[str] = Query(
+        None, description="Comma-separated GuideNumbers to include"
+    ),
+    guide_min: Optional[str] = Query(None, description="Lowest GuideNumber, e.g. 5.1"),
+    guide_max: Optional[str] = Query(None, description="Highest GuideNumber"),
+    favorites: bool = Query(False, description="Only channels marked as favorite"),
+    hours: Optional[int] = Query(None, ge=1, description="Time horizon in hours"),
+    debug: Optional[str] = Query(None, description="'timing' for a phase breakdown"),
+):
     """
-    Generate and retrieve the EPG in XMLTV format.
-    This triggers a fresh fetch from the HDHomeRun device.
+    Generate and retrieve the EPG in XMLTV format, optionally filtered.
+    Each filtered variant is cached separately until its chunks change.
     """
     logger.info("📨 Received request for epg.xml")
 
     try:
-        # Initialize Client
-        client = HDHomeRunClient(host=settings.host)
+        epg_filter = EPGFilter(
+            channels=frozenset(c.strip() for c in channels.split(",") if c.strip())
+            if channels
+            else None,
+            guide_min=guide_min or None,
+            guide_max=guide_max or None,
+            favorites_only=favorites,
+            hours=hours,
+        )
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    # Icons point at our image proxy, at the address the client used to reach us
+    image_proxy_url = None
+    if settings.image_proxy_enabled:
+        image_proxy_url = settings.image_proxy_base_url or str(request.base_url)
 
-        # Fetch Data
-        epg_data = client.fetch_epg_data(
-            days=settings.epg_days, hours=settings.epg_hours
+    with instrumented("epg") as recorder:
+        response = build_epg(epg_filter, background_tasks, image_proxy_url)
+    return with_timing(response, recorder, debug)
+
+
+def fallback_response(key, media_type: str, reason: str) -> Optional[Response]:
+    """
+    The last good document for `key`, marked with its age, or None if
+    there is none.
+    """
+    entry = last_good.get(key)
+    if entry is None:
+        return None
+    content, built_at = entry
+    logger.warning(f"🛟 Serving last good {key[0]} ({reason})")
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Age": str(int(time.time() - built_at)), "X-EPG-Fallback": reason},
+    )
+
+
+def overloaded_response() -> Response:
+    return Response(
+        content="Too many guide builds in progress, try again shortly",
+        status_code=503,
+        headers={"Retry-After": str(settings.build_retry_after_seconds)},
+    )
+
+
+def coverage_headers(coverage: dict) -> dict:
+    """Tell pollers how much of the guide horizon a response covers."""
+    hours = max(coverage["until"] - time.time(), 0) / 3600
+    return {
+        "X-EPG-Coverage-Until": str(coverage["until"]),
+        "X-EPG-Coverage-Hours": f"{hours:.1f}",
+        "X-EPG-Complete": "true" if coverage["complete"] else "false",
+    }
+
+
+def build_epg(
+    epg_filter: EPGFilter,
+    background_tasks: Optional[BackgroundTasks] = None,
+    image_proxy_url: Optional[str] = None,
+) -> Response:
+    variant = ("epg.xml", epg_filter.cache_key(), image_proxy_url or "")
+    try:
+        from hdhomerun_epg.cache import CacheManager, chunk_coverage, plan_chunk_starts
+
+        start_times = plan_chunk_starts(
+            settings.epg_days, settings.epg_hours, epg_filter.hours
         )
 
-        # Generate XML
-        generator = XMLTVGenerator()
-        xml_content = generator.generate(epg_data)
+        cache = None
+        signature = None
+        if settings.cache_enabled:
+            cache = CacheManager.from_settings(settings)
+            signature = cache.get_signature(start_times, settings.cache_ttl_seconds)
+            if signature:
+                cached = render_cache.get(
+                    (epg_filter.cache_key(), image_proxy_url or "", signature)
+                )
+                if cached is not None:
+                    last_good.put(variant, cached)
+                    horizon_end = None
+                    if epg_filter.hours is not None:
+                        horizon_end = time.time() + epg_filter.hours * 3600
+                    coverage = chunk_coverage(
+                        start_times, start_times, settings.epg_hours, horizon_end
+                    )
+                    return Response(
+                        content=cached,
+                        media_type="application/xml",
+                        headers=coverage_headers(coverage),
+                    )
 
-        return Response(content=xml_content, media_type="application/xml")
+        with build_gate.admit() as admitted:
+            if not admitted:
+                return (
+                    fallback_response(variant, "application/xml", "overloaded")
+                    or overloaded_response()
+                )
+            response, error = render_epg(
+                epg_filter,
+                start_times,
+                cache,
+                signature,
+                background_tasks,
+                image_proxy_url,
+            )
+        if error:
+            # A guide cut short by an upstream failure is worse than the last one
+            return fallback_response(variant, "application/xml", "error") or response
+        last_good.put(variant, response.body)
+        return response
 
     except Exception as e:
         logger.error(f"🚨 Error generating EPG: {e}")
-        return Response(content=f"Error generating EPG: {str(e)}", status_code=500)
+        fallback = fallback_response(variant, "application/xml", "error")
+        return fallback or Response(
+            content=f"Error generating EPG: {str(e)}", status_code=500
+        )
+
+
+def render_epg(
+    epg_filter: EPGFilter,
+    start_times: list,
+    cache,
+    signature: Optional[str],
+    background_tasks: Optional[BackgroundTasks],
+    image_proxy_url: Optional[str],
+) -> Tuple[Response, Optional[str]]:
+    """
+    Fetch and render an epg.xml variant the render cache did not have.
+    Also returns the error that cut fetching short, if any.
+    """
+    from hdhomerun_epg.client import HDHomeRunClient
+    from hdhomerun_epg.images import proxy_hosts
+    from hdhomerun_epg.xmltv import XMLTVGenerator
+
+    # Progressive mode: when some chunk needs fetching, only fetch the
+    # near term now and leave the rest to a background fill
+    fetch_hours = None
+    if settings.progressive_hours > 0 and signature is None:
+        fetch_hours = settings.progressive_hours
+
+    # Fetch Data
+    client = HDHomeRunClient(host=settings.host)
+    # Lazily: chunks are decoded and merged one at a time as the
+    # document is rendered, instead of all held in memory at once
+    epg_data = client.fetch_epg_data(
+        days=settings.epg_days,
+        hours=settings.epg_hours,
+        epg_filter=epg_filter,
+        fetch_hours=fetch_hours,
+        lazy=True,
+    )
+
+    # Generate XML
+    generator = XMLTVGenerator(
+        image_proxy_url=image_proxy_url, image_proxy_hosts=proxy_hosts()
+    )
+    xml_content = generator.generate(
+        epg_data,
+        workers=settings.xmltv_render_workers,
+        min_parallel=settings.xmltv_parallel_min_programmes,
+    ).encode("utf-8")
+
+    coverage = epg_data.get("coverage")
+    incomplete = coverage is not None and not coverage["complete"]
+    if fetch_hours is not None and incomplete and background_tasks:
+        background_tasks.add_task(fill_epg_horizon)
+
+    if cache:
+        # Keyed by the versions read before fetching, so a chunk refreshed
+        # during the render cannot label this document as newer than it is.
+        # Without them, some chunk was fetched by this render, and only now
+        # are there versions to key on.
+        if signature is None:
+            signature = cache.get_signature(start_times, settings.cache_ttl_seconds)
+        if signature:
+            render_cache.put(
+                (epg_filter.cache_key(), image_proxy_url or "", signature),
+                xml_content,
+            )
+
+    response = Response(
+        content=xml_content,
+        media_type="application/xml",
+        headers=coverage_headers(coverage) if coverage else None,
+    )
+    return response, epg_data.get("error")
+
+
+@app.get("/image")
+def get_image(
+    request: Request,
+    url: str = Query(..., description="Upstream channel logo or artwork URL"),
+    w: Optional[int] = Query(None, ge=1, description="Thumbnail width in pixels"),
+):
+    """
+    Serve upstream artwork from the local image cache, fetching it once on
+    a miss. With `w`, a thumbnail at least that wide (needs Pillow).
+    """
+    from hdhomerun_epg.images import (
+        ImageProxyError,
+        get_image_cache,
+        is_proxyable,
+        proxy_hosts,
+        thumbnail_width,
+    )
+
+    if not is_proxyable(url, proxy_hosts()):
+        return Response(content="Image host not allowed", status_code=400)
+    try:
+        data, content_type, sha256 = get_image_cache().get(url, thumbnail_width(w))
+    except ImageProxyError as e:
+        logger.warning(f"🖼️ {e}")
+        return Response(content=str(e), status_code=e.status_code)
+    except Exception as e:
+        # Artwork is not worth an error page; let the client fetch it directly
+        logger.error(f"🚨 Image proxy failed for {url}: {e}")
+        return RedirectResponse(url, status_code=307)
+
+    # Content-addressed, so the hash doubles as a strong validator
+    headers = {"ETag": f'"{sha256}"', "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("If-None-Match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=content_type, headers=headers)
 
 
 @app.delete("/cache")
-def clear_cache():
+def clear_cache(background_tasks: BackgroundTasks):
     """
-    Clear the local EPG cache.
+    Clear the local EPG cache. Disk space is reclaimed in the background.
     """
     logger.info("🗑️ Received request to clear cache")
     try:
         from hdhomerun_epg.cache import CacheManager
 
-        cache = CacheManager(settings.cache_db_path)
+        cache = CacheManager.from_settings(settings)
         cache.clear_cache()
+        render_cache.clear()
+        guide_fragments.clear()
+        background_tasks.add_task(cache.incremental_vacuum)
         return {"status": "success", "message": "Cache cleared"}
     except Exception as e:
         logger.error(f"🚨 Error clearing cache: {e}")
@@ -274,12 +1094,51 @@ def get_cache_status():
     try:
         from hdhomerun_epg.cache import CacheManager
 
-        cache = CacheManager(settings.cache_db_path)
+        cache = CacheManager.from_settings(settings)
         return cache.get_status()
     except Exception as e:
         logger.error(f"🚨 Error getting cache status: {e}")
         return {"error": str(e)}
 
 
+@app.get("/cache/coverage")
+def get_cache_coverage():
+    """
+    Report per-channel coverage of the cached chunks in the current horizon,
+    including the windows with holes that a backfill would re-fetch.
+    """
+    try:
+        from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+
+        start_times = plan_chunk_starts(settings.epg_days, settings.epg_hours)
+        cache = CacheManager.from_settings(settings)
+        return {
+            "chunks": cache.get_coverage(start_times),
+            "gaps": cache.find_gaps(
+                start_times, tolerance_seconds=settings.coverage_tolerance_seconds
+            ),
+        }
+    except Exception as e:
+        logger.error(f"🚨 Error getting cache coverage: {e}")
+        return {"error": str(e)}
+
+
+@app.post("/cache/backfill")
+def backfill_cache(background_tasks: BackgroundTasks):
+    """
+    Re-fetch only the cached windows with holes, in the background.
+    """
+    logger.info("🩹 Received request to backfill cache gaps")
+    from hdhomerun_epg.client import HDHomeRunClient
+
+    client = HDHomeRunClient(host=settings.host)
+    background_tasks.add_task(
+        client.backfill_gaps, days=settings.epg_days, hours=settings.epg_hours
+    )
+    return {"status": "scheduled"}
+
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000)
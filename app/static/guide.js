@@ -0,0 +1,410 @@
+// Layout constants from the server; positions are relative to ORIGIN
+const CONFIG = JSON.parse(document.getElementById("guide-config").textContent);
+const ORIGIN = CONFIG.origin;
+const PIXELS_PER_MINUTE = CONFIG.pixels_per_minute;
+const CHANNEL_COLUMN_PX = 192;
+
+function offsetPx(unixSeconds) {
+  return ((unixSeconds - ORIGIN) / 60) * PIXELS_PER_MINUTE;
+}
+
+// --- Clock & Time Logic ---
+function updateClock() {
+  const now = new Date();
+  const timeString = now.toLocaleTimeString([], {
+    hour: "2-digit",
+    minute: "2-digit",
+  });
+  document.getElementById("clock").innerText = timeString;
+}
+
+function renderLocalTimes() {
+  document.querySelectorAll(".local-time").forEach((el) => {
+    const ts = parseFloat(el.closest(".program-card").dataset.start);
+    if (ts) {
+      const date = new Date(ts * 1000);
+      el.innerText = date.toLocaleTimeString([], {
+        hour: "2-digit",
+        minute: "2-digit",
+      });
+    }
+  });
+}
+
+function renderTimeline() {
+  const container = document.getElementById("timeline-container");
+  container.innerHTML = "";
+
+  // Markers every 30 minutes across the server-sized timeline
+  const widthPx = container.offsetWidth;
+  const endUnix = ORIGIN + (widthPx / PIXELS_PER_MINUTE) * 60;
+  for (let t = ORIGIN - (ORIGIN % 1800); t < endUnix; t += 1800) {
+    const leftPos = offsetPx(t);
+    if (leftPos < 0) continue;
+
+    // Marker Line
+    const marker = document.createElement("div");
+    marker.className =
+      "absolute top-0 bottom-0 w-px bg-slate-600/50 flex flex-col items-center";
+    marker.style.left = `${leftPos}px`;
+
+    // Time Label
+    const label = document.createElement("div");
+    label.className =
+      "mt-1 text-xs text-slate-400 font-mono bg-slate-800 px-1 rounded";
+    label.innerText = new Date(t * 1000).toLocaleTimeString([], {
+      hour: "2-digit",
+      minute: "2-digit",
+    });
+
+    marker.appendChild(label);
+    container.appendChild(marker);
+  }
+}
+
+// Everything that depends on the current time lives here, so the
+// server-rendered rows stay cacheable
+function updateNow() {
+  const nowUnix = Date.now() / 1000;
+  document.getElementById("now-line").style.left =
+    `${CHANNEL_COLUMN_PX + offsetPx(nowUnix)}px`;
+
+  document.querySelectorAll(".program-card").forEach((card) => {
+    const start = parseFloat(card.dataset.start);
+    const end = parseFloat(card.dataset.end);
+    const bar = card.querySelector(".progress-bar");
+    if (nowUnix >= end) {
+      card.classList.add("opacity-50");
+      bar.classList.add("hidden");
+    } else if (nowUnix > start) {
+      bar.style.width = `${((nowUnix - start) / (end - start)) * 100}%`;
+      bar.classList.remove("hidden");
+    }
+  });
+}
+
+function scrollToNow() {
+  const guideContainer = document.getElementById("guide-container");
+  guideContainer.scrollLeft = Math.max(offsetPx(Date.now() / 1000), 0);
+}
+
+// Init
+document.addEventListener("DOMContentLoaded", () => {
+  updateClock();
+  setInterval(updateClock, 1000);
+  renderLocalTimes();
+  
+  // Initial Render
+  renderTimeline();
+  updateNow();
+  scrollToNow();
+
+  // Move the now line and progress bars every minute
+  setInterval(updateNow, 60000);
+
+  initScrubber();
+});
+
+// --- Scrubber Logic ---
+function initScrubber() {
+    const trackContainer = document.getElementById('scrubber-track-container');
+    const guideContainer = document.getElementById('guide-container');
+    const windowIndicator = document.getElementById('scrubber-window');
+    const lens = document.getElementById('scrubber-lens');
+    const lensTime = document.getElementById('lens-time');
+
+    let isDragging = false;
+
+    // Sync Active Window Indicator to Guide Scroll
+    guideContainer.addEventListener('scroll', () => {
+        updateScrubberWindow();
+    });
+
+    // Click / Drag on Track
+    trackContainer.addEventListener('mousedown', (e) => {
+        isDragging = true;
+        scrollToScrubberPos(e.clientX);
+    });
+    document.addEventListener('mousemove', (e) => {
+        if(isDragging) {
+            e.preventDefault();
+            scrollToScrubberPos(e.clientX);
+        }
+        // Update Lens if hovering track container
+        const rect = trackContainer.getBoundingClientRect();
+        if(e.clientY >= rect.top && e.clientY <= rect.bottom && e.clientX >= rect.left && e.clientX <= rect.right) {
+            updateLens(e.clientX);
+            lens.classList.remove('hidden');
+            // lens.classList.add('flex'); // It's flex by default but hidden toggle
+            lens.style.display = 'flex';
+        } else {
+            lens.classList.add('hidden');
+            lens.style.display = 'none';
+        }
+    });
+    document.addEventListener('mouseup', () => {
+        isDragging = false;
+    });
+
+    function updateScrubberWindow() {
+         // Calculate ratio
+         const totalWidth = guideContainer.scrollWidth;
+         const visibleWidth = guideContainer.clientWidth;
+         const scrollLeft = guideContainer.scrollLeft;
+
+         const trackWidth = trackContainer.clientWidth - 32; // -32 for left/right padding
+         const ratio = trackWidth / totalWidth;
+
+         const indicatorWidth = Math.max(visibleWidth * ratio, 20); // Min width
+         const indicatorLeft = 16 + (scrollLeft * ratio); // +16 padding
+
+         windowIndicator.style.width = `${indicatorWidth}px`;
+         windowIndicator.style.left = `${indicatorLeft}px`;
+    }
+    
+    function scrollToScrubberPos(clientX) {
+         const rect = trackContainer.getBoundingClientRect();
+         const trackLeft = rect.left + 16;
+         const trackWidth = rect.width - 32;
+         
+         let relX = clientX - trackLeft;
+         // Clamp
+         if (relX < 0) relX = 0;
+         if (relX > trackWidth) relX = trackWidth;
+
+         // Convert to scroll position
+         const ratio = relX / trackWidth;
+         const totalScrollWidth = guideContainer.scrollWidth - guideContainer.clientWidth;
+         
+         guideContainer.scrollLeft = totalScrollWidth * ratio;
+    }
+
+    function updateLens(clientX) {
+         const rect = trackContainer.getBoundingClientRect();
+         lens.style.left = `${clientX - rect.left}px`;
+         
+         // Calculate time at this position
+         const trackLeft = rect.left + 16;
+         const trackWidth = rect.width - 32;
+         let ratio = (clientX - trackLeft) / trackWidth;
+         if(ratio < 0) ratio = 0;
+         if(ratio > 1) ratio = 1;
+
+         // Total duration in seconds (based on guide content)
+         // We need a rough estimate. Let's look at the first channel's last program end time vs "now"
+         // Or simpler: The guide is rendered based on pixel width.
+         const pixelsPerMinute = 5;
+         const totalWidth = guideContainer.scrollWidth;
+         const totalMinutes = totalWidth / pixelsPerMinute;
+         
+         const targetTime = new Date((ORIGIN + totalMinutes * ratio * 60) * 1000);
+         
+         // Format: "Day HH:MM"
+         const day = targetTime.toLocaleDateString([], {weekday: 'short'});
+         const time = targetTime.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'});
+         
+         lensTime.innerText = `${day} ${time}`;
+    }
+
+    // Initial call
+    setTimeout(updateScrubberWindow, 100); // Wait for layout
+}
+
+function filterGuide() {
+  const chFilter = document
+    .getElementById("filter-channel")
+    .value.toLowerCase();
+  const progFilter = document
+    .getElementById("filter-program")
+    .value.toLowerCase();
+  const rows = document.querySelectorAll(".channel-row");
+
+  rows.forEach((row) => {
+    const chName = row.getAttribute("data-channel-name");
+    const progCards = row.querySelectorAll(".program-card");
+
+    let hasVisibleProgram = false;
+
+    // Hide programs if filter set
+    progCards.forEach((card) => {
+      if (!progFilter) {
+        card.style.display = "";
+        card.style.opacity = "1";
+        hasVisibleProgram = true;
+      } else {
+        const title = card.dataset.title.toLowerCase();
+        if (title.includes(progFilter)) {
+          card.style.display = "";
+          card.style.opacity = "1";
+          hasVisibleProgram = true;
+        } else {
+          // Grey out or hide? Let's opacity drop to highlight matches
+          card.style.opacity = "0.1";
+          // Or display none?
+          // card.style.display = 'none';
+        }
+      }
+    });
+
+    // Row visibility based on Channel Name AND if it has matching programs (if prog filter active)
+    if (chName.includes(chFilter)) {
+      row.style.display = "";
+    } else {
+      row.style.display = "none";
+    }
+  });
+}
+
+// --- Search ---
+let searchTimer = null;
+
+function searchGuide() {
+  clearTimeout(searchTimer);
+  searchTimer = setTimeout(async () => {
+    const query = document.getElementById("search-input").value.trim();
+    const panel = document.getElementById("search-results");
+    if (!query) {
+      panel.classList.add("hidden");
+      return;
+    }
+    const response = await fetch(
+      `/search?q=${encodeURIComponent(query)}&limit=50`
+    );
+    const body = await response.json();
+    panel.innerHTML = "";
+    (body.results || []).forEach((prog) => {
+      const item = document.createElement("button");
+      item.className =
+        "block w-full text-left px-3 py-2 hover:bg-slate-700 border-b border-slate-700/50";
+      const title = document.createElement("div");
+      title.className = "font-bold text-white text-xs truncate";
+      title.textContent = prog.EpisodeTitle
+        ? `${prog.Title} - ${prog.EpisodeTitle}`
+        : prog.Title;
+      const when = document.createElement("div");
+      when.className = "text-[10px] text-slate-400 font-mono";
+      const start = new Date(prog.StartTime * 1000);
+      when.textContent = `${start.toLocaleDateString([], {
+        weekday: "short",
+      })} ${start.toLocaleTimeString([], {
+        hour: "2-digit",
+        minute: "2-digit",
+      })} · ${prog.GuideNumber} ${prog.GuideName || ""}`;
+      item.append(title, when);
+      item.onclick = () => openModal(prog);
+      panel.appendChild(item);
+    });
+    if (!panel.children.length) {
+      panel.innerHTML =
+        '<div class="p-3 text-slate-500 italic text-xs">No matches</div>';
+    }
+    panel.classList.remove("hidden");
+  }, 200);
+}
+
+// Artwork hosts served through the local /image cache
+const IMAGE_PROXY_HOSTS = CONFIG.image_proxy_hosts;
+
+function proxiedImage(url, width) {
+  try {
+    const parsed = new URL(url);
+    if (
+      ["http:", "https:"].includes(parsed.protocol) &&
+      IMAGE_PROXY_HOSTS.includes(parsed.hostname)
+    ) {
+      return `/image?url=${encodeURIComponent(url)}&w=${width}`;
+    }
+  } catch (e) {}
+  return url;
+}
+
+function openModal(prog) {
+  const overlay = document.getElementById("modal-overlay");
+  const content = document.getElementById("modal-content");
+
+  document.getElementById("modal-title").innerText = prog.Title;
+  document.getElementById("modal-episode").innerText =
+    prog.EpisodeTitle || "";
+  document.getElementById("modal-desc").innerText =
+    prog.Synopsis || "No description available.";
+
+  // Fix modal time to be local
+  const startDate = new Date(prog.StartTime * 1000);
+  const endDate = new Date(prog.EndTime * 1000);
+  const timeStr =
+    startDate.toLocaleTimeString([], {
+      hour: "2-digit",
+      minute: "2-digit",
+    }) +
+    " - " +
+    endDate.toLocaleTimeString([], {
+      hour: "2-digit",
+      minute: "2-digit",
+    });
+  document.getElementById("modal-time").innerText = timeStr;
+
+  // Duration
+  const minutes = Math.round((prog.EndTime - prog.StartTime) / 60);
+  document.getElementById("modal-duration").innerText = `${minutes} min`;
+
+  // Image (Try ImageURL, fallback to channel logo maybe? Or generic)
+  // HDHomeRun often provides 'ImageURL' at program level if enriched, or 'ThumbnailURL'
+  // We'll use what's passed.
+  const img = document.getElementById("modal-img");
+  if (prog.ImageURL) {
+    img.src = proxiedImage(prog.ImageURL, 480);
+    img.classList.remove("hidden");
+  } else {
+    img.removeAttribute("src");
+    img.classList.add("hidden");
+  }
+
+  overlay.classList.remove("hidden");
+  // Animation
+  setTimeout(() => {
+    content.classList.remove("scale-95", "opacity-0");
+    content.classList.add("scale-100", "opacity-100");
+  }, 10);
+}
+
+// Cards only carry what the grid shows; the modal opens with that and fills
+// in the synopsis and artwork once they arrive
+let detailsRequest = 0;
+
+async function openProgramme(card) {
+  const prog = {
+    GuideNumber: card.dataset.guideNumber,
+    Title: card.dataset.title,
+    EpisodeTitle: card.dataset.episodeTitle || "",
+    StartTime: parseInt(card.dataset.start, 10),
+    EndTime: parseInt(card.dataset.end, 10),
+    Synopsis: "Loading...",
+  };
+  openModal(prog);
+
+  const request = ++detailsRequest;
+  let details = { Synopsis: null };
+  try {
+    const response = await fetch(
+      `/programme/${encodeURIComponent(prog.GuideNumber)}/${prog.StartTime}`,
+    );
+    if (response.ok) details = await response.json();
+  } catch (e) {}
+  // A later click wins
+  if (request === detailsRequest) openModal({ ...prog, ...details });
+}
+
+function closeModal(e) {
+  if (e && e.target.id !== "modal-overlay" && !e.target.closest("button"))
+    return;
+
+  const overlay = document.getElementById("modal-overlay");
+  const content = document.getElementById("modal-content");
+
+  content.classList.remove("scale-100", "opacity-100");
+  content.classList.add("scale-95", "opacity-0");
+
+  setTimeout(() => {
+    overlay.classList.add("hidden");
+  }, 200);
+}
@@ -1,5 +1,24 @@
-from .client import HDHomeRunClient
-from .xmltv import XMLTVGenerator
-from .config import settings
+import importlib
+
+# Public names and the submodule defining them. They are imported on first
+# access so that `import hdhomerun_epg` does not pull in requests, pydantic
+# or timezone detection until they are actually needed.
+_LAZY_ATTRS = {
+    "HDHomeRunClient": ".client",
+    "XMLTVGenerator": ".xmltv",
+    "settings": ".config",
+}
 
 __all__ = ["HDHomeRunClient", "XMLTVGenerator", "settings"]
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Hashable, Iterator, Optional, Tuple
+
+
+class AdmissionGate:
+    """
+    Bounds how many expensive builds run at once. Up to `limit` run, up to
+    `queue` more wait for a slot, and anything beyond that is turned away at
+    once so the caller can answer from a fallback. A limit of 0 admits all.
+    """
+
+    def __init__(self, limit: int = 2, queue: int = 0):
+        self.limit = limit
+        self.queue = queue
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def _enter(self) -> bool:
+        with self._cond:
+            if self.limit <= 0 or self.active < self.limit:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            try:
+                while self.active >= self.limit:
+                    self._cond.wait()
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            return True
+
+    def _leave(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def admit(self) -> Iterator[bool]:
+        """Yields whether the build may run; the slot is freed on exit."""
+        admitted = self._enter()
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self._leave()
+
+
+class LastKnownGood:
+    """
+    The most recent successfully built document per variant, with when it
+    was built, to answer with while new builds are refused or failing.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, content: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (content, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
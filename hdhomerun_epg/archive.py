@@ -0,0 +1,163 @@
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DAY_FILE = re.compile(r"(\d{4}-\d{2}-\d{2})\.db")
+
+
+def day_of(timestamp: int) -> str:
+    """The UTC day a chunk is filed under."""
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+def window_programmes(
+    chunks: Iterable[List[Dict[str, Any]]],
+    start: int,
+    end: int,
+    channels: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Programmes of decoded chunks that aired between `start` and `end`, in
+    airing order, with their channel's GuideNumber and GuideName. Showings
+    found in two overlapping chunks are returned once.
+    """
+    seen = {}
+    for data in chunks:
+        for channel in data:
+            guide_number = str(channel.get("GuideNumber"))
+            if channels and guide_number not in channels:
+                continue
+            for programme in channel.get("Guide", []):
+                if programme.get("StartTime", 0) >= end:
+                    continue
+                if programme.get("EndTime", 0) <= start:
+                    continue
+                seen[(guide_number, programme.get("StartTime"))] = {
+                    "GuideNumber": guide_number,
+                    "GuideName": channel.get("GuideName"),
+                    **programme,
+                }
+    return sorted(seen.values(), key=lambda p: (p["StartTime"], p["GuideNumber"]))
+
+
+class GuideArchive:
+    """
+    Append-only store of past guide chunks, one SQLite file per UTC day.
+    Chunks are kept in the cache's compressed form, written once when they
+    leave the cache, and whole days are dropped by deleting their file, so
+    the archive never needs a vacuum and never touches the hot cache file.
+    """
+
+    def __init__(self, directory: str = "epg_archive", retention_days: int = 0):
+        self.directory = directory
+        self.retention_days = retention_days
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, day: str) -> str:
+        return os.path.join(self.directory, f"{day}.db")
+
+    def _connect(self, day: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._path(day))
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS archived_chunks (
+                start_time INTEGER PRIMARY KEY,
+                end_time INTEGER,
+                data BLOB,
+                fetched_at INTEGER
+            )
+        """)
+        return conn
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Archive chunk records as stored by the cache backends. A chunk that
+        is already archived is kept as it is. Returns the number added.
+        """
+        by_day: Dict[str, List[Tuple]] = {}
+        for record in records:
+            by_day.setdefault(day_of(record["start_time"]), []).append(
+                (
+                    record["start_time"],
+                    record["end_time"],
+                    record["data"],
+                    record["fetched_at"],
+                )
+            )
+
+        added = 0
+        for day, rows in by_day.items():
+            conn = self._connect(day)
+            try:
+                with conn:
+                    before = conn.total_changes
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO archived_chunks (start_time, end_time, data, fetched_at) VALUES (?, ?, ?, ?)",
+                        rows,
+                    )
+                    added += conn.total_changes - before
+            finally:
+                conn.close()
+        return added
+
+    def days(self) -> List[str]:
+        """Archived days, oldest first."""
+        days = []
+        for entry in os.scandir(self.directory):
+            match = _DAY_FILE.fullmatch(entry.name)
+            if match:
+                days.append(match[1])
+        return sorted(days)
+
+    def chunks(self, start: int, end: int) -> Iterator[List[Dict[str, Any]]]:
+        """Decoded archived chunks overlapping `start` to `end`."""
+        # A chunk filed under the previous day may run past midnight
+        first, last = day_of(start - 86400), day_of(end)
+        for day in self.days():
+            if not first <= day <= last:
+                continue
+            conn = sqlite3.connect(self._path(day))
+            try:
+                rows = conn.execute(
+                    "SELECT data FROM archived_chunks WHERE start_time < ? AND end_time > ? ORDER BY start_time",
+                    (end, start),
+                ).fetchall()
+            finally:
+                conn.close()
+            for (data,) in rows:
+                yield json.loads(gzip.decompress(data))
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete days older than `retention_days` (0 = keep all)."""
+        if self.retention_days <= 0:
+            return 0
+        now = time.time() if now is None else now
+        cutoff = day_of(int(now) - self.retention_days * 86400)
+        dropped = 0
+        for day in self.days():
+            if day >= cutoff:
+                break
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                try:
+                    os.unlink(self._path(day) + suffix)
+                except FileNotFoundError:
+                    pass
+            dropped += 1
+        if dropped:
+            logger.info(f"🗄️ Dropped {dropped} archived days")
+        return dropped
+
+    def size_bytes(self) -> int:
+        total = 0
+        for day in self.days():
+            try:
+                total += os.path.getsize(self._path(day))
+            except FileNotFoundError:
+                pass
+        return total
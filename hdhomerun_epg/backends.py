@@ -0,0 +1,617 @@
+import sqlite3
+import logging
+import time
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, List, Any, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Metadata fields stored next to every chunk's compressed data
+CHUNK_FIELDS = ("end_time", "fetched_at", "coverage", "last_accessed", "version")
+
+
+def next_token(
+    arrival: float, now: float, rate_per_second: float, burst: int
+) -> Tuple[float, float]:
+    """
+    Token bucket kept as the time its next token is due (GCRA): a bucket
+    due up to `burst - 1` tokens ahead of `now` still has one to give.
+    Returns the seconds to wait (0 if a token is taken now) and the new
+    due time to store.
+    """
+    interval = 1 / rate_per_second
+    arrival = max(arrival, now)
+    ahead = arrival - now - (max(burst, 1) - 1) * interval
+    if ahead > 0:
+        return ahead, arrival
+    return 0.0, arrival + interval
+
+
+class CacheBackend(ABC):
+    """
+    Storage for compressed EPG chunks, keyed by chunk start time.
+    CacheManager implements caching policy on top of these primitives.
+    """
+
+    @abstractmethod
+    def get(self, start_time: int) -> Optional[Dict[str, Any]]:
+        """Return the chunk record (data + metadata fields) or None."""
+
+    @abstractmethod
+    def put(
+        self,
+        start_time: int,
+        end_time: int,
+        data: bytes,
+        fetched_at: int,
+        coverage: Optional[str],
+        summary: bytes,
+        change_ttl_seconds: int,
+    ) -> int:
+        """
+        Insert or replace a chunk and append `summary` to the change feed, in
+        one transaction. Returns the change's sequence number, which is the
+        chunk's new version.
+        """
+
+    @abstractmethod
+    def update(self, start_time: int, **fields: Any) -> None:
+        """Update metadata fields of an existing chunk."""
+
+    @abstractmethod
+    def delete(self, start_times: Iterable[int]) -> None:
+        """Delete the given chunks."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Delete all chunks."""
+
+    @abstractmethod
+    def list_meta(self) -> List[Dict[str, Any]]:
+        """Metadata (without data) of all chunks, ordered by start time."""
+
+    @abstractmethod
+    def acquire_lease(self, key: str, owner: str, ttl_seconds: int) -> bool:
+        """
+        Take an expiring lease on `key`, or renew it for its current owner.
+        Returns False if someone else holds it.
+        """
+
+    @abstractmethod
+    def release_lease(self, key: str, owner: str) -> None:
+        """Release a lease held by `owner`."""
+
+    @abstractmethod
+    def list_changes(self, since: int, limit: int) -> List[Dict[str, Any]]:
+        """Retained changes with a sequence number above `since`, oldest first."""
+
+    @abstractmethod
+    def latest_change(self) -> int:
+        """Sequence number of the latest change ever recorded (0 if none)."""
+
+    def trim_changes(self, before: int) -> None:
+        """Drop changes recorded before the `before` timestamp."""
+
+    @abstractmethod
+    def incr_counter(self, key: str, ttl_seconds: int) -> int:
+        """Increment an expiring counter, creating it with the TTL. Returns the new value."""
+
+    @abstractmethod
+    def get_counter(self, key: str) -> int:
+        """Current value of a counter (0 if missing or expired)."""
+
+    @abstractmethod
+    def take_token(self, key: str, rate_per_second: float, burst: int) -> float:
+        """
+        Take a token from a bucket shared by everyone using this backend.
+        Returns 0 if one was taken, else the seconds until one is due. The
+        bucket's state is the value `bucket:<key>`.
+        """
+
+    @abstractmethod
+    def get_value(self, key: str) -> Optional[str]:
+        """A small string stored with `set_value`, or None."""
+
+    @abstractmethod
+    def set_value(self, key: str, value: str) -> None:
+        """Store a small string under `key`, replacing any previous one."""
+
+    def vacuum(self, pages: int = 0) -> int:
+        """Reclaim free space. Returns the number of free pages left."""
+        return 0
+
+
+class SQLiteBackend(CacheBackend):
+    """Local SQLite file, one per replica."""
+
+    def __init__(self, db_path: str = "epg_cache.db"):
+        self.db_path = db_path
+        try:
+            self._init_db()
+        except Exception as e:
+            logger.error(f"🚨 Failed to initialize cache DB: {e}")
+
+    def _init_db(self):
+        """Initialize SQLite database and tables."""
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            # Must be set before the first table is created to take effect
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            # Readers don't block the writer, so worker processes sharing the
+            # file can serve requests while one of them saves a chunk
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS epg_chunks (
+                    start_time INTEGER PRIMARY KEY,
+                    end_time INTEGER,
+                    data BLOB,
+                    fetched_at INTEGER
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_end_time ON epg_chunks (end_time)"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_leases (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT,
+                    expires_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_counters (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER,
+                    expires_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_values (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            """)
+            # AUTOINCREMENT so sequence numbers are never reused after trimming
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    start_time INTEGER,
+                    changed_at INTEGER,
+                    summary BLOB
+                )
+            """)
+            # Databases created before the coverage index lack the column
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(epg_chunks)")}
+            if "coverage" not in columns:
+                conn.execute("ALTER TABLE epg_chunks ADD COLUMN coverage TEXT")
+            if "last_accessed" not in columns:
+                conn.execute("ALTER TABLE epg_chunks ADD COLUMN last_accessed INTEGER")
+            if "version" not in columns:
+                conn.execute("ALTER TABLE epg_chunks ADD COLUMN version INTEGER")
+
+            # Databases created without auto_vacuum need one full VACUUM to switch
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                logger.info("🧹 Converting cache DB to incremental auto-vacuum")
+                conn.execute("VACUUM")
+
+    def get(self, start_time: int) -> Optional[Dict[str, Any]]:
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT data, end_time, fetched_at, coverage, last_accessed, version FROM epg_chunks WHERE start_time = ?",
+                (start_time,),
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "start_time": start_time,
+            "data": row[0],
+            **dict(zip(CHUNK_FIELDS, row[1:])),
+        }
+
+    def put(
+        self,
+        start_time,
+        end_time,
+        data,
+        fetched_at,
+        coverage,
+        summary,
+        change_ttl_seconds,
+    ):
+        # One transaction, so the feed never lists a change that was not stored
+        with sqlite3.connect(self.db_path) as conn:
+            version = conn.execute(
+                "INSERT INTO cache_changes (start_time, changed_at, summary) VALUES (?, ?, ?)",
+                (start_time, fetched_at, summary),
+            ).lastrowid
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO epg_chunks (start_time, end_time, data, fetched_at, coverage, last_accessed, version)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (start_time, end_time, data, fetched_at, coverage, fetched_at, version),
+            )
+        return version
+
+    def update(self, start_time: int, **fields: Any) -> None:
+        unknown = set(fields) - set(CHUNK_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown chunk fields: {unknown}")
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                f"UPDATE epg_chunks SET {assignments} WHERE start_time = ?",
+                (*fields.values(), start_time),
+            )
+
+    def delete(self, start_times: Iterable[int]) -> None:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "DELETE FROM epg_chunks WHERE start_time = ?",
+                [(start_time,) for start_time in start_times],
+            )
+
+    def clear(self) -> None:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM epg_chunks")
+
+    def list_meta(self) -> List[Dict[str, Any]]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                "SELECT start_time, length(data), end_time, fetched_at, coverage, last_accessed, version FROM epg_chunks ORDER BY start_time ASC"
+            )
+            return [
+                {
+                    "start_time": row[0],
+                    "size_bytes": row[1],
+                    **dict(zip(CHUNK_FIELDS, row[2:])),
+                }
+                for row in cursor.fetchall()
+            ]
+
+    def acquire_lease(self, key: str, owner: str, ttl_seconds: int) -> bool:
+        now = time.time()
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT owner, expires_at FROM cache_leases WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[0] != owner and row[1] > now:
+                    return False
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (key, owner, now + ttl_seconds),
+                )
+                return True
+            finally:
+                conn.execute("COMMIT")
+
+    def release_lease(self, key: str, owner: str) -> None:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "DELETE FROM cache_leases WHERE key = ? AND owner = ?", (key, owner)
+            )
+
+    def list_changes(self, since: int, limit: int) -> List[Dict[str, Any]]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute(
+                "SELECT seq, start_time, changed_at, summary FROM cache_changes WHERE seq > ? ORDER BY seq ASC LIMIT ?",
+                (since, limit),
+            )
+            return [
+                dict(zip(("seq", "start_time", "changed_at", "summary"), row))
+                for row in cursor.fetchall()
+            ]
+
+    def latest_change(self) -> int:
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'cache_changes'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def trim_changes(self, before: int) -> None:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM cache_changes WHERE changed_at < ?", (before,))
+
+    def incr_counter(self, key: str, ttl_seconds: int) -> int:
+        now = time.time()
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM cache_counters WHERE key = ? AND expires_at <= ?",
+                    (key, now),
+                )
+                conn.execute(
+                    """
+                    INSERT INTO cache_counters (key, value, expires_at) VALUES (?, 1, ?)
+                    ON CONFLICT (key) DO UPDATE SET value = value + 1
+                    """,
+                    (key, now + ttl_seconds),
+                )
+                return conn.execute(
+                    "SELECT value FROM cache_counters WHERE key = ?", (key,)
+                ).fetchone()[0]
+            finally:
+                conn.execute("COMMIT")
+
+    def get_counter(self, key: str) -> int:
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT value FROM cache_counters WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def take_token(self, key: str, rate_per_second: float, burst: int) -> float:
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value FROM cache_values WHERE key = ?", (f"bucket:{key}",)
+                ).fetchone()
+                wait, arrival = next_token(
+                    float(row[0]) if row else 0.0, time.time(), rate_per_second, burst
+                )
+                if not wait:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO cache_values (key, value) VALUES (?, ?)",
+                        (f"bucket:{key}", repr(arrival)),
+                    )
+                return wait
+            finally:
+                conn.execute("COMMIT")
+
+    def get_value(self, key: str) -> Optional[str]:
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT value FROM cache_values WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_value(self, key: str, value: str) -> None:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_values (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+
+    def vacuum(self, pages: int = 0) -> int:
+        with sqlite3.connect(self.db_path, isolation_level=None) as conn:
+            # executescript() steps the pragma to completion, execute() frees one page
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+class RedisBackend(CacheBackend):
+    """
+    Networked key-value store shared by all replicas. Each chunk is a hash
+    under `<prefix>chunk:<start_time>`, indexed by the `<prefix>chunks` set.
+    Changes are expiring hashes under `<prefix>change:<seq>`, numbered by the
+    `<prefix>changes:seq` counter.
+    """
+
+    def __init__(self, url: str, prefix: str = "hdhomerun_epg:"):
+        # Imported here so SQLite-only deployments don't need the client
+        import redis
+
+        # RESP2 keeps us compatible with Redis < 6 and other RESP servers
+        self.client = redis.Redis.from_url(url, protocol=2)
+        self.prefix = prefix
+
+    def _chunk_key(self, start_time: int) -> str:
+        return f"{self.prefix}chunk:{start_time}"
+
+    @property
+    def _index_key(self) -> str:
+        return f"{self.prefix}chunks"
+
+    @staticmethod
+    def _decode_meta(values: List[Optional[bytes]]) -> Dict[str, Any]:
+        end_time, fetched_at, coverage, last_accessed, version = values
+        return {
+            "end_time": int(end_time) if end_time is not None else None,
+            "fetched_at": int(fetched_at) if fetched_at is not None else None,
+            "coverage": coverage.decode("utf-8") if coverage else None,
+            "last_accessed": int(last_accessed) if last_accessed else None,
+            "version": int(version) if version else None,
+        }
+
+    def get(self, start_time: int) -> Optional[Dict[str, Any]]:
+        values = self.client.hmget(self._chunk_key(start_time), ["data", *CHUNK_FIELDS])
+        if values[0] is None:
+            return None
+        return {
+            "start_time": start_time,
+            "data": values[0],
+            **self._decode_meta(values[1:]),
+        }
+
+    def put(
+        self,
+        start_time,
+        end_time,
+        data,
+        fetched_at,
+        coverage,
+        summary,
+        change_ttl_seconds,
+    ):
+        import redis
+
+        seq_key = f"{self.prefix}changes:seq"
+        # WATCH on the counter makes taking the next sequence number, writing
+        # its change and storing the chunk one transaction: a reader never
+        # sees a sequence number whose change is missing
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(seq_key)
+                    seq = int(pipe.get(seq_key) or 0) + 1
+                    change_key = f"{self.prefix}change:{seq}"
+                    pipe.multi()
+                    pipe.set(seq_key, seq)
+                    pipe.hset(
+                        change_key,
+                        mapping={
+                            "start_time": start_time,
+                            "changed_at": fetched_at,
+                            "summary": summary,
+                        },
+                    )
+                    # Redis expires old changes itself, so trim_changes() has nothing to do
+                    pipe.pexpire(change_key, int(change_ttl_seconds * 1000))
+                    pipe.hset(
+                        self._chunk_key(start_time),
+                        mapping={
+                            "data": data,
+                            "end_time": end_time,
+                            "fetched_at": fetched_at,
+                            "last_accessed": fetched_at,
+                            "coverage": coverage or "",
+                            "version": seq,
+                        },
+                    )
+                    pipe.sadd(self._index_key, start_time)
+                    pipe.execute()
+                    return seq
+                except redis.WatchError:
+                    continue  # Another replica took the number, try the next
+
+    def update(self, start_time: int, **fields: Any) -> None:
+        unknown = set(fields) - set(CHUNK_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown chunk fields: {unknown}")
+        if self.client.hmget(self._chunk_key(start_time), ["data"])[0] is not None:
+            self.client.hset(self._chunk_key(start_time), mapping=fields)
+
+    def delete(self, start_times: Iterable[int]) -> None:
+        start_times = list(start_times)
+        if not start_times:
+            return
+        pipe = self.client.pipeline()
+        pipe.delete(*[self._chunk_key(start_time) for start_time in start_times])
+        pipe.srem(self._index_key, *start_times)
+        pipe.execute()
+
+    def clear(self) -> None:
+        self.delete(int(member) for member in self.client.smembers(self._index_key))
+
+    def list_meta(self) -> List[Dict[str, Any]]:
+        start_times = sorted(
+            int(member) for member in self.client.smembers(self._index_key)
+        )
+        pipe = self.client.pipeline()
+        for start_time in start_times:
+            pipe.hmget(self._chunk_key(start_time), list(CHUNK_FIELDS))
+            pipe.hstrlen(self._chunk_key(start_time), "data")
+        results = pipe.execute()
+
+        chunks = []
+        for i, start_time in enumerate(start_times):
+            values, size = results[2 * i], results[2 * i + 1]
+            if values[0] is None:
+                continue  # Deleted between SMEMBERS and HMGET
+            chunks.append(
+                {
+                    "start_time": start_time,
+                    "size_bytes": size,
+                    **self._decode_meta(values),
+                }
+            )
+        return chunks
+
+    def list_changes(self, since: int, limit: int) -> List[Dict[str, Any]]:
+        seqs = range(since + 1, min(self.latest_change(), since + limit) + 1)
+        pipe = self.client.pipeline()
+        for seq in seqs:
+            pipe.hmget(
+                f"{self.prefix}change:{seq}", ["start_time", "changed_at", "summary"]
+            )
+        changes = []
+        for seq, (start_time, changed_at, summary) in zip(seqs, pipe.execute()):
+            if summary is None:
+                continue  # Expired
+            changes.append(
+                {
+                    "seq": seq,
+                    "start_time": int(start_time),
+                    "changed_at": int(changed_at),
+                    "summary": summary,
+                }
+            )
+        return changes
+
+    def latest_change(self) -> int:
+        return int(self.client.get(f"{self.prefix}changes:seq") or 0)
+
+    def incr_counter(self, key: str, ttl_seconds: int) -> int:
+        counter_key = f"{self.prefix}counter:{key}"
+        # One transaction: a new counter never exists without its expiry
+        pipe = self.client.pipeline()
+        pipe.set(counter_key, 0, nx=True, px=int(ttl_seconds * 1000))
+        pipe.incr(counter_key)
+        return pipe.execute()[1]
+
+    def get_counter(self, key: str) -> int:
+        return int(self.client.get(f"{self.prefix}counter:{key}") or 0)
+
+    def take_token(self, key: str, rate_per_second: float, burst: int) -> float:
+        import redis
+
+        bucket_key = f"{self.prefix}value:bucket:{key}"
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(bucket_key)
+                    now = time.time()
+                    wait, arrival = next_token(
+                        float(pipe.get(bucket_key) or 0), now, rate_per_second, burst
+                    )
+                    if wait:
+                        return wait
+                    pipe.multi()
+                    # A bucket due in the past is full, so the key can go then
+                    pipe.set(
+                        bucket_key,
+                        repr(arrival),
+                        px=max(int((arrival - now) * 1000), 1),
+                    )
+                    pipe.execute()
+                    return 0.0
+                except redis.WatchError:
+                    continue  # Another worker took a token, look again
+
+    def get_value(self, key: str) -> Optional[str]:
+        value = self.client.get(f"{self.prefix}value:{key}")
+        return value.decode("utf-8") if value is not None else None
+
+    def set_value(self, key: str, value: str) -> None:
+        self.client.set(f"{self.prefix}value:{key}", value)
+
+    def acquire_lease(self, key: str, owner: str, ttl_seconds: int) -> bool:
+        import redis
+
+        lease_key = f"{self.prefix}lease:{key}"
+        ttl_ms = int(ttl_seconds * 1000)
+        if self.client.set(lease_key, owner, nx=True, px=ttl_ms):
+            return True
+        # The owner renews: WATCH makes checking the owner and re-arming the
+        # expiry atomic, so a lease that changed hands meanwhile is left alone
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(lease_key)
+                if pipe.get(lease_key) != owner.encode("utf-8"):
+                    return False
+                pipe.multi()
+                pipe.pexpire(lease_key, ttl_ms)
+                return bool(pipe.execute()[0])
+            except redis.WatchError:
+                return False
+
+    def release_lease(self, key: str, owner: str) -> None:
+        lease_key = f"{self.prefix}lease:{key}"
+        # Not atomic, but a lease released late simply expires on its own
+        if self.client.get(lease_key) == owner.encode("utf-8"):
+            self.client.delete(lease_key)
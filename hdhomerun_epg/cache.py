@@ -1,35 +1,190 @@
-import sqlite3
 import gzip
+import hashlib
 import json
 import logging
+import os
+import socket
 import time
-from typing import Optional, Dict, List, Any
+import uuid
+from typing import Optional, Dict, Iterable, List, Any
+from .archive import GuideArchive, window_programmes
+from .backends import CacheBackend, SQLiteBackend, RedisBackend
+from .search import SearchIndex
+from .profiling import phase
 
 logger = logging.getLogger(__name__)
 
 
+def plan_chunk_starts(
+    days: int, hours: int, horizon_hours: Optional[int] = None
+) -> List[int]:
+    """
+    Return the aligned chunk start times covering the next `days` days,
+    or only the next `horizon_hours` hours if that is shorter.
+    """
+    # Align time to grid based on chunk size (hours) to maximize cache hits
+    # This converts e.g. 14:53 -> 12:00 (if hours=3) ensuring stable cache keys
+    chunk_seconds = hours * 3600
+    timestamp = int(time.time())
+    aligned_timestamp = timestamp - (timestamp % chunk_seconds)
+    # End with the desired number of days
+    end_timestamp = aligned_timestamp + days * 86400
+    if horizon_hours is not None:
+        end_timestamp = min(end_timestamp, timestamp + horizon_hours * 3600)
+    return list(range(aligned_timestamp, end_timestamp, chunk_seconds))
+
+
+def process_owner() -> str:
+    """Identifies this process when it holds a role lease."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def chunk_coverage(
+    start_times: List[int],
+    covered: Iterable[int],
+    hours: int,
+    horizon_end: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    How far a guide built from the `covered` chunks of a plan reaches:
+    `until` is where its data stops being contiguous from the start, `end`
+    where the full plan would reach, and `complete` whether it gets there.
+    """
+    chunk_seconds = hours * 3600
+    covered = set(covered)
+    end = start_times[-1] + chunk_seconds if start_times else int(time.time())
+    if horizon_end is not None:
+        end = min(end, int(horizon_end))
+    until = start_times[0] if start_times else end
+    for start_time in start_times:
+        if start_time not in covered:
+            break
+        until = start_time + chunk_seconds
+    until = min(until, end)
+    return {"until": until, "end": end, "complete": until >= end}
+
+
+def compute_coverage(
+    start_time: int, end_time: int, data: List[Dict[str, Any]]
+) -> Dict[str, int]:
+    """
+    Compute how many seconds of the window [start_time, end_time) each channel
+    in a chunk covers with programmes. Overlapping programmes are merged.
+    """
+    coverage = {}
+    for channel_segment in data:
+        guide_number = channel_segment.get("GuideNumber")
+        if not guide_number:
+            continue
+
+        intervals = sorted(
+            (max(p["StartTime"], start_time), min(p["EndTime"], end_time))
+            for p in channel_segment.get("Guide", [])
+            if "StartTime" in p and "EndTime" in p
+        )
+        covered = 0
+        cursor = start_time
+        for prog_start, prog_end in intervals:
+            prog_start = max(prog_start, cursor)
+            if prog_end > prog_start:
+                covered += prog_end - prog_start
+                cursor = prog_end
+        coverage[str(guide_number)] = covered
+    return coverage
+
+
+def diff_chunk(
+    old: List[Dict[str, Any]], new: List[Dict[str, Any]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Programme-level differences between two versions of a chunk. Programmes
+    are identified by GuideNumber and StartTime; added and modified entries
+    carry the full new programme, removed entries only the identity.
+    """
+
+    def by_key(data):
+        return {
+            (str(channel.get("GuideNumber")), programme.get("StartTime")): {
+                "GuideNumber": str(channel.get("GuideNumber")),
+                **programme,
+            }
+            for channel in data
+            for programme in channel.get("Guide", [])
+        }
+
+    before, after = by_key(old), by_key(new)
+    return {
+        "added": [after[key] for key in sorted(after.keys() - before.keys())],
+        "removed": [
+            {"GuideNumber": key[0], "StartTime": key[1]}
+            for key in sorted(before.keys() - after.keys())
+        ],
+        "modified": [
+            after[key]
+            for key in sorted(after.keys() & before.keys())
+            if after[key] != before[key]
+        ],
+    }
+
+
+def chunk_version(meta: Dict[str, Any]) -> int:
+    """
+    The content version of a chunk: the change feed sequence number of its
+    last real change. Chunks cached before versioning fall back to fetched_at.
+    """
+    return meta["version"] if meta.get("version") is not None else meta["fetched_at"]
+
+
+EVICTION_POLICIES = ("lru", "time")
+# LRU eviction only needs last_accessed this precise, so most hits don't write
+ACCESS_TOUCH_SECONDS = 600
+
+
 class CacheManager:
-    def __init__(self, db_path: str = "epg_cache.db"):
+    def __init__(
+        self,
+        db_path: str = "epg_cache.db",
+        backend: Optional[CacheBackend] = None,
+        search: Optional[SearchIndex] = None,
+        change_retention_seconds: int = 86400,
+        archive: Optional[GuideArchive] = None,
+    ):
         self.db_path = db_path
-        self._init_db()
-
-    def _init_db(self):
-        """Initialize SQLite database and table."""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    CREATE TABLE IF NOT EXISTS epg_chunks (
-                        start_time INTEGER PRIMARY KEY,
-                        end_time INTEGER,
-                        data BLOB,
-                        fetched_at INTEGER
-                    )
-                """)
-                conn.execute(
-                    "CREATE INDEX IF NOT EXISTS idx_end_time ON epg_chunks (end_time)"
-                )
-        except Exception as e:
-            logger.error(f"🚨 Failed to initialize cache DB: {e}")
+        self.change_retention_seconds = change_retention_seconds
+        # Past chunks are moved here instead of deleted, if set
+        self.archive = archive
+        # Identifies this process when taking refresh leases
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.backend = backend or SQLiteBackend(db_path)
+        self.search = search
+
+    @classmethod
+    def from_settings(cls, settings) -> "CacheManager":
+        """Build the cache with the backend selected in the settings."""
+        if settings.cache_backend == "redis":
+            backend = RedisBackend(
+                settings.cache_redis_url, settings.cache_redis_prefix
+            )
+        elif settings.cache_backend == "sqlite":
+            backend = SQLiteBackend(settings.cache_db_path)
+        else:
+            raise ValueError(f"Unknown cache backend: {settings.cache_backend}")
+        # The search index is always a local SQLite file, even next to Redis
+        search = (
+            SearchIndex(settings.cache_db_path) if settings.search_enabled else None
+        )
+        archive = (
+            GuideArchive(settings.archive_dir, settings.archive_retention_days)
+            if settings.archive_dir
+            else None
+        )
+        return cls(
+            settings.cache_db_path,
+            backend=backend,
+            search=search,
+            change_retention_seconds=settings.change_feed_retention_seconds,
+            archive=archive,
+        )
 
     def get_chunk(
         self, start_time: int, ttl_seconds: int = 86400
@@ -38,88 +193,570 @@ class CacheManager:
         Retrieve a chunk if it exists and is fresh.
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    "SELECT data, fetched_at FROM epg_chunks WHERE start_time = ?",
-                    (start_time,),
-                )
-                row = cursor.fetchone()
+            with phase("cache_io"):
+                record = self.backend.get(start_time)
 
-                if row:
-                    data_blob, fetched_at = row
-                    age = int(time.time()) - fetched_at
+            if record:
+                now = int(time.time())
+                age = now - record["fetched_at"]
 
-                    if age < ttl_seconds:
-                        logger.debug(
-                            f"✅ Cache HIT for chunk {start_time} (Age: {age}s)"
-                        )
-                        decompressed = gzip.decompress(data_blob)
+                if age < ttl_seconds:
+                    logger.debug(f"✅ Cache HIT for chunk {start_time} (Age: {age}s)")
+                    touched = record.get("last_accessed") or 0
+                    if now - touched >= ACCESS_TOUCH_SECONDS:
+                        with phase("cache_io"):
+                            self.backend.update(start_time, last_accessed=now)
+                    with phase("decompress"):
+                        decompressed = gzip.decompress(record["data"])
                         return json.loads(decompressed)
-                    else:
-                        logger.debug(
-                            f"🍂 Cache STALE for chunk {start_time} (Age: {age}s)"
-                        )
-                        return None
+                else:
+                    logger.debug(f"🍂 Cache STALE for chunk {start_time} (Age: {age}s)")
+                    return None
 
-                logger.debug(f"❌ Cache MISS for chunk {start_time}")
-                return None
+            logger.debug(f"❌ Cache MISS for chunk {start_time}")
+            return None
         except Exception as e:
             logger.error(f"🚨 Cache read error: {e}")
             return None
 
-    def save_chunk(self, start_time: int, end_time: int, data: List[Dict[str, Any]]):
+    def save_chunk(
+        self,
+        start_time: int,
+        end_time: int,
+        data: List[Dict[str, Any]],
+        fetched_at: Optional[int] = None,
+    ):
         """
-        Save a chunk to the cache.
+        Save a chunk to the cache. The new data is diffed against the stored
+        chunk: a refresh with identical data only renews fetched_at and keeps
+        the chunk's version, anything else is recorded in the change feed.
+        `fetched_at` defaults to now; imported chunks keep their own.
         """
         try:
-            json_str = json.dumps(data)
-            compressed = gzip.compress(json_str.encode("utf-8"))
-            fetched_at = int(time.time())
+            fetched_at = int(time.time()) if fetched_at is None else int(fetched_at)
+            with phase("cache_io"):
+                old = self.backend.get(start_time)
+            with phase("diff"):
+                old_data = self._decode(old) if old else None
+                unchanged = old_data == data
+                if not unchanged:
+                    changes = diff_chunk(old_data or [], data)
+            if unchanged:
+                with phase("cache_io"):
+                    self.backend.update(
+                        start_time,
+                        end_time=end_time,
+                        fetched_at=fetched_at,
+                        last_accessed=fetched_at,
+                    )
+                logger.debug(f"♻️ Chunk {start_time} refreshed, data unchanged")
+                return
+
+            with phase("compress"):
+                json_str = json.dumps(data)
+                compressed = gzip.compress(json_str.encode("utf-8"))
+                summary = gzip.compress(json.dumps(changes).encode("utf-8"))
+            coverage = json.dumps(compute_coverage(start_time, end_time, data))
 
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute(
-                    """
-                    INSERT OR REPLACE INTO epg_chunks (start_time, end_time, data, fetched_at)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (start_time, end_time, compressed, fetched_at),
+            with phase("cache_io"):
+                version = self.backend.put(
+                    start_time,
+                    end_time,
+                    compressed,
+                    fetched_at,
+                    coverage,
+                    summary,
+                    self.change_retention_seconds,
                 )
-            logger.debug(f"💾 Cached chunk {start_time} to {end_time}")
+            logger.debug(
+                f"💾 Cached chunk {start_time} to {end_time} as version {version} "
+                f"(+{len(changes['added'])} -{len(changes['removed'])} ~{len(changes['modified'])})"
+            )
         except Exception as e:
             logger.error(f"🚨 Cache write error: {e}")
+            return
+
+        if self.search:
+            try:
+                with phase("search_index"):
+                    self.search.index_chunk(start_time, version, data)
+            except Exception as e:
+                logger.error(f"🚨 Search index write error: {e}")
+
+    @staticmethod
+    def _decode(record: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        try:
+            return json.loads(gzip.decompress(record["data"]))
+        except (OSError, ValueError):
+            return None
+
+    def acquire_refresh_lease(self, start_time: int, ttl_seconds: int = 60) -> bool:
+        """
+        Claim the right to refresh a chunk from upstream. Only one replica holds
+        the lease at a time; the others wait for the result to land in the cache.
+        """
+        try:
+            return self.backend.acquire_lease(
+                f"chunk:{start_time}", self.owner, ttl_seconds
+            )
+        except Exception as e:
+            # Never let a broken lease store stop us from fetching
+            logger.error(f"🚨 Cache lease error: {e}")
+            return True
+
+    def release_refresh_lease(self, start_time: int):
+        try:
+            self.backend.release_lease(f"chunk:{start_time}", self.owner)
+        except Exception as e:
+            logger.error(f"🚨 Cache lease error: {e}")
+
+    def acquire_role(self, role: str, ttl_seconds: int) -> bool:
+        """
+        Claim or renew a role that only one process sharing this cache may
+        hold, such as running maintenance. The holder must renew it within
+        `ttl_seconds`, or another process takes over.
+        """
+        try:
+            return self.backend.acquire_lease(
+                f"role:{role}", process_owner(), ttl_seconds
+            )
+        except Exception as e:
+            # Better that nobody runs the job than every worker at once
+            logger.error(f"🚨 Cache lease error: {e}")
+            return False
+
+    def release_role(self, role: str):
+        try:
+            self.backend.release_lease(f"role:{role}", process_owner())
+        except Exception as e:
+            logger.error(f"🚨 Cache lease error: {e}")
+
+    def wait_for_chunk(
+        self, start_time: int, ttl_seconds: int, timeout: float, interval: float = 0.5
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Poll for a fresh chunk that another replica is refreshing."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            chunk = self.get_chunk(start_time, ttl_seconds)
+            if chunk is not None:
+                return chunk
+        return None
 
     def clear_cache(self):
-        """Clear all cached data."""
+        """
+        Clear all cached data. Freed pages are reclaimed later by
+        incremental_vacuum() so clearing never blocks on a full VACUUM.
+        """
         try:
-            # internal connection to allow VACUUM (cannot run in transaction)
-            with sqlite3.connect(self.db_path, isolation_level=None) as conn:
-                conn.execute("DELETE FROM epg_chunks")
-                conn.execute("VACUUM")
+            self.backend.clear()
+            if self.search:
+                self.search.clear()
             logger.info("🗑️ Cache cleared successfully")
         except Exception as e:
             logger.error(f"🚨 Error clearing cache: {e}")
             raise
 
+    def incremental_vacuum(self, pages: int = 0) -> int:
+        """
+        Return up to `pages` free pages to the filesystem (0 = all of them).
+        Returns the number of free pages left.
+        """
+        try:
+            return self.backend.vacuum(pages)
+        except Exception as e:
+            logger.error(f"🚨 Error vacuuming cache: {e}")
+            return 0
+
+    def enforce_retention(
+        self,
+        retention_seconds: int,
+        max_bytes: int = 0,
+        policy: str = "lru",
+    ) -> int:
+        """
+        Delete chunks that ended more than `retention_seconds` ago, then evict
+        chunks until the cached data fits in `max_bytes` (0 = no size limit).
+        Past chunks are evicted first, ordered by last access ("lru") or by
+        end time ("time"). Deleted chunks that have ended go to the archive
+        first, if there is one. Returns the number of deleted chunks.
+        """
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}")
+
+        now = int(time.time())
+        try:
+            chunks = self.backend.list_meta()
+            expired = [c for c in chunks if c["end_time"] < now - retention_seconds]
+            evict = [c["start_time"] for c in expired]
+
+            if max_bytes > 0:
+                remaining = [c for c in chunks if c not in expired]
+                field = "last_accessed" if policy == "lru" else "end_time"
+                remaining.sort(
+                    key=lambda c: (
+                        c["end_time"] >= now,
+                        c["fetched_at"] if c[field] is None else c[field],
+                    )
+                )
+                total = sum(c["size_bytes"] for c in remaining)
+                for chunk in remaining:
+                    if total <= max_bytes:
+                        break
+                    evict.append(chunk["start_time"])
+                    total -= chunk["size_bytes"]
+
+            if self.archive:
+                evicted = set(evict)
+                self._archive_chunks(
+                    c["start_time"]
+                    for c in chunks
+                    if c["start_time"] in evicted and c["end_time"] <= now
+                )
+            self.backend.delete(evict)
+            if self.search:
+                self.search.remove_chunks(evict)
+            if evict:
+                logger.info(f"🧹 Evicted {len(evict)} cached chunks")
+            return len(evict)
+        except Exception as e:
+            logger.error(f"🚨 Error enforcing cache retention: {e}")
+            return 0
+
+    def _archive_chunks(self, start_times: Iterable[int]) -> int:
+        records = [self.backend.get(start_time) for start_time in start_times]
+        archived = self.archive.append(record for record in records if record)
+        if archived:
+            logger.info(f"🗄️ Archived {archived} past chunks")
+        return archived
+
+    def run_maintenance(
+        self,
+        retention_seconds: int,
+        max_bytes: int = 0,
+        policy: str = "lru",
+        vacuum_pages: int = 0,
+    ) -> Dict[str, int]:
+        """
+        Apply retention and eviction, bring a search index stored with the
+        cache in line with it, then incrementally vacuum freed pages. An
+        index of this replica's own is synced by every replica instead, see
+        search_is_local.
+        """
+        evicted = self.enforce_retention(retention_seconds, max_bytes, policy)
+        try:
+            self.backend.trim_changes(int(time.time()) - self.change_retention_seconds)
+        except Exception as e:
+            logger.error(f"🚨 Error trimming change feed: {e}")
+        if self.archive:
+            try:
+                self.archive.prune()
+            except Exception as e:
+                logger.error(f"🚨 Error pruning guide archive: {e}")
+        indexed = 0 if self.search_is_local else self.sync_search_index()
+        free_pages = self.incremental_vacuum(vacuum_pages)
+        return {"evicted": evicted, "indexed": indexed, "free_pages": free_pages}
+
+    @property
+    def search_is_local(self) -> bool:
+        """
+        Whether the search index is a local file next to a shared cache, so
+        each replica has to index chunks saved by the others itself.
+        """
+        return self.search is not None and not isinstance(self.backend, SQLiteBackend)
+
+    def sync_search_index(self) -> int:
+        """
+        Index chunks the search index has not seen at their current version,
+        such as chunks cached before search existed or saved by another
+        replica, and drop chunks that left the cache. Returns the number of
+        chunks (re)indexed.
+        """
+        if not self.search:
+            return 0
+        try:
+            cached = {
+                meta["start_time"]: chunk_version(meta)
+                for meta in self.backend.list_meta()
+            }
+            indexed = self.search.indexed_versions()
+            self.search.remove_chunks(set(indexed) - set(cached))
+            stale = [
+                start_time
+                for start_time, version in cached.items()
+                if indexed.get(start_time) != version
+            ]
+            for start_time in stale:
+                record = self.backend.get(start_time)
+                if record:
+                    chunk = json.loads(gzip.decompress(record["data"]))
+                    self.search.index_chunk(start_time, chunk_version(record), chunk)
+            if stale:
+                logger.info(f"🔎 Indexed {len(stale)} cached chunks for search")
+            return len(stale)
+        except Exception as e:
+            logger.error(f"🚨 Error syncing search index: {e}")
+            return 0
+
+    def search_programmes(
+        self,
+        text: str,
+        channels: Optional[List[str]] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """Upcoming and airing programmes matching `text`, in airing order."""
+        if not self.search:
+            return []
+        return self.search.search(
+            text, after=int(time.time()), channels=channels, limit=limit
+        )
+
+    def get_history(
+        self,
+        start: int,
+        end: int,
+        channels: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Programmes that aired between `start` and `end`, from the archive
+        and from past chunks still in the cache.
+        """
+        chunks = []
+        if self.archive:
+            chunks.extend(self.archive.chunks(start, end))
+        for meta in self.backend.list_meta():
+            if meta["start_time"] < end and meta["end_time"] > start:
+                record = self.backend.get(meta["start_time"])
+                data = self._decode(record) if record else None
+                if data:
+                    chunks.append(data)
+        return window_programmes(chunks, start, end, channels)
+
+    def get_coverage(
+        self, start_times: Optional[List[int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the coverage index of cached chunks, optionally restricted to the
+        given chunk start times. Each entry maps GuideNumber to covered seconds.
+        """
+        try:
+            wanted = set(start_times) if start_times is not None else None
+            entries = []
+            for meta in self.backend.list_meta():
+                start_time = meta["start_time"]
+                if wanted is not None and start_time not in wanted:
+                    continue
+                if not meta["coverage"]:
+                    # Chunk cached before the index existed, build it now
+                    record = self.backend.get(start_time)
+                    chunk = json.loads(gzip.decompress(record["data"]))
+                    channels = compute_coverage(start_time, meta["end_time"], chunk)
+                    self.backend.update(start_time, coverage=json.dumps(channels))
+                else:
+                    channels = json.loads(meta["coverage"])
+                entries.append(
+                    {
+                        "start_time": start_time,
+                        "end_time": meta["end_time"],
+                        "fetched_at": meta["fetched_at"],
+                        "channels": channels,
+                    }
+                )
+            return entries
+        except Exception as e:
+            logger.error(f"🚨 Error reading cache coverage: {e}")
+            return []
+
+    def get_horizon_coverage(
+        self, start_times: List[int], hours: int, ttl_seconds: int = 86400
+    ) -> Dict[str, Any]:
+        """
+        How far into the planned horizon the cache can answer without an
+        upstream fetch: chunk_coverage() over the chunks that are fresh.
+        """
+        now = int(time.time())
+        try:
+            fresh = [
+                meta["start_time"]
+                for meta in self.backend.list_meta()
+                if now - meta["fetched_at"] < ttl_seconds
+            ]
+        except Exception as e:
+            logger.error(f"🚨 Error reading cache coverage: {e}")
+            fresh = []
+        return chunk_coverage(start_times, fresh, hours)
+
+    def find_gaps(
+        self,
+        start_times: List[int],
+        expected_channels: Optional[List[str]] = None,
+        tolerance_seconds: int = 60,
+    ) -> List[Dict[str, Any]]:
+        """
+        Find chunk windows with holes: channels missing from a chunk, channels
+        whose programmes do not cover the whole window, or chunks not cached at all.
+        When expected_channels is not given, every channel seen in any of the
+        chunks is expected in all of them.
+        """
+        coverage = {c["start_time"]: c for c in self.get_coverage(start_times)}
+        if expected_channels is None:
+            expected = set()
+            for entry in coverage.values():
+                expected.update(entry["channels"])
+        else:
+            expected = {str(gn) for gn in expected_channels}
+
+        gaps = []
+        for start_time in sorted(start_times):
+            entry = coverage.get(start_time)
+            if entry is None:
+                gaps.append({"start_time": start_time, "reason": "missing"})
+                continue
+
+            window = entry["end_time"] - entry["start_time"]
+            missing = sorted(expected - set(entry["channels"]))
+            partial = sorted(
+                gn
+                for gn, covered in entry["channels"].items()
+                if gn in expected and covered < window - tolerance_seconds
+            )
+            if missing or partial:
+                gaps.append(
+                    {
+                        "start_time": start_time,
+                        "end_time": entry["end_time"],
+                        "fetched_at": entry["fetched_at"],
+                        "reason": "holes",
+                        "missing_channels": missing,
+                        "partial_channels": partial,
+                    }
+                )
+        return gaps
+
+    def get_versions(self, start_times: List[int]) -> Dict[int, int]:
+        """
+        Return the content version of each cached chunk among `start_times`.
+        It only changes when a refresh actually changed the chunk's data.
+        """
+        wanted = set(start_times)
+        try:
+            with phase("cache_io"):
+                return {
+                    meta["start_time"]: chunk_version(meta)
+                    for meta in self.backend.list_meta()
+                    if meta["start_time"] in wanted
+                }
+        except Exception as e:
+            logger.error(f"🚨 Error reading chunk versions: {e}")
+            return {}
+
+    def get_signature(
+        self, start_times: List[int], ttl_seconds: int = 86400
+    ) -> Optional[str]:
+        """
+        Identify the cached data behind the given chunks without decoding them.
+        Returns None unless every chunk is cached and fresh, since a document
+        built now would then include freshly fetched data.
+        """
+        try:
+            now = int(time.time())
+            with phase("cache_io"):
+                chunks = {meta["start_time"]: meta for meta in self.backend.list_meta()}
+            parts = []
+            for start_time in start_times:
+                meta = chunks.get(start_time)
+                if meta is None or now - meta["fetched_at"] >= ttl_seconds:
+                    return None
+                parts.append(f"{start_time}:{chunk_version(meta)}")
+            return hashlib.sha1(",".join(parts).encode("utf-8")).hexdigest()
+        except Exception as e:
+            logger.error(f"🚨 Error computing cache signature: {e}")
+            return None
+
+    def increment_counter(self, key: str, ttl_seconds: int) -> int:
+        """Count an event in a counter shared with every replica using this cache."""
+        try:
+            return self.backend.incr_counter(key, ttl_seconds)
+        except Exception as e:
+            logger.error(f"🚨 Error updating counter {key}: {e}")
+            return 0
+
+    def get_counter(self, key: str) -> int:
+        try:
+            return self.backend.get_counter(key)
+        except Exception as e:
+            logger.error(f"🚨 Error reading counter {key}: {e}")
+            return 0
+
+    def get_value(self, key: str) -> Optional[str]:
+        """A small string shared with every replica using this cache."""
+        try:
+            return self.backend.get_value(key)
+        except Exception as e:
+            logger.error(f"🚨 Error reading {key}: {e}")
+            return None
+
+    def set_value(self, key: str, value: str) -> None:
+        try:
+            self.backend.set_value(key, value)
+        except Exception as e:
+            logger.error(f"🚨 Error storing {key}: {e}")
+
+    def take_token(
+        self, key: str, rate_per_second: float, burst: int
+    ) -> Optional[float]:
+        """
+        Take a token from a rate limit shared with every replica using this
+        cache. Returns 0 if taken, the seconds until the next one is due, or
+        None if the cache could not be reached.
+        """
+        try:
+            return self.backend.take_token(key, rate_per_second, burst)
+        except Exception as e:
+            logger.error(f"🚨 Error taking a {key} token: {e}")
+            return None
+
+    def get_changes(self, since: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """
+        Programme-level changes recorded after sequence number `since`.
+        `version` is the latest sequence number, to pass as `since` next time.
+        `truncated` means changes after `since` have already been trimmed and
+        the consumer should reload the full guide.
+        """
+        version = self.backend.latest_change()
+        changes = [
+            {
+                "seq": change["seq"],
+                "start_time": change["start_time"],
+                "changed_at": change["changed_at"],
+                **json.loads(gzip.decompress(change["summary"])),
+            }
+            for change in self.backend.list_changes(since, limit)
+            # Recorded after `version` was read; they come with the next call
+            if change["seq"] <= version
+        ]
+        if len(changes) == limit:
+            # More may follow; resume after the last one returned
+            version = changes[-1]["seq"]
+        truncated = version > since and (not changes or changes[0]["seq"] > since + 1)
+        return {"version": version, "truncated": truncated, "changes": changes}
+
     def get_status(self) -> List[Dict[str, Any]]:
         """
         Get status of all cached chunks.
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    "SELECT start_time, end_time, length(data), fetched_at FROM epg_chunks ORDER BY start_time ASC"
-                )
-                chunks = []
-                for row in cursor.fetchall():
-                    chunks.append(
-                        {
-                            "start_time": row[0],
-                            "end_time": row[1],
-                            "size_bytes": row[2],
-                            "fetched_at": row[3],
-                        }
-                    )
-                return chunks
+            return [
+                {
+                    "start_time": meta["start_time"],
+                    "end_time": meta["end_time"],
+                    "size_bytes": meta["size_bytes"],
+                    "fetched_at": meta["fetched_at"],
+                    "last_accessed": meta["last_accessed"],
+                    "version": meta["version"],
+                }
+                for meta in self.backend.list_meta()
+            ]
         except Exception as e:
             logger.error(f"🚨 Error getting cache status: {e}")
             return []
@@ -0,0 +1,203 @@
+import argparse
+import logging
+import os
+import sys
+from typing import List, Optional
+
+from .cache import CacheManager, plan_chunk_starts
+from .config import settings
+from .filters import EPGFilter
+from .profiling import phase, recording
+
+logger = logging.getLogger("hdhomerun_epg.cli")
+
+COMMANDS = ("generate", "export-snapshot", "import-snapshot")
+
+
+def _version_path(output: str) -> str:
+    return output + ".version"
+
+
+def _read_version(output: str) -> Optional[str]:
+    try:
+        with open(_version_path(output), encoding="utf-8") as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+def _write_version(output: str, version: str) -> None:
+    # Written after the document, so a crash in between only causes a rewrite
+    tmp_path = _version_path(output) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        fh.write(version)
+    os.replace(tmp_path, _version_path(output))
+
+
+class _FetchFailed(Exception):
+    """The guide fetch stopped early, so the document would be truncated."""
+
+
+def _checked(stream):
+    """The stream's programmes, raising once they run out if fetching failed."""
+    yield from stream
+    if stream.error:
+        raise _FetchFailed(stream.error)
+
+
+def _document_version(epg_filter: EPGFilter, signature: Optional[str]) -> Optional[str]:
+    # The version combines the request options with the cached chunk versions
+    if not signature:
+        return None
+    images = settings.image_proxy_base_url if settings.image_proxy_enabled else ""
+    return f"{epg_filter.cache_key()};images={images};chunks={signature}"
+
+
+def generate(args: argparse.Namespace) -> int:
+    """Write the XMLTV file, skipping the work if the cached data is unchanged."""
+    with recording() as recorder:
+        return _generate(args, recorder)
+
+
+def _generate(args: argparse.Namespace, recorder) -> int:
+    epg_filter = EPGFilter(
+        channels=frozenset(args.channels.split(",")) if args.channels else None,
+        favorites_only=args.favorites,
+        hours=args.horizon_hours,
+    )
+    with phase("plan"):
+        start_times = plan_chunk_starts(args.days, args.chunk_hours, epg_filter.hours)
+
+    cache = CacheManager.from_settings(settings) if settings.cache_enabled else None
+    with phase("check"):
+        signature = (
+            cache.get_signature(start_times, settings.cache_ttl_seconds)
+            if cache
+            else None
+        )
+        version = _document_version(epg_filter, signature)
+        up_to_date = (
+            not args.force
+            and version is not None
+            and os.path.exists(args.output)
+            and _read_version(args.output) == version
+        )
+
+    if up_to_date:
+        logger.info(f"✅ {args.output} is up to date ({recorder.summary()})")
+        return 0
+
+    # requests and the renderer are only imported once there is work to do
+    from .client import HDHomeRunClient
+    from .xmltv import XMLTVGenerator
+
+    with phase("fetch"):
+        client = HDHomeRunClient(host=args.host)
+        stream = client.stream_epg_data(
+            days=args.days, hours=args.chunk_hours, epg_filter=epg_filter
+        )
+        # Channels have to be written first, before the stream is consumed
+        epg_data = {
+            "channels": stream.listed_channels(),
+            "programmes": _checked(stream),
+        }
+
+    # Icons only point at the proxy if we know where it is reachable
+    image_proxy_url = None
+    if settings.image_proxy_enabled and settings.image_proxy_base_url:
+        image_proxy_url = settings.image_proxy_base_url
+
+    with phase("write"):
+        from .images import proxy_hosts
+
+        try:
+            XMLTVGenerator(
+                args.output,
+                image_proxy_url=image_proxy_url,
+                image_proxy_hosts=proxy_hosts(),
+            ).write_to_file(epg_data)
+        except _FetchFailed as e:
+            # The temporary file is dropped and the previous guide stays
+            logger.error(f"🚨 Fetch failed, keeping the existing {args.output}: {e}")
+            return 1
+
+    # Chunks fetched just now are part of the file, so take the signature again
+    if cache:
+        signature = cache.get_signature(start_times, settings.cache_ttl_seconds)
+        version = _document_version(epg_filter, signature)
+        if version:
+            _write_version(args.output, version)
+
+    logger.info(
+        f"💾 Wrote {stream.programme_count} programmes to {args.output} ({recorder.summary()})"
+    )
+    return 0
+
+
+def export_snapshot(args: argparse.Namespace) -> int:
+    """Write the cache's unexpired chunks to a snapshot file."""
+    from .snapshot import save_snapshot
+
+    save_snapshot(CacheManager.from_settings(settings), args.output)
+    return 0
+
+
+def import_snapshot(args: argparse.Namespace) -> int:
+    """Load a snapshot file or a peer's /snapshot into the cache."""
+    from .snapshot import SnapshotError, load_snapshot
+
+    try:
+        load_snapshot(CacheManager.from_settings(settings), args.source)
+    except (SnapshotError, OSError) as e:
+        logger.error(f"🚨 Could not import {args.source}: {e}")
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m hdhomerun_epg",
+        description="Fetch the HDHomeRun guide and write it as XMLTV.",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    gen = subparsers.add_parser("generate", help="Write the XMLTV file (default)")
+    gen.add_argument("-o", "--output", default=settings.output_filename)
+    gen.add_argument("--host", default=settings.host)
+    gen.add_argument("--days", type=int, default=settings.epg_days)
+    gen.add_argument("--chunk-hours", type=int, default=settings.epg_hours)
+    gen.add_argument("--channels", help="Comma-separated GuideNumbers to include")
+    gen.add_argument("--favorites", action="store_true", help="Only favorites")
+    gen.add_argument("--horizon-hours", type=int, help="Only the next N hours")
+    gen.add_argument(
+        "--force", action="store_true", help="Rewrite even if nothing changed"
+    )
+    gen.set_defaults(func=generate)
+
+    export = subparsers.add_parser(
+        "export-snapshot", help="Save the cache to a snapshot file"
+    )
+    export.add_argument("-o", "--output", default="epg_snapshot.tar")
+    export.set_defaults(func=export_snapshot)
+
+    load = subparsers.add_parser(
+        "import-snapshot", help="Warm the cache from a snapshot file or URL"
+    )
+    load.add_argument("source", help="Snapshot path or http(s)://host/snapshot")
+    load.set_defaults(func=import_snapshot)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    # `generate` is the default command, so plain options work for cron lines
+    if not argv or argv[0] not in COMMANDS:
+        argv = ["generate", *argv]
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if settings.debug_mode == "on" else logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    return args.func(args)
@@ -1,17 +1,31 @@
 import datetime
 import logging
+import time
 import requests
 import urllib3
 import pytz
-from typing import List, Dict, Optional, Any
+from typing import Any, Dict, Iterator, List, Optional
 from .config import settings
-from .cache import CacheManager
+from .cache import CacheManager, chunk_coverage, plan_chunk_starts
+from .filters import EPGFilter
+from .profiling import phase
+from .ratelimit import UpstreamDeferred, get_upstream_limiter
 
 # Suppress only the single warning from urllib3 needed.
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
+# When this process last read the lineup from the tuner
+lineup_fetched_at: Optional[float] = None
+
+
+def lineup_age() -> Optional[float]:
+    """Seconds since the tuner last answered, None if it never has."""
+    if lineup_fetched_at is None:
+        return None
+    return time.time() - lineup_fetched_at
+
 
 class HDHomeRunClient:
     def __init__(self, host: str):
@@ -23,9 +37,10 @@ class HDHomeRunClient:
         logger.info("🔍 Fetching HDHomeRun Web API Device Auth")
         try:
             url = f"http://{self.host}/discover.json"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            with phase("discovery"):
+                response = requests.get(url, timeout=10)
+                response.raise_for_status()
+                data = response.json()
 
             if "DeviceAuth" in data:
                 self.device_auth = data["DeviceAuth"]
@@ -44,47 +59,162 @@ class HDHomeRunClient:
 
     def fetch_channels(self) -> List[Dict[str, Any]]:
         """Fetch EPG channels from HDHomeRun device."""
+        global lineup_fetched_at
         if not self.device_auth:
             self.discover_device_auth()
 
         logger.info(f"📺 Fetching HDHomeRun Web API Lineup for auth {self.device_auth}")
         url = f"http://{self.host}/lineup.json"
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            with phase("lineup"):
+                response = requests.get(url, timeout=10)
+                response.raise_for_status()
+                lineup = response.json()
         except Exception as e:
             logger.error(f"🚨 Error fetching channels: {e}")
             raise
+        lineup_fetched_at = time.time()
+        return lineup
+
+    def _guide_url(self) -> str:
+        return f"https://api.hdhomerun.com/api/guide.php?DeviceAuth={self.device_auth}"
+
+    def plan_chunks(
+        self, days: int, hours: int, horizon_hours: Optional[int] = None
+    ) -> List[int]:
+        """
+        Return the aligned chunk start times covering the next `days` days,
+        or only the next `horizon_hours` hours if that is shorter.
+        """
+        return plan_chunk_starts(days, hours, horizon_hours)
+
+    def _fetch_segment(
+        self,
+        session: requests.Session,
+        start_time: int,
+        hours: int,
+        cache: Optional[CacheManager],
+        background: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch one chunk from the HDHomeRun API and store it in the cache.
+        Raises UpstreamDeferred if the upstream rate limit or budget says no.
+        """
+        get_upstream_limiter().acquire(start_time, cache, background)
+        fetch_url = f"{self._guide_url()}&Start={start_time}"
+        try:
+            # Legacy script used ssl._create_unverified_context(), so we disable verification to match behavior.
+            # Also HDHomeRun API seems to be picky about User-Agent or SSL specifics sometimes?
+            # We will try to mimic a standard request but disabling verification is key if they use legacy certs.
+            with phase("upstream_fetch"):
+                response = session.get(fetch_url, timeout=30, verify=False)
+                response.raise_for_status()
+                epg_segment = response.json()
+        except requests.RequestException as e:
+            logger.error(f"🚨 Request failed for {fetch_url}: {e}")
+            if hasattr(e, "response") and e.response is not None:
+                logger.error(f"🚨 Response Body: {e.response.text}")
+            raise e
+
+        # Save to cache if enabled
+        if cache:
+            cache.save_chunk(start_time, start_time + hours * 3600, epg_segment)
+        return epg_segment
+
+    def _refresh_segment(
+        self,
+        session: requests.Session,
+        start_time: int,
+        hours: int,
+        cache: Optional[CacheManager],
+        background: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch a chunk unless another replica sharing the cache is already
+        refreshing it, in which case wait for its result instead.
+        """
+        if not cache:
+            return self._fetch_segment(session, start_time, hours, cache, background)
+
+        if not cache.acquire_refresh_lease(start_time, settings.cache_lease_seconds):
+            logger.info(f"⏳ Chunk {start_time} is being refreshed elsewhere, waiting")
+            epg_segment = cache.wait_for_chunk(
+                start_time,
+                settings.cache_ttl_seconds,
+                settings.cache_lease_wait_seconds,
+            )
+            if epg_segment is not None:
+                return epg_segment
+            logger.warning(f"⌛ Gave up waiting for chunk {start_time}, fetching")
 
-    def fetch_epg_data(self, days: int, hours: int) -> Dict[str, Any]:
-        """Fetch EPG data for a specific channel via POST to HDHomeRun API."""
+        try:
+            return self._fetch_segment(session, start_time, hours, cache, background)
+        finally:
+            cache.release_refresh_lease(start_time)
+
+    def fetch_epg_data(
+        self,
+        days: int,
+        hours: int,
+        epg_filter: Optional[EPGFilter] = None,
+        fetch_hours: Optional[int] = None,
+        background: bool = False,
+        lazy: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Fetch EPG data for a specific channel via POST to HDHomeRun API.
+        An optional filter limits the channels and the time horizon; chunks
+        beyond the horizon are neither read from the cache nor fetched.
+
+        Chunks are processed nearest to now first. With `fetch_hours`, only
+        chunks starting within that many hours are fetched upstream; later
+        ones come from the cache, stale if need be, or are left out. The
+        result's "coverage" says up to when the guide is contiguous.
+
+        With `lazy`, "programmes" is an EPGStream to be consumed once, while
+        "channels" fills in and "coverage" is added as it is consumed. An
+        "error" is included if fetching stopped early.
+        """
+        stream = self.stream_epg_data(
+            days, hours, epg_filter, fetch_hours=fetch_hours, background=background
+        )
+        if lazy:
+            return stream.as_epg_data()
+        programmes = list(stream)
+        epg_data = {
+            "channels": stream.channels,
+            "programmes": programmes,
+            "coverage": stream.coverage,
+        }
+        if stream.error:
+            epg_data["error"] = stream.error
+        return epg_data
+
+    def stream_epg_data(
+        self,
+        days: int,
+        hours: int,
+        epg_filter: Optional[EPGFilter] = None,
+        fetch_hours: Optional[int] = None,
+        background: bool = False,
+    ) -> "EPGStream":
+        """
+        Like fetch_epg_data, but programmes are produced one chunk at a time
+        as the stream is iterated, so only one decoded chunk is in memory.
+        """
         if not self.device_auth:
             self.discover_device_auth()
 
-        channels = self.fetch_channels()
+        epg_filter = epg_filter or EPGFilter()
+        channels = [
+            ch for ch in self.fetch_channels() if epg_filter.matches_channel(ch)
+        ]
         cache = None
         if settings.cache_enabled:
-            cache = CacheManager(settings.cache_db_path)
+            cache = CacheManager.from_settings(settings)
         else:
             logger.info("⚠️ Caching is DISABLED via configuration.")
 
-        epg_data = {"channels": [], "programmes": []}
-
-        url = f"https://api.hdhomerun.com/api/guide.php?DeviceAuth={self.device_auth}"
-
-        # Start with the now
-        now = datetime.datetime.now(pytz.UTC)
-
-        # Align time to grid based on chunk size (hours) to maximize cache hits
-        # This converts e.g. 14:53 -> 12:00 (if hours=3) ensuring stable cache keys
-        chunk_seconds = hours * 3600
-        timestamp = now.timestamp()
-        aligned_timestamp = timestamp - (timestamp % chunk_seconds)
-        next_start_date = datetime.datetime.fromtimestamp(
-            aligned_timestamp, tz=pytz.UTC
-        )
-
         # Log device auth used (partially masked for security)
         masked_auth = (
             self.device_auth[:4] + "***" + self.device_auth[-4:]
@@ -92,129 +222,283 @@ class HDHomeRunClient:
             else "***"
         )
         logger.info(f"🚀 Fetching EPG using DeviceAuth: {masked_auth}")
-        # End with the desired number of days
-        end_time = next_start_date + datetime.timedelta(days=days)
 
-        # Requests session for efficiency
+        return EPGStream(
+            self,
+            channels,
+            self.plan_chunks(days, hours, epg_filter.hours),
+            hours,
+            cache,
+            horizon_hours=epg_filter.hours,
+            fetch_hours=fetch_hours,
+            background=background,
+        )
+
+    def _load_segment(
+        self,
+        session: requests.Session,
+        start_time: int,
+        hours: int,
+        cache: Optional[CacheManager],
+        fetch_end: Optional[float],
+        background: bool,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        One chunk from the cache or upstream. Returns None if it may not be
+        fetched now and there is no cached copy to fall back to.
+        """
+        next_start_date = datetime.datetime.fromtimestamp(start_time, tz=pytz.UTC)
+        logger.debug(f"📅 Fetching EPG for all channels starting {next_start_date}")
+
+        epg_segment = None
+        if cache:
+            epg_segment = cache.get_chunk(start_time, settings.cache_ttl_seconds)
+
+        if epg_segment:
+            logger.info(f"✅ Cache hit for {next_start_date} (Key: {start_time}).")
+            return epg_segment
+
+        if fetch_end is not None and start_time >= fetch_end:
+            # Beyond what this call may fetch: serve what we have
+            if cache:
+                return cache.get_chunk(start_time, ttl_seconds=float("inf"))
+            return None
+
+        if cache:
+            logger.info(
+                f"❌ Cache miss or stale for {next_start_date}. Fetching from API."
+            )
+        else:
+            logger.info(f"📡 Fetching {next_start_date} from API (Cache Disabled).")
+        try:
+            return self._refresh_segment(session, start_time, hours, cache, background)
+        except UpstreamDeferred as e:
+            # Serve the stale copy, if any, rather than nothing
+            logger.warning(f"🚦 Deferred fetch of {next_start_date}: {e}")
+            if cache:
+                return cache.get_chunk(start_time, ttl_seconds=float("inf"))
+            return None
+
+    def fetch_chunk(
+        self, start_time: int, hours: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        One raw chunk, from the cache if enabled and fresh, else upstream.
+        Returns None if it may not be fetched now and nothing is cached.
+        """
+        cache = None
+        if settings.cache_enabled:
+            cache = CacheManager.from_settings(settings)
+        if not self.device_auth:
+            self.discover_device_auth()
         session = requests.Session()
         try:
-            while next_start_date < end_time:
-                url_start_date = int(next_start_date.timestamp())
-                fetch_url = f"{url}&Start={url_start_date}"
+            return self._load_segment(session, start_time, hours, cache, None, False)
+        finally:
+            session.close()
+
+    def backfill_gaps(self, days: int, hours: int) -> Dict[str, Any]:
+        """
+        Re-fetch only the cached chunk windows that have holes (missing channels
+        or periods without programmes) instead of re-downloading the horizon.
+        """
+        cache = CacheManager.from_settings(settings)
+        gaps = cache.find_gaps(
+            self.plan_chunks(days, hours),
+            tolerance_seconds=settings.coverage_tolerance_seconds,
+        )
 
-                logger.debug(
-                    f"📅 Fetching EPG for all channels starting {next_start_date}"
-                )
+        # Windows re-fetched recently keep their holes: upstream has nothing better yet
+        now = int(datetime.datetime.now(pytz.UTC).timestamp())
+        gaps = [
+            gap
+            for gap in gaps
+            if now - gap.get("fetched_at", 0) >= settings.backfill_min_age_seconds
+        ]
 
-                epg_segment = None
-                if cache:
-                    epg_segment = cache.get_chunk(
-                        url_start_date, settings.cache_ttl_seconds
-                    )
+        result = {"refetched": [], "failed": []}
+        if not gaps:
+            logger.info("✅ No gaps found in cached EPG data")
+            return result
 
-                if not epg_segment:
-                    if cache:
-                        logger.info(
-                            f"❌ Cache miss or stale for {next_start_date}. Fetching from API."
-                        )
-                    else:
-                        logger.info(
-                            f"📡 Fetching {next_start_date} from API (Cache Disabled)."
-                        )
-
-                    try:
-                        # Legacy script used ssl._create_unverified_context(), so we disable verification to match behavior.
-                        # Also HDHomeRun API seems to be picky about User-Agent or SSL specifics sometimes?
-                        # We will try to mimic a standard request but disabling verification is key if they use legacy certs.
-                        response = session.get(fetch_url, timeout=30, verify=False)
-                        response.raise_for_status()
-                        epg_segment = response.json()
-
-                        # Save to cache if enabled
-                        if cache:
-                            chunk_end_time = int(
-                                (
-                                    next_start_date + datetime.timedelta(hours=hours)
-                                ).timestamp()
-                            )
-                            cache.save_chunk(
-                                url_start_date, chunk_end_time, epg_segment
-                            )
+        if not self.device_auth:
+            self.discover_device_auth()
 
-                    except requests.RequestException as e:
-                        logger.error(f"🚨 Request failed for {fetch_url}: {e}")
-                        if hasattr(e, "response") and e.response is not None:
-                            logger.error(f"🚨 Response Body: {e.response.text}")
-                        # Skip this segment or break? Original continued?
-                        # Original raised generic Exception caught outside.
-                        raise e
-                else:
-                    logger.info(
-                        f"✅ Cache hit for {next_start_date} (Key: {url_start_date})."
-                    )
+        session = requests.Session()
+        for gap in gaps:
+            logger.info(f"🩹 Backfilling window {gap['start_time']} ({gap['reason']})")
+            try:
+                self._refresh_segment(
+                    session, gap["start_time"], hours, cache, background=True
+                )
+                result["refetched"].append(gap["start_time"])
+            except Exception as e:
+                logger.error(f"🚨 Backfill failed for {gap['start_time']}: {e}")
+                result["failed"].append(gap["start_time"])
+        return result
+
+
+class EPGStream:
+    """
+    Merged, de-duplicated programmes of a guide fetch, produced one chunk at
+    a time as the stream is iterated. `channels` lists the channels seen so
+    far, in order of appearance, and `coverage` is set once iteration ends.
+    Single use.
+    """
+
+    def __init__(
+        self,
+        client: HDHomeRunClient,
+        lineup: List[Dict[str, Any]],
+        start_times: List[int],
+        hours: int,
+        cache: Optional[CacheManager],
+        horizon_hours: Optional[int] = None,
+        fetch_hours: Optional[int] = None,
+        background: bool = False,
+    ):
+        self.client = client
+        self.lineup = lineup
+        self.start_times = start_times
+        self.hours = hours
+        self.cache = cache
+        self.background = background
+        now = time.time()
+        self.horizon_end = None
+        if horizon_hours is not None:
+            self.horizon_end = now + horizon_hours * 3600
+        self.fetch_end = None
+        if fetch_hours is not None:
+            self.fetch_end = now + fetch_hours * 3600
+
+        self.channels: List[Dict[str, Any]] = []
+        self.coverage: Optional[Dict[str, Any]] = None
+        # Set if fetching stopped early; the programmes so far are still yielded
+        self.error: Optional[str] = None
+        self.programme_count = 0
+        self._chunks = self._merge_chunks()
+        self._pending: Optional[List[Dict[str, Any]]] = None
+        self._started = False
+        self._epg_data: Optional[Dict[str, Any]] = None
+
+    def as_epg_data(self) -> Dict[str, Any]:
+        """The usual EPG dict, with this stream as its programmes."""
+        self._epg_data = {"channels": self.channels, "programmes": self}
+        return self._epg_data
+
+    def listed_channels(self) -> List[Dict[str, Any]]:
+        """
+        Channels for a writer that must list them before any programme: the
+        ones in the first chunk with their artwork, then the rest of the
+        lineup. Reads the first chunk if iteration has not started.
+        """
+        if not self._started and self._pending is None:
+            self._pending = next(self._chunks, [])
+        seen = {ch.get("GuideNumber") for ch in self.channels}
+        return self.channels + [
+            ch for ch in self.lineup if ch.get("GuideNumber") not in seen
+        ]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        self._started = True
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            yield from pending
+        for programmes in self._chunks:
+            yield from programmes
+
+    def _merge_chunks(self) -> Iterator[List[Dict[str, Any]]]:
+        channels_by_number = {ch.get("GuideNumber"): ch for ch in self.lineup}
+        seen_channels = set()
+        # Upstream windows overlap, so a programme can come back in the next
+        # chunks for as long as it airs. Keep its key until it has ended,
+        # rather than comparing against every programme merged so far.
+        recent: Dict[tuple, int] = {}
+        chunk_seconds = self.hours * 3600
+        covered = set()
+        session = requests.Session()
+        try:
+            for start_time in self.start_times:
+                epg_segment = self.client._load_segment(
+                    session,
+                    start_time,
+                    self.hours,
+                    self.cache,
+                    self.fetch_end,
+                    self.background,
+                )
+                if not epg_segment:
+                    continue
 
+                next_start_date = datetime.datetime.fromtimestamp(
+                    start_time, tz=pytz.UTC
+                )
                 logger.info(
-                    f"⚙️ Processing ({next_start_date} - {next_start_date + datetime.timedelta(hours=hours)})"
+                    f"⚙️ Processing ({next_start_date} - {next_start_date + datetime.timedelta(hours=self.hours)})"
                 )
-
-                for channel_epg_segment in epg_segment:
-                    programmes_list = channel_epg_segment.get("Guide", [])
-
-                    # Find matching channel in tuned channels
-                    channel_info = next(
-                        (
-                            ch
-                            for ch in channels
-                            if ch.get("GuideNumber")
-                            == channel_epg_segment.get("GuideNumber")
-                        ),
-                        None,
-                    )
-
-                    if not channel_info:
-                        logger.debug(
-                            f"Skipping program for untuned channel {channel_epg_segment.get('GuideNumber')}"
-                        )
-                        continue
-
-                    # Add channel to epg_data if not present
-                    existing_channel = next(
-                        (
-                            ch
-                            for ch in epg_data["channels"]
-                            if ch.get("GuideNumber")
-                            == channel_epg_segment.get("GuideNumber")
-                        ),
-                        None,
-                    )
-                    if not existing_channel:
-                        # Merge image from EPG if available
-                        channel_info["ImageURL"] = channel_epg_segment.get(
-                            "ImageURL", ""
-                        )
-                        epg_data["channels"].append(channel_info)
-
-                    for programme in programmes_list:
-                        # Check duplicate
-                        # Optimized check using a set of signatures could be better but sticking to logic
-                        is_duplicate = any(
-                            epg["StartTime"] == programme["StartTime"]
-                            and epg["Title"] == programme["Title"]
-                            and epg.get("GuideNumber")
-                            == channel_epg_segment["GuideNumber"]
-                            for epg in epg_data["programmes"]
-                        )
-
-                        if is_duplicate:
+                covered.add(start_time)
+
+                merged = []
+                with phase("merge"):
+                    recent = {
+                        key: end for key, end in recent.items() if end >= start_time
+                    }
+                    for channel_epg_segment in epg_segment:
+                        guide_number = channel_epg_segment.get("GuideNumber")
+
+                        # Find matching channel in tuned (and requested) channels
+                        channel_info = channels_by_number.get(guide_number)
+                        if not channel_info:
+                            logger.debug(
+                                f"Skipping program for untuned or filtered channel {guide_number}"
+                            )
                             continue
 
-                        programme["GuideNumber"] = channel_epg_segment["GuideNumber"]
-                        epg_data["programmes"].append(programme)
+                        if guide_number not in seen_channels:
+                            # Merge image from EPG if available
+                            channel_info["ImageURL"] = channel_epg_segment.get(
+                                "ImageURL", ""
+                            )
+                            self.channels.append(channel_info)
+                            seen_channels.add(guide_number)
+
+                        for programme in channel_epg_segment.get("Guide", []):
+                            if (
+                                self.horizon_end is not None
+                                and programme["StartTime"] >= self.horizon_end
+                            ):
+                                continue
+
+                            key = (
+                                guide_number,
+                                programme["StartTime"],
+                                programme.get("Title"),
+                            )
+                            if key in recent:
+                                continue
+                            # Without an end time, assume it runs to the chunk's end
+                            recent[key] = programme.get(
+                                "EndTime", start_time + chunk_seconds
+                            )
+
+                            programme["GuideNumber"] = guide_number
+                            merged.append(programme)
 
-                next_start_date += datetime.timedelta(hours=hours)
+                # The decoded chunk is released before the next one is loaded
+                del epg_segment
+                self.programme_count += len(merged)
+                yield merged
 
         except Exception as e:
             logger.error(f"Error fetching EPG: {e}")
             # Return what we have
-
-        return epg_data
+            self.error = str(e)
+        finally:
+            session.close()
+            self.coverage = chunk_coverage(
+                self.start_times, covered, self.hours, self.horizon_end
+            )
+            if self._epg_data is not None:
+                self._epg_data["coverage"] = self.coverage
+                if self.error:
+                    self._epg_data["error"] = self.error
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 
 
@@ -10,10 +11,74 @@ class Settings(BaseSettings):
     cache_db_path: str = "epg_cache.db"
     cache_ttl_seconds: int = 86400  # 24 Hours
     cache_enabled: bool = True
+    cache_backend: str = "sqlite"  # "sqlite" (per replica) or "redis" (shared)
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_redis_prefix: str = "hdhomerun_epg:"
+    cache_lease_seconds: int = 60  # How long one replica owns a chunk refresh
+    cache_lease_wait_seconds: int = 30  # How long others wait for its result
+    cache_retention_seconds: int = 86400  # Keep past chunks this long after they end
+    cache_max_bytes: int = 0  # 0 = no size limit
+    cache_eviction_policy: str = "lru"  # "lru" or "time"
+    cache_maintenance_interval_seconds: int = 900
+    cache_vacuum_pages: int = 0  # Pages reclaimed per maintenance run, 0 = all
+    archive_dir: str = ""  # Keep past chunks here, a file per day, "" = delete them
+    archive_retention_days: int = 0  # Archived days kept, 0 = all
+    refresher_lease_seconds: int = 60  # Worker running background jobs renews this
+    render_cache_entries: int = 16  # Rendered epg.xml variants kept
+    render_cache_dir: str = ""  # Share rendered epg.xml between workers, "" = in memory
+    guide_fragment_entries: int = 10000  # Rendered /guide (channel, window) rows
+    build_max_concurrent: int = 2  # /epg.xml and /guide builds at once, 0 = no limit
+    build_queue_size: int = 0  # Builds waiting for a slot before falling back
+    build_retry_after_seconds: int = (
+        10  # Retry-After on 503 when nothing to fall back on
+    )
+    now_next_horizon_hours: int = 12  # Guide data kept in the /now-next index
+    now_next_refresh_seconds: int = 60  # How often the index checks for new chunks
+    search_enabled: bool = True  # Full-text index of cached programmes
+    change_feed_retention_seconds: int = 86400  # How long /changes keeps entries
+    upstream_rate_per_minute: float = 60  # Guide requests/min upstream, 0 = no limit
+    upstream_burst: int = 10
+    upstream_daily_budget: int = 1000  # Guide requests per UTC day, 0 = unlimited
+    upstream_far_budget_share: float = 0.8  # Budget share far-horizon windows may use
+    upstream_near_term_hours: int = 24  # Windows starting sooner are fetched first
+    upstream_max_wait_seconds: float = 30  # Longest wait for a request slot
+    progressive_hours: int = 0  # > 0: cold /epg.xml returns this many hours first
+    image_proxy_enabled: bool = True  # Serve artwork through /image and its cache
+    image_proxy_hosts: str = "img.hdhomerun.com"  # Comma-separated artwork hosts
+    image_proxy_base_url: str = ""  # Public URL for epg.xml icons, "" = request's
+    image_cache_dir: str = ""  # "" = image_cache next to the cache DB
+    image_cache_max_bytes: int = 100 * 1024 * 1024
+    image_cache_ttl_seconds: int = 7 * 86400  # Re-fetch artwork after this long
+    xmltv_render_workers: int = 0  # > 1 renders large guides in a process pool
+    xmltv_parallel_min_programmes: int = 5000
+    server_timing: bool = False  # Always send Server-Timing headers
+    profile_slow_ms: int = 0  # Dump a sampled profile of slower requests, 0 = off
+    profile_dir: str = "profiles"
+    coverage_tolerance_seconds: int = 60  # Holes shorter than this are ignored
+    backfill_min_age_seconds: int = 3600  # Don't re-fetch a window more often
+    snapshot_source: str = ""  # Cache snapshot path or peer URL imported at startup
+    snapshot_export_path: str = ""  # Where the refresher keeps a snapshot, "" = off
+    snapshot_export_interval_seconds: int = 3600
+    startup_warmup: bool = True  # Fill the cache and render epg.xml before ready
+    readiness_min_hours: int = 24  # Fresh cached hours ahead needed to be ready
+    readiness_keep_hours: int = 6  # Once ready, stay ready down to this many hours
+    readiness_max_lineup_age_seconds: int = 0  # 0 = the tuner answered once
+    push_sinks: str = ""  # Comma-separated webhook URLs / paths epg.xml is pushed to
+    push_interval_seconds: int = 60  # How often the refresher checks for changes
 
     class Config:
         env_prefix = "HDHOMERUN_"
         env_file = ".env"
 
 
-settings = Settings()
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The process-wide settings, read from the environment on first use."""
+    return Settings()
+
+
+def __getattr__(name):
+    # `from .config import settings` keeps working, but builds Settings lazily
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
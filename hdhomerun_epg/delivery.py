@@ -0,0 +1,158 @@
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Sink(ABC):
+    """A place rendered epg.xml documents are pushed to."""
+
+    name: str
+
+    @abstractmethod
+    def push(self, content: bytes, digest: str) -> None:
+        """Deliver `content`, whose SHA-256 is `digest`; raise on failure."""
+
+    def current_digest(self) -> Optional[str]:
+        """SHA-256 of what the sink holds now, if it can tell."""
+        return None
+
+
+class FileSink(Sink):
+    """Writes the document to a path, e.g. on a volume shared with the consumer."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = path
+
+    def push(self, content: bytes, digest: str) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            # mkstemp creates the file 0600; consumers may run as another user
+            os.chmod(tmp_path, 0o644)
+            # Consumers reading the path never see a half-written document
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def current_digest(self) -> Optional[str]:
+        try:
+            with open(self.path, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+
+class WebhookSink(Sink):
+    """POSTs the document gzipped to a URL."""
+
+    def __init__(self, url: str, timeout: float = 30):
+        self.url = url
+        self.name = url
+        self.timeout = timeout
+
+    def push(self, content: bytes, digest: str) -> None:
+        import requests
+
+        response = requests.post(
+            self.url,
+            data=gzip.compress(content),
+            headers={
+                "Content-Type": "application/xml",
+                "Content-Encoding": "gzip",
+                "X-EPG-SHA256": digest,
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+
+def parse_sinks(spec: str) -> List[Sink]:
+    """
+    Sinks from a comma-separated list of http(s) webhook URLs and file
+    paths (optionally as file:// URLs).
+    """
+    sinks: List[Sink] = []
+    for entry in (part.strip() for part in spec.split(",")):
+        if not entry:
+            continue
+        if entry.startswith(("http://", "https://")):
+            sinks.append(WebhookSink(entry))
+        elif entry.startswith("file://"):
+            sinks.append(FileSink(entry[len("file://") :]))
+        elif "://" in entry:
+            raise ValueError(f"Unknown push sink: {entry}")
+        else:
+            sinks.append(FileSink(entry))
+    return sinks
+
+
+class Publisher:
+    """
+    Pushes documents to every sink that does not have them yet. Each sink's
+    last delivered SHA-256 is remembered, so publishing an unchanged
+    document costs a hash, and a sink that failed is retried on the next
+    publish while the others are left alone. With a cache, the hashes are
+    kept in it, so a refresher role that moves to another worker or replica
+    does not deliver the same document again.
+    """
+
+    def __init__(self, sinks: List[Sink], cache=None):
+        self.sinks = sinks
+        self.cache = cache
+        self._delivered: Dict[str, Optional[str]] = {}
+
+    def _last_delivered(self, sink: Sink) -> Optional[str]:
+        # What the sink holds, if it can tell, beats what we remember
+        digest = sink.current_digest()
+        if digest is not None:
+            return digest
+        if self.cache is not None:
+            return self.cache.get_value(f"push:{sink.name}")
+        return self._delivered.get(sink.name)
+
+    def _remember(self, sink: Sink, digest: str) -> None:
+        self._delivered[sink.name] = digest
+        if self.cache is not None:
+            self.cache.set_value(f"push:{sink.name}", digest)
+
+    def publish(self, content: bytes) -> Dict[str, int]:
+        digest = hashlib.sha256(content).hexdigest()
+        result = {"pushed": 0, "unchanged": 0, "failed": 0}
+        for sink in self.sinks:
+            if self._last_delivered(sink) == digest:
+                result["unchanged"] += 1
+                continue
+            try:
+                sink.push(content, digest)
+            except Exception as e:
+                logger.error(f"🚨 Failed to push epg.xml to {sink.name}: {e}")
+                result["failed"] += 1
+                continue
+            self._remember(sink, digest)
+            result["pushed"] += 1
+            logger.info(f"📤 Pushed epg.xml to {sink.name} ({digest[:12]})")
+        return result
+
+
+@lru_cache(maxsize=None)
+def get_publisher() -> Publisher:
+    """The process-wide publisher for the sinks in the settings."""
+    from .cache import CacheManager
+    from .config import settings
+
+    cache = CacheManager.from_settings(settings) if settings.cache_enabled else None
+    return Publisher(parse_sinks(settings.push_sinks), cache)
@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+
+def parse_guide_number(guide_number: str) -> Tuple[int, ...]:
+    """Turn a GuideNumber such as "5.1" into a sortable (5, 1) tuple."""
+    try:
+        return tuple(int(part) for part in str(guide_number).split("."))
+    except ValueError:
+        return ()
+
+
+@dataclass(frozen=True)
+class EPGFilter:
+    """
+    Subset of the guide requested by a consumer. Applied while fetching so
+    that chunks beyond the horizon and unwanted channels are never processed.
+    """
+
+    channels: Optional[FrozenSet[str]] = None
+    guide_min: Optional[str] = None
+    guide_max: Optional[str] = None
+    favorites_only: bool = False
+    hours: Optional[int] = None
+
+    def __post_init__(self):
+        # An unparseable bound would silently match every channel or none
+        for bound in (self.guide_min, self.guide_max):
+            if bound is not None and not parse_guide_number(bound):
+                raise ValueError(f"Invalid GuideNumber: {bound!r}")
+
+    @property
+    def is_empty(self) -> bool:
+        return self == EPGFilter()
+
+    def matches_channel(self, channel: Dict[str, Any]) -> bool:
+        guide_number = str(channel.get("GuideNumber", ""))
+        if self.channels is not None and guide_number not in self.channels:
+            return False
+        if self.favorites_only and not channel.get("Favorite"):
+            return False
+        if self.guide_min is not None or self.guide_max is not None:
+            number = parse_guide_number(guide_number)
+            if not number:
+                return False
+            if self.guide_min is not None and number < parse_guide_number(
+                self.guide_min
+            ):
+                return False
+            if self.guide_max is not None and number > parse_guide_number(
+                self.guide_max
+            ):
+                return False
+        return True
+
+    def cache_key(self) -> str:
+        """Stable key identifying this variant of the document."""
+        channels = ",".join(sorted(self.channels)) if self.channels else ""
+        return (
+            f"channels={channels};min={self.guide_min or ''};max={self.guide_max or ''};"
+            f"favorites={int(self.favorites_only)};hours={self.hours or ''}"
+        )
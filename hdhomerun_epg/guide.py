@@ -0,0 +1,146 @@
+import datetime
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Horizontal scale of the HTML guide
+PIXELS_PER_MINUTE = 5
+# Space between adjacent programme cards
+CARD_GAP_PX = 4
+# "HH:MM" for every minute of the day, indexed by minutes since midnight
+_CLOCK = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(1440)]
+
+
+class Card(NamedTuple):
+    programme: Dict[str, Any]
+    left_px: int
+    width_px: int
+    start_str: str
+
+
+def to_px(seconds: float) -> int:
+    return int(seconds / 60 * PIXELS_PER_MINUTE)
+
+
+def group_by_window(
+    programmes: List[Dict[str, Any]], window_starts: List[int], window_seconds: int
+) -> Dict[str, Dict[int, List[Dict[str, Any]]]]:
+    """
+    Group programmes by channel and by the time window they start in.
+    Programmes already airing when the first window opens belong to the first
+    window, and anything starting after the last window to the last one.
+    A single pass, keeping the input order within each window.
+    """
+    rows: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+    if not window_starts:
+        return rows
+    origin = window_starts[0]
+    last = len(window_starts) - 1
+    for programme in programmes:
+        if programme["EndTime"] <= origin:
+            continue
+        index = min(max((programme["StartTime"] - origin) // window_seconds, 0), last)
+        windows = rows.setdefault(programme["GuideNumber"], {})
+        windows.setdefault(window_starts[index], []).append(programme)
+    return rows
+
+
+def window_for(start_time: int, window_starts: List[int]) -> int:
+    """The window a programme starting at `start_time` is shown in."""
+    return window_starts[max(bisect_right(window_starts, start_time) - 1, 0)]
+
+
+def find_programme(
+    chunk: List[Dict[str, Any]], guide_number: str, start_time: int
+) -> Optional[Dict[str, Any]]:
+    """A programme in raw chunk data, with its channel's number and name."""
+    for channel in chunk:
+        if str(channel.get("GuideNumber")) != guide_number:
+            continue
+        for programme in channel.get("Guide", []):
+            if programme.get("StartTime") == start_time:
+                return {
+                    **programme,
+                    "GuideNumber": guide_number,
+                    "GuideName": channel.get("GuideName"),
+                }
+    return None
+
+
+@lru_cache(maxsize=4096)
+def utc_offset(timestamp: int) -> int:
+    """Seconds the local time zone is ahead of UTC at `timestamp`."""
+    offset = datetime.datetime.fromtimestamp(timestamp).astimezone().utcoffset()
+    return int(offset.total_seconds())
+
+
+def clock_times(start_times: List[int]) -> List[str]:
+    """
+    Local "HH:MM" of many timestamps. When the UTC offset is the same at
+    both ends, as it is unless a DST change falls in between, every time is
+    the same offset plus a table lookup instead of a datetime each.
+    """
+    if not start_times:
+        return []
+    offset = utc_offset(min(start_times))
+    if utc_offset(max(start_times)) != offset:
+        return [
+            datetime.datetime.fromtimestamp(t).strftime("%H:%M") for t in start_times
+        ]
+    return [_CLOCK[(t + offset) // 60 % 1440] for t in start_times]
+
+
+def layout_window(programmes: List[Dict[str, Any]], window_start: int) -> List[Card]:
+    """
+    Position programmes relative to the start of their window, so the result
+    does not depend on the current time. Programmes that began before the
+    window are clipped to its start.
+
+    Works column-wise over the start and end times. group_by_window() keeps
+    the merged order, which is already by start time, so programmes are
+    only sorted when they are not.
+    """
+    starts = [programme["StartTime"] for programme in programmes]
+    if starts != sorted(starts):
+        programmes = sorted(programmes, key=lambda programme: programme["StartTime"])
+        starts.sort()
+    ends = [programme["EndTime"] for programme in programmes]
+    visual_starts = [
+        start if start > window_start else window_start for start in starts
+    ]
+    lefts = [
+        (visual_start - window_start) * PIXELS_PER_MINUTE // 60
+        for visual_start in visual_starts
+    ]
+    widths = [
+        max((end - visual_start) * PIXELS_PER_MINUTE // 60 - CARD_GAP_PX, 1)
+        for end, visual_start in zip(ends, visual_starts)
+    ]
+    return list(map(Card, programmes, lefts, widths, clock_times(starts)))
+
+
+def fragment_key(
+    guide_number: str,
+    window_start: int,
+    window_starts: List[int],
+    window_seconds: int,
+    versions: Dict[int, int],
+) -> Optional[Tuple]:
+    """
+    Key of a rendered (channel, window) fragment. A window's programmes come
+    from its own chunk and, since upstream responses overlap, from the chunk
+    before it. Returns None when either version is unknown, in which case the
+    fragment is rendered but not cached.
+    """
+    first = window_start == window_starts[0]
+    last = window_start == window_starts[-1]
+    sources = [window_start] if first else [window_start - window_seconds, window_start]
+    if any(source not in versions for source in sources):
+        return None
+    return (
+        guide_number,
+        window_start,
+        first,
+        last,
+        tuple(versions[source] for source in sources),
+    )
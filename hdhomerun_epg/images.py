@@ -0,0 +1,289 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from functools import lru_cache
+from typing import FrozenSet, Iterable, Optional, Tuple
+from urllib.parse import quote, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Thumbnail widths served; requested widths are rounded up to one of these
+# so arbitrary widths cannot fill the cache with near-duplicates
+THUMBNAIL_WIDTHS = (96, 240, 480)
+# Larger upstream responses are refused
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+# How often a worker rescans the directory for what other workers stored
+EVICT_INTERVAL_SECONDS = 300
+
+
+class ImageProxyError(Exception):
+    """The image could not be proxied; `status_code` is the HTTP answer."""
+
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def thumbnail_width(width: Optional[int]) -> Optional[int]:
+    if not width:
+        return None
+    return next((w for w in THUMBNAIL_WIDTHS if w >= width), None)
+
+
+def is_proxyable(url: str, allowed_hosts: Iterable[str]) -> bool:
+    """Only http(s) images on known artwork hosts go through the proxy."""
+    parsed = urlparse(url or "")
+    return parsed.scheme in ("http", "https") and parsed.hostname in allowed_hosts
+
+
+def proxy_url(
+    url: str,
+    allowed_hosts: Iterable[str],
+    base_url: str = "",
+    width: Optional[int] = None,
+) -> str:
+    """
+    URL of `url` through the /image proxy at `base_url`, or `url` itself if
+    its host is not one the proxy serves.
+    """
+    if not is_proxyable(url, allowed_hosts):
+        return url
+    proxied = f"{base_url.rstrip('/')}/image?url={quote(url, safe='')}"
+    if width:
+        proxied += f"&w={width}"
+    return proxied
+
+
+def resize(data: bytes, width: int) -> Optional[Tuple[bytes, str]]:
+    """
+    Scale an image down to `width` pixels wide. Returns None if Pillow is not
+    installed or the image is already narrow enough.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width <= width:
+            return None
+        height = max(round(image.height * width / image.width), 1)
+        fmt = "PNG" if image.mode in ("RGBA", "LA", "P") else "JPEG"
+        out = io.BytesIO()
+        image.resize((width, height), Image.LANCZOS).save(out, fmt)
+    return out.getvalue(), f"image/{fmt.lower()}"
+
+
+class ImageCache:
+    """
+    Content-addressed on-disk cache of upstream artwork. Image bytes are
+    stored once per distinct content under their SHA-256, and small
+    reference files map each (URL, width) to the content. Total size is
+    bounded by evicting the least recently used images. Files are renamed
+    into place, so several worker processes can share the directory. If the
+    directory cannot be written, images are still served, just not cached.
+    """
+
+    def __init__(
+        self,
+        directory: str = "image_cache",
+        max_bytes: int = 100 * 1024 * 1024,
+        ttl_seconds: int = 7 * 86400,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._blobs = os.path.join(directory, "blobs")
+        self._refs = os.path.join(directory, "refs")
+        # Bytes stored as of the last scan, plus what this process added since
+        self._size: Optional[int] = None
+        self._scanned_at = 0.0
+        try:
+            os.makedirs(self._blobs, exist_ok=True)
+            os.makedirs(self._refs, exist_ok=True)
+        except OSError as e:
+            logger.error(f"🚨 Image cache {directory} is not writable: {e}")
+
+    def _ref_path(self, url: str, width: Optional[int]) -> str:
+        digest = hashlib.sha1(f"{url}|{width or ''}".encode("utf-8")).hexdigest()
+        return os.path.join(self._refs, digest)
+
+    def _write(self, path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _lookup(self, url: str, width: Optional[int]):
+        try:
+            with open(self._ref_path(url, width), "rb") as f:
+                ref = json.loads(f.read())
+            blob_path = os.path.join(self._blobs, ref["sha256"])
+            with open(blob_path, "rb") as f:
+                data = f.read()
+        except (OSError, ValueError, KeyError):
+            return None
+        if time.time() - ref.get("fetched_at", 0) >= self.ttl_seconds:
+            return None
+        try:
+            os.utime(blob_path)
+        except OSError:
+            pass
+        return data, ref["content_type"], ref["sha256"]
+
+    def get(self, url: str, width: Optional[int] = None) -> Tuple[bytes, str, str]:
+        """
+        Image bytes, content type and content hash for `url`, scaled down to
+        `width` if given. Fetched upstream on a miss; raises ImageProxyError.
+        """
+        cached = self._lookup(url, width)
+        if cached:
+            logger.debug(f"✅ Image cache HIT for {url}")
+            return cached
+
+        data, content_type = self._download(url)
+        if width:
+            try:
+                resized = resize(data, width)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not resize {url}: {e}")
+                resized = None
+            if resized:
+                data, content_type = resized
+
+        sha256 = hashlib.sha256(data).hexdigest()
+        try:
+            blob_path = os.path.join(self._blobs, sha256)
+            if not os.path.exists(blob_path):
+                self._write(blob_path, data)
+                if self._size is not None:
+                    self._size += len(data)
+            ref = {
+                "url": url,
+                "sha256": sha256,
+                "content_type": content_type,
+                "fetched_at": int(time.time()),
+            }
+            self._write(self._ref_path(url, width), json.dumps(ref).encode("utf-8"))
+            # A full scan only when this process's running total says the
+            # limit is near, or now and then to count other workers' images
+            if (
+                self._size is None
+                or self._size > self.max_bytes
+                or time.monotonic() - self._scanned_at >= EVICT_INTERVAL_SECONDS
+            ):
+                self.evict()
+        except OSError as e:
+            logger.error(f"🚨 Failed to store image {url}: {e}")
+        return data, content_type, sha256
+
+    def _download(self, url: str) -> Tuple[bytes, str]:
+        import requests
+
+        try:
+            with requests.get(url, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                if not content_type.startswith("image/"):
+                    raise ImageProxyError(f"{url} is not an image ({content_type})")
+                data = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+        except requests.RequestException as e:
+            raise ImageProxyError(f"Failed to fetch {url}: {e}")
+        if len(data) > MAX_IMAGE_BYTES:
+            raise ImageProxyError(f"{url} is larger than {MAX_IMAGE_BYTES} bytes")
+        return data, content_type.split(";")[0]
+
+    def size_bytes(self) -> int:
+        total = 0
+        for entry in os.scandir(self._blobs):
+            try:
+                total += entry.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def evict(self) -> int:
+        """Delete least recently used images until under max_bytes."""
+        blobs = []
+        for entry in os.scandir(self._blobs):
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            blobs.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in blobs)
+        self._size, self._scanned_at = total, time.monotonic()
+        if total <= self.max_bytes:
+            return 0
+
+        evicted = 0
+        for _, size, path in sorted(blobs):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self._size = total
+
+        # References to evicted images are dead weight now
+        for entry in os.scandir(self._refs):
+            try:
+                with open(entry.path, "rb") as f:
+                    sha256 = json.loads(f.read())["sha256"]
+                if not os.path.exists(os.path.join(self._blobs, sha256)):
+                    os.unlink(entry.path)
+            except (OSError, ValueError, KeyError):
+                pass
+        logger.info(f"🧹 Evicted {evicted} cached images")
+        return evicted
+
+    def clear(self) -> None:
+        for directory in (self._blobs, self._refs):
+            for entry in os.scandir(directory):
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+@lru_cache(maxsize=None)
+def get_image_cache() -> ImageCache:
+    """The process-wide image cache, configured from the settings on first use."""
+    from .config import settings
+
+    # By default next to the cache DB, i.e. on the data volume when it has one
+    directory = settings.image_cache_dir or os.path.join(
+        os.path.dirname(os.path.abspath(settings.cache_db_path)), "image_cache"
+    )
+    return ImageCache(
+        directory,
+        max_bytes=settings.image_cache_max_bytes,
+        ttl_seconds=settings.image_cache_ttl_seconds,
+    )
+
+
+def proxy_hosts() -> FrozenSet[str]:
+    """Hosts whose images are proxied; empty when the proxy is disabled."""
+    from .config import settings
+
+    if not settings.image_proxy_enabled:
+        return frozenset()
+    return frozenset(
+        host.strip() for host in settings.image_proxy_hosts.split(",") if host.strip()
+    )
@@ -0,0 +1,155 @@
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_recorder: contextvars.ContextVar[Optional["PhaseRecorder"]] = contextvars.ContextVar(
+    "hdhomerun_epg_phase_recorder", default=None
+)
+
+
+class PhaseRecorder:
+    """Accumulated wall-clock time per named phase of one request or run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        entry = self.phases.setdefault(name, {"seconds": 0.0, "count": 0})
+        entry["seconds"] += seconds
+        entry["count"] += 1
+
+    @property
+    def total_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def breakdown(self) -> Dict[str, object]:
+        return {
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "phases": {
+                name: {"ms": round(entry["seconds"] * 1000, 3), "count": entry["count"]}
+                for name, entry in self.phases.items()
+            },
+        }
+
+    def server_timing(self) -> str:
+        """Format as a Server-Timing header value."""
+        metrics = [
+            f"{name};dur={entry['seconds'] * 1000:.1f}"
+            for name, entry in self.phases.items()
+        ]
+        metrics.append(f"total;dur={self.total_seconds * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def summary(self) -> str:
+        parts = [
+            f"{name}={entry['seconds'] * 1000:.1f}ms"
+            for name, entry in self.phases.items()
+        ]
+        return " ".join(parts + [f"total={self.total_seconds * 1000:.1f}ms"])
+
+
+@contextmanager
+def recording() -> Iterator[PhaseRecorder]:
+    """Collect the phases timed inside this block (in this thread/context)."""
+    recorder = PhaseRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block as `name` if a recording is active, otherwise do nothing."""
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.record(name, time.perf_counter() - started)
+
+
+class SamplingProfiler:
+    """
+    Periodically samples the stack of one thread and counts identical stacks.
+    Output uses the folded format understood by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in self.samples.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile_if_slow(name: str, threshold_ms: int, directory: str) -> Iterator[None]:
+    """
+    Sample the current thread and dump a profile to `directory` when the block
+    takes longer than `threshold_ms`. A threshold of 0 disables profiling.
+    """
+    if threshold_ms <= 0:
+        yield
+        return
+
+    profiler = SamplingProfiler()
+    profiler.start()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms > threshold_ms:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(
+                    directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+                )
+                profiler.dump(path)
+                logger.warning(
+                    f"🐢 {name} took {elapsed_ms:.0f}ms, profile written to {path}"
+                )
+            except OSError as e:
+                logger.error(f"🚨 Could not write profile: {e}")
@@ -0,0 +1,236 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .profiling import phase
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamDeferred(Exception):
+    """An upstream fetch was not allowed now; fall back to cached data."""
+
+
+class PriorityTokenBucket:
+    """
+    Token bucket whose waiters are served in priority order (lowest first)
+    rather than arrival order. A rate of 0 disables limiting. The tokens
+    themselves can come from a bucket shared with other processes, in which
+    case this one only orders the waiters of this process.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        with self._cond:
+            self._refill()
+            return self._tokens
+
+    @property
+    def queued(self) -> int:
+        with self._cond:
+            return len(self._waiters)
+
+    def _take_local(self) -> float:
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def acquire(
+        self,
+        priority: Any,
+        timeout: Optional[float] = None,
+        shared: Optional[Callable[[], Optional[float]]] = None,
+    ) -> float:
+        """
+        Take one token, waiting behind higher-priority callers. Returns the
+        seconds spent waiting; raises UpstreamDeferred after `timeout`.
+        `shared` takes a token from a shared bucket instead, returning 0 on
+        success, the seconds until the next one, or None to use this one.
+        """
+        if self.rate <= 0:
+            return 0.0
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        entry = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    wait = None
+                    if self._waiters[0] == entry:
+                        wait = shared() if shared else None
+                        if wait is None:
+                            wait = self._take_local()
+                        if wait <= 0:
+                            return time.monotonic() - started
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise UpstreamDeferred(
+                                f"no upstream request slot within {timeout:.0f}s"
+                            )
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+
+class UpstreamLimiter:
+    """
+    Guards api.hdhomerun.com: a token bucket, prioritised so near-term
+    windows are fetched before far-horizon ones and interactive requests
+    before background work, plus a daily request budget. The bucket and the
+    budget are kept in the cache backend when one is passed, so workers,
+    replicas and restarts share them. Far-horizon windows may only use part of the budget,
+    the rest is kept for near-term windows.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float = 60,
+        burst: int = 10,
+        daily_budget: int = 0,
+        far_budget_share: float = 0.8,
+        near_term_hours: int = 24,
+        max_wait_seconds: float = 30,
+    ):
+        self.bucket = PriorityTokenBucket(rate_per_minute / 60, burst)
+        self.daily_budget = daily_budget
+        self.far_budget_share = far_budget_share
+        self.near_term_hours = near_term_hours
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self._local_budget: Dict[str, int] = {}
+        self._stats = {
+            "requests": 0,
+            "deferred": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    @staticmethod
+    def _budget_key() -> Tuple[str, int]:
+        """Counter key for the current UTC day, and seconds until it ends."""
+        now = int(time.time())
+        day = time.strftime("%Y-%m-%d", time.gmtime(now))
+        return f"upstream_budget:{day}", 86400 - now % 86400
+
+    def budget_used(self, cache=None) -> int:
+        key, _ = self._budget_key()
+        if cache:
+            return cache.get_counter(key)
+        with self._lock:
+            return self._local_budget.get(key, 0)
+
+    def _count_request(self, cache) -> None:
+        key, ttl = self._budget_key()
+        if cache:
+            cache.increment_counter(key, ttl)
+            return
+        with self._lock:
+            self._local_budget = {key: self._local_budget.get(key, 0) + 1}
+
+    def acquire(self, start_time: int, cache=None, background: bool = False) -> None:
+        """
+        Wait for permission to fetch the window starting at `start_time`.
+        Raises UpstreamDeferred if the budget does not allow it or no slot
+        frees up within max_wait_seconds.
+        """
+        near_term = start_time < time.time() + self.near_term_hours * 3600
+        try:
+            if self.daily_budget > 0:
+                limit = self.daily_budget
+                if not near_term:
+                    limit = int(self.daily_budget * self.far_budget_share)
+                used = self.budget_used(cache)
+                if used >= limit:
+                    raise UpstreamDeferred(
+                        f"daily upstream budget used ({used}/{limit} for "
+                        f"{'near-term' if near_term else 'far-horizon'} windows)"
+                    )
+
+            shared = None
+            if cache:
+                shared = partial(
+                    cache.take_token, "upstream", self.bucket.rate, self.bucket.burst
+                )
+            with phase("upstream_queue"):
+                waited = self.bucket.acquire(
+                    (int(background), start_time), self.max_wait_seconds, shared
+                )
+        except UpstreamDeferred:
+            with self._lock:
+                self._stats["deferred"] += 1
+            raise
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(
+                self._stats["wait_seconds_max"], waited
+            )
+        if waited > 1:
+            logger.info(f"🚦 Waited {waited:.1f}s for an upstream slot")
+        self._count_request(cache)
+
+    def tokens(self, cache=None) -> float:
+        """Tokens left in the bucket, the shared one if there is a cache."""
+        stored = cache.get_value("bucket:upstream") if cache else None
+        if stored is None or self.bucket.rate <= 0:
+            return self.bucket.tokens
+        behind = max(float(stored) - time.time(), 0) * self.bucket.rate
+        return max(self.bucket.burst - behind, 0.0)
+
+    def stats(self, cache=None) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats["requests"]
+        stats["wait_seconds_mean"] = (
+            stats["wait_seconds_total"] / requests if requests else 0.0
+        )
+        stats.update(
+            {
+                "queued": self.bucket.queued,
+                "tokens": round(self.tokens(cache), 2),
+                "budget_used_today": self.budget_used(cache),
+                "daily_budget": self.daily_budget,
+            }
+        )
+        return stats
+
+
+@lru_cache(maxsize=None)
+def get_upstream_limiter() -> UpstreamLimiter:
+    """The process-wide limiter, configured from the settings on first use."""
+    from .config import settings
+
+    return UpstreamLimiter(
+        rate_per_minute=settings.upstream_rate_per_minute,
+        burst=settings.upstream_burst,
+        daily_budget=settings.upstream_daily_budget,
+        far_budget_share=settings.upstream_far_budget_share,
+        near_term_hours=settings.upstream_near_term_hours,
+        max_wait_seconds=settings.upstream_max_wait_seconds,
+    )
@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RenderCache:
+    """
+    In-memory LRU of rendered documents. Keys include the data signature of
+    the chunks the document was built from, so a refreshed chunk simply
+    makes old entries unreachable until they are evicted.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                logger.debug(f"✅ Render cache HIT for {key}")
+            return value
+
+    def put(self, key: Hashable, value: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class FileRenderCache:
+    """
+    LRU of rendered documents kept as files in a directory, so every worker
+    process pointed at it shares them. Documents are written under a
+    temporary name and renamed into place, so readers never see a partial
+    one. A file's modification time is its last use.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 16):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: Hashable) -> str:
+        # Keys are tuples of strings, whose repr is the same in every process
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.render")
+
+    def _files(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".render"):
+                yield entry
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        logger.debug(f"✅ Render cache HIT for {key}")
+        return value
+
+    def put(self, key: Hashable, value: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.error(f"🚨 Failed to write render cache entry: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        # Other workers may evict concurrently, so files can vanish under us
+        entries = []
+        for entry in self._files():
+            try:
+                entries.append((entry.stat().st_mtime_ns, entry.path))
+            except FileNotFoundError:
+                pass
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries :]:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        for entry in self._files():
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,66 @@
+from bisect import bisect_right
+from operator import itemgetter
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+# Programme fields included in now/next answers
+SUMMARY_FIELDS = (
+    "Title",
+    "EpisodeTitle",
+    "EpisodeNumber",
+    "StartTime",
+    "EndTime",
+    "ImageURL",
+)
+
+
+def _summary(programme: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: programme[field] for field in SUMMARY_FIELDS if field in programme}
+
+
+class ScheduleIndex:
+    """
+    Per-channel programmes sorted by start time, for now/next lookups by
+    bisection. Built once from merged EPG data and never modified, so
+    readers can use it without locking while a replacement is being built.
+    """
+
+    def __init__(self, epg_data: Dict[str, Any], version: Hashable = None):
+        self.version = version
+        self.channels = {
+            str(ch.get("GuideNumber")): ch.get("GuideName")
+            for ch in epg_data.get("channels", [])
+        }
+        self._starts: Dict[str, List[int]] = {}
+        self._programmes: Dict[str, List[Dict[str, Any]]] = {}
+
+        for programme in sorted(
+            epg_data.get("programmes", []), key=itemgetter("StartTime")
+        ):
+            guide_number = str(programme.get("GuideNumber"))
+            starts = self._starts.setdefault(guide_number, [])
+            if starts and starts[-1] == programme["StartTime"]:
+                continue  # Same slot seen in two overlapping chunks
+            starts.append(programme["StartTime"])
+            self._programmes.setdefault(guide_number, []).append(_summary(programme))
+
+    def lookup(self, guide_number: str, now: float) -> Dict[str, Optional[dict]]:
+        """The programme airing at `now` on a channel, and the one after it."""
+        starts = self._starts.get(guide_number, [])
+        programmes = self._programmes.get(guide_number, [])
+        i = bisect_right(starts, now) - 1
+        current = programmes[i] if i >= 0 and programmes[i]["EndTime"] > now else None
+        upcoming = programmes[i + 1] if i + 1 < len(programmes) else None
+        return {"now": current, "next": upcoming}
+
+    def now_next(
+        self, now: float, guide_numbers: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        guide_numbers = self.channels if guide_numbers is None else guide_numbers
+        return [
+            {
+                "GuideNumber": guide_number,
+                "GuideName": self.channels.get(guide_number),
+                **self.lookup(guide_number, now),
+            }
+            for guide_number in guide_numbers
+        ]
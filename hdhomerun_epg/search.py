@@ -0,0 +1,164 @@
+import logging
+import re
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def to_match_query(text: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query matching all words, the last one as a
+    prefix so results appear while typing. Returns None if there are no words.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index over the programmes of cached chunks. Rows are tagged
+    with the chunk they came from, so refreshing or evicting a chunk only
+    touches that chunk's rows. The version indexed for each chunk (its content
+    version) tells a sync which chunks changed since.
+    """
+
+    def __init__(self, db_path: str = "epg_cache.db"):
+        self.db_path = db_path
+        try:
+            self._init_db()
+        except Exception as e:
+            logger.error(f"🚨 Failed to initialize search index: {e}")
+
+    def _init_db(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS search_chunks (
+                    start_time INTEGER PRIMARY KEY,
+                    version INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS search_programmes (
+                    id INTEGER PRIMARY KEY,
+                    chunk_start INTEGER NOT NULL,
+                    guide_number TEXT,
+                    guide_name TEXT,
+                    start_time INTEGER,
+                    end_time INTEGER,
+                    title TEXT,
+                    episode_title TEXT,
+                    synopsis TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_search_chunk
+                    ON search_programmes (chunk_start);
+                CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+                    title, episode_title, synopsis,
+                    content='search_programmes', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS search_programmes_ai
+                AFTER INSERT ON search_programmes BEGIN
+                    INSERT INTO search_fts (rowid, title, episode_title, synopsis)
+                    VALUES (new.id, new.title, new.episode_title, new.synopsis);
+                END;
+                CREATE TRIGGER IF NOT EXISTS search_programmes_ad
+                AFTER DELETE ON search_programmes BEGIN
+                    INSERT INTO search_fts (search_fts, rowid, title, episode_title, synopsis)
+                    VALUES ('delete', old.id, old.title, old.episode_title, old.synopsis);
+                END;
+            """)
+
+    def index_chunk(
+        self, start_time: int, version: int, data: List[Dict[str, Any]]
+    ) -> None:
+        """Replace the indexed programmes of one chunk."""
+        rows = [
+            (
+                start_time,
+                str(channel.get("GuideNumber")),
+                channel.get("GuideName"),
+                programme.get("StartTime"),
+                programme.get("EndTime"),
+                programme.get("Title"),
+                programme.get("EpisodeTitle"),
+                programme.get("Synopsis"),
+            )
+            for channel in data
+            for programme in channel.get("Guide", [])
+        ]
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "DELETE FROM search_programmes WHERE chunk_start = ?", (start_time,)
+            )
+            conn.executemany(
+                """
+                INSERT INTO search_programmes (chunk_start, guide_number, guide_name, start_time, end_time, title, episode_title, synopsis)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO search_chunks (start_time, version) VALUES (?, ?)",
+                (start_time, version),
+            )
+
+    def remove_chunks(self, start_times: Iterable[int]) -> None:
+        params = [(start_time,) for start_time in start_times]
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "DELETE FROM search_programmes WHERE chunk_start = ?", params
+            )
+            conn.executemany("DELETE FROM search_chunks WHERE start_time = ?", params)
+
+    def clear(self) -> None:
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM search_programmes")
+            conn.execute("DELETE FROM search_chunks")
+
+    def indexed_versions(self) -> Dict[int, int]:
+        """Version of every indexed chunk, to compare against the cache."""
+        with sqlite3.connect(self.db_path) as conn:
+            return dict(conn.execute("SELECT start_time, version FROM search_chunks"))
+
+    def search(
+        self,
+        text: str,
+        after: int = 0,
+        channels: Optional[List[str]] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """
+        Programmes matching `text` in title, episode title or synopsis that
+        end after `after`, in airing order. Showings cached in two
+        overlapping chunks are returned once.
+        """
+        match = to_match_query(text)
+        if match is None:
+            return []
+        sql = """
+            SELECT p.guide_number, p.guide_name, p.start_time, p.end_time, p.title, p.episode_title, p.synopsis
+            FROM search_fts JOIN search_programmes p ON p.id = search_fts.rowid
+            WHERE search_fts MATCH ? AND p.end_time > ?
+        """
+        params: List[Any] = [match, after]
+        if channels:
+            sql += f" AND p.guide_number IN ({', '.join('?' * len(channels))})"
+            params.extend(channels)
+        sql += " GROUP BY p.guide_number, p.start_time ORDER BY p.start_time LIMIT ?"
+        params.append(limit)
+
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        fields = (
+            "GuideNumber",
+            "GuideName",
+            "StartTime",
+            "EndTime",
+            "Title",
+            "EpisodeTitle",
+            "Synopsis",
+        )
+        return [dict(zip(fields, row)) for row in rows]
@@ -0,0 +1,149 @@
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import tarfile
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, Optional
+
+from .cache import CacheManager, process_owner
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+# Chunk data is stored as cached, gzipped JSON; the member's mtime is fetched_at
+_CHUNK_NAME = re.compile(r"chunks/(\d+)-(\d+)\.json\.gz")
+
+
+class SnapshotError(Exception):
+    """The snapshot is not one this version can read."""
+
+
+def export_snapshot(
+    cache: CacheManager, fileobj: BinaryIO, now: Optional[float] = None
+) -> int:
+    """
+    Write the cache's unexpired chunks to `fileobj` as a tar stream and
+    return how many were written. The compressed chunk data is copied as
+    is, so this is cheap enough to serve to a peer on request. Each chunk
+    is read whole, so a refresh running meanwhile is either in or out.
+    """
+    now = time.time() if now is None else now
+    count = 0
+    with tarfile.open(fileobj=fileobj, mode="w|") as archive:
+        manifest = json.dumps(
+            {
+                "format": SNAPSHOT_FORMAT,
+                "created_at": int(now),
+                "created_by": process_owner(),
+            }
+        ).encode("utf-8")
+        _add_member(archive, MANIFEST_NAME, manifest, now)
+
+        for meta in cache.backend.list_meta():
+            if meta["end_time"] <= now:
+                continue
+            record = cache.backend.get(meta["start_time"])
+            if not record:
+                continue  # Evicted since it was listed
+            name = f"chunks/{record['start_time']}-{record['end_time']}.json.gz"
+            _add_member(archive, name, record["data"], record["fetched_at"])
+            count += 1
+    return count
+
+
+def _add_member(archive: tarfile.TarFile, name: str, data: bytes, mtime) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(mtime)
+    archive.addfile(info, io.BytesIO(data))
+
+
+def import_snapshot(
+    cache: CacheManager, fileobj: BinaryIO, now: Optional[float] = None
+) -> Dict[str, int]:
+    """
+    Load chunks from a snapshot into the cache, keeping when they were
+    fetched. Chunks that expired or that the cache already has in the same
+    or a newer version are skipped, so importing is safe on a warm cache.
+    Raises SnapshotError if the stream is not a snapshot.
+    """
+    now = time.time() if now is None else now
+    local = {
+        meta["start_time"]: meta["fetched_at"] for meta in cache.backend.list_meta()
+    }
+    result = {"imported": 0, "skipped": 0}
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|") as archive:
+            members = iter(archive)
+            first = next(members, None)
+            if first is None or first.name != MANIFEST_NAME:
+                raise SnapshotError("missing manifest")
+            manifest = json.loads(archive.extractfile(first).read())
+            if manifest.get("format") != SNAPSHOT_FORMAT:
+                raise SnapshotError(f"unsupported format {manifest.get('format')}")
+
+            for member in members:
+                match = _CHUNK_NAME.fullmatch(member.name)
+                if not member.isfile() or not match:
+                    continue
+                start_time, end_time = int(match[1]), int(match[2])
+                if end_time <= now or local.get(start_time, -1) >= member.mtime:
+                    result["skipped"] += 1
+                    continue
+                data = json.loads(gzip.decompress(archive.extractfile(member).read()))
+                cache.save_chunk(start_time, end_time, data, fetched_at=member.mtime)
+                result["imported"] += 1
+    except (tarfile.TarError, OSError, ValueError) as e:
+        raise SnapshotError(f"unreadable snapshot: {e}")
+    return result
+
+
+@contextmanager
+def open_source(source: str) -> Iterator[BinaryIO]:
+    """A snapshot file path, or the URL of a peer's GET /snapshot, as a stream."""
+    if source.startswith(("http://", "https://")):
+        import requests
+
+        with requests.get(source, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            yield response.raw
+    else:
+        with open(source, "rb") as f:
+            yield f
+
+
+def load_snapshot(cache: CacheManager, source: str) -> Dict[str, int]:
+    """Import the snapshot at `source`, a path or URL."""
+    started = time.monotonic()
+    with open_source(source) as stream:
+        result = import_snapshot(cache, stream)
+    logger.info(
+        f"📦 Imported {result['imported']} chunks from {source} "
+        f"({result['skipped']} skipped) in {time.monotonic() - started:.1f}s"
+    )
+    return result
+
+
+def save_snapshot(cache: CacheManager, path: str) -> int:
+    """Export a snapshot to `path`, replacing it atomically."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            count = export_snapshot(cache, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    logger.info(f"📦 Exported {count} chunks to {path}")
+    return count
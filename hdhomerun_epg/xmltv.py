@@ -1,27 +1,110 @@
 import datetime
+import functools
+import itertools
 import xml.etree.ElementTree as ET
 import logging
+import os
 import pytz
-from typing import Dict, Any
-from tzlocal import get_localzone
+import tempfile
+import threading
+from typing import Dict, Any, Iterable, List, Optional, TextIO
+from .images import proxy_url
+from .profiling import phase
 
 logger = logging.getLogger(__name__)
 
-# Initialize local timezone
-try:
-    LOCAL_TZ = get_localzone()
-except Exception as e:
-    logger.warning(f"Could not detect local timezone: {e}. Falling back to UTC.")
-    LOCAL_TZ = pytz.UTC
+
+@functools.lru_cache(maxsize=None)
+def get_local_tz():
+    """Detect the local timezone on first use rather than at import time."""
+    from tzlocal import get_localzone
+
+    try:
+        return get_localzone()
+    except Exception as e:
+        logger.warning(f"Could not detect local timezone: {e}. Falling back to UTC.")
+        return pytz.UTC
+
+
+def __getattr__(name):
+    if name == "LOCAL_TZ":
+        return get_local_tz()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Process pool reused across parallel renders, created on first use. Builds
+# run in server threads, so it is only created or replaced under the lock.
+_render_pool = None
+_render_pool_workers = 0
+_render_pool_lock = threading.Lock()
+
+
+def _get_render_pool(workers: int):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        # A worker process that died leaves the pool broken for good
+        broken = _render_pool is not None and getattr(_render_pool, "_broken", False)
+        if _render_pool is None or _render_pool_workers != workers or broken:
+            if _render_pool is not None:
+                _render_pool.shutdown(wait=False)
+            # spawn: forking a threaded server process is unsafe
+            _render_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            _render_pool_workers = workers
+        return _render_pool
+
+
+def shutdown_render_pool() -> None:
+    """Stop the render pool's worker processes, if it was ever started."""
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False)
+            _render_pool = None
+            _render_pool_workers = 0
+
+
+def _render_programmes(
+    programmes: List[Dict[str, Any]],
+    image_proxy_url: Optional[str] = None,
+    image_proxy_hosts: Iterable[str] = (),
+) -> str:
+    """Render a batch of programmes to serialized <programme> elements."""
+    generator = XMLTVGenerator(
+        image_proxy_url=image_proxy_url, image_proxy_hosts=image_proxy_hosts
+    )
+    for programme in programmes:
+        generator.create_programme(programme)
+    return "".join(ET.tostring(el, encoding="unicode") for el in generator.root)
 
 
 class XMLTVGenerator:
-    def __init__(self, filename: str = "epg.xml"):
+    def __init__(
+        self,
+        filename: str = "epg.xml",
+        image_proxy_url: Optional[str] = None,
+        image_proxy_hosts: Iterable[str] = (),
+    ):
+        """
+        With `image_proxy_url`, the base URL of this service, icons hosted
+        on `image_proxy_hosts` point at its /image proxy instead.
+        """
         self.filename = filename
+        self.image_proxy_url = image_proxy_url
+        self.image_proxy_hosts = frozenset(image_proxy_hosts)
         self.root = ET.Element("tv")
         self.root.set("source-info-name", "HDHomeRun")
         self.root.set("generator-info-name", "HDHomeRunEPG_to_XmlTv_Lib")
 
+    def _icon_src(self, url: str) -> str:
+        if self.image_proxy_url is None:
+            return url
+        return proxy_url(url, self.image_proxy_hosts, self.image_proxy_url)
+
     def create_channel(self, channel_data: Dict[str, Any]) -> None:
         """Create XMLTV channel element."""
         channel_id = channel_data.get("GuideNumber", "")
@@ -33,7 +116,7 @@ class XMLTVGenerator:
             "GuideName", "Unknown"
         )
         if "ImageURL" in channel_data:
-            ET.SubElement(channel, "icon", src=channel_data["ImageURL"])
+            ET.SubElement(channel, "icon", src=self._icon_src(channel_data["ImageURL"]))
 
     def create_programme(self, programme_data: Dict[str, Any]) -> None:
         """Create XMLTV programme element."""
@@ -45,7 +128,7 @@ class XMLTVGenerator:
             start_ts = programme_data["StartTime"]
             start_time = datetime.datetime.fromtimestamp(
                 start_ts, tz=pytz.UTC
-            ).astimezone(LOCAL_TZ)
+            ).astimezone(get_local_tz())
 
             end_ts = programme_data.get("EndTime", start_ts)
             duration = end_ts - start_ts
@@ -78,7 +161,9 @@ class XMLTVGenerator:
                     ET.SubElement(programme, "category", lang="en").text = filter_item
 
             if "ImageURL" in programme_data:
-                ET.SubElement(programme, "icon", src=programme_data["ImageURL"])
+                ET.SubElement(
+                    programme, "icon", src=self._icon_src(programme_data["ImageURL"])
+                )
 
             if "EpisodeNumber" in programme_data:
                 self._add_episode_num(programme, programme_data["EpisodeNumber"])
@@ -133,30 +218,133 @@ class XMLTVGenerator:
                 # Upstream uses: airDate.strftime("%Y%m%d%H%M%S") (without offset)
                 # We will preserve the offset if possible or match upstream simplicity
                 # Let's use the local representation for the XML attribute
-                start_str = air_date_utc.astimezone(LOCAL_TZ).strftime("%Y%m%d%H%M%S")
+                start_str = air_date_utc.astimezone(get_local_tz()).strftime(
+                    "%Y%m%d%H%M%S"
+                )
                 ET.SubElement(programme, "previously-shown").set("start", start_str)
         else:
             # No OriginalAirdate implies it's old (upstream logic)
             ET.SubElement(programme, "previously-shown")
 
-    def generate(self, epg_data: Dict[str, Any]) -> str:
-        """Generate XML content and return as string."""
+    def generate(
+        self, epg_data: Dict[str, Any], workers: int = 0, min_parallel: int = 5000
+    ) -> str:
+        """
+        Generate XML content and return as string.
+        With workers > 1 and at least `min_parallel` programmes, programmes are
+        rendered in a process pool; the output is identical to the serial path.
+
+        Programmes may be an iterator, such as an EPGStream. They are
+        consumed before the channel list is read, so a stream can still be
+        adding channels to it.
+        """
+        programmes = epg_data.get("programmes", [])
+        if workers > 1:
+            programmes = list(programmes)
+            if len(programmes) >= min_parallel:
+                with phase("serialize"):
+                    return self._generate_parallel(
+                        {**epg_data, "programmes": programmes}, workers
+                    )
+
+        # In batches, so pulling from a stream is not timed as serialization
+        programmes = iter(programmes)
+        while batch := list(itertools.islice(programmes, 1000)):
+            with phase("serialize"):
+                for programme in batch:
+                    self.create_programme(programme)
+
+        with phase("serialize"):
+            programme_elements = list(self.root)
+            del self.root[:]
+            for channel in epg_data.get("channels", []):
+                self.create_channel(channel)
+            self.root.extend(programme_elements)
+            return ET.tostring(self.root, encoding="unicode")
+
+    def _generate_parallel(self, epg_data: Dict[str, Any], workers: int) -> str:
+        # Batches are contiguous slices so concatenating the fragments keeps the
+        # input order (and therefore byte-identical output to generate()).
+        programmes = epg_data.get("programmes", [])
+        batch_size = -(-len(programmes) // (workers * 4))
+        batches = [
+            programmes[i : i + batch_size]
+            for i in range(0, len(programmes), batch_size)
+        ]
+        render = functools.partial(
+            _render_programmes,
+            image_proxy_url=self.image_proxy_url,
+            image_proxy_hosts=tuple(self.image_proxy_hosts),
+        )
+        fragments = _get_render_pool(workers).map(render, batches)
+
+        # Channels are few, render them here
+        header = XMLTVGenerator(
+            image_proxy_url=self.image_proxy_url,
+            image_proxy_hosts=self.image_proxy_hosts,
+        )
         for channel in epg_data.get("channels", []):
-            self.create_channel(channel)
+            header.create_channel(channel)
+        channels = "".join(ET.tostring(el, encoding="unicode") for el in header.root)
 
-        for programme in epg_data.get("programmes", []):
-            self.create_programme(programme)
+        # Serialize the empty root for its opening tag with this instance's attributes
+        root = ET.Element(self.root.tag, self.root.attrib)
+        opening = ET.tostring(root, encoding="unicode", short_empty_elements=False)
+        opening = opening[: -len("</tv>")]
+        return opening + channels + "".join(fragments) + "</tv>"
+
+    def write_stream(self, epg_data: Dict[str, Any], fh: TextIO) -> None:
+        """
+        Write the indented document to a text stream one element at a time,
+        so the whole tree is never held in memory.
+        """
+        opening = ET.tostring(
+            ET.Element(self.root.tag, self.root.attrib),
+            encoding="unicode",
+            short_empty_elements=False,
+        )[: -len("</tv>")]
+        fh.write("<?xml version='1.0' encoding='UTF-8'?>\n")
+        written = 0
 
-        return ET.tostring(self.root, encoding="unicode")
+        def flush():
+            nonlocal written
+            for element in self.root:
+                if not written:
+                    fh.write(opening)
+                ET.indent(element, space="\t", level=1)
+                fh.write("\n\t" + ET.tostring(element, encoding="unicode"))
+                written += 1
+            del self.root[:]
 
-    def write_to_file(self, epg_data: Dict[str, Any]) -> None:
-        """Generate and write to file."""
         for channel in epg_data.get("channels", []):
             self.create_channel(channel)
+            flush()
 
         for programme in epg_data.get("programmes", []):
             self.create_programme(programme)
+            flush()
+
+        if written:
+            fh.write("\n</tv>")
+        else:
+            fh.write(ET.tostring(self.root, encoding="unicode"))
 
-        tree = ET.ElementTree(self.root)
-        ET.indent(tree, space="\t", level=0)
-        tree.write(self.filename, encoding="UTF-8", xml_declaration=True)
+    def write_to_file(self, epg_data: Dict[str, Any]) -> None:
+        """
+        Generate and write to file. The document is streamed to a temporary
+        file next to the target and renamed into place, so readers never see
+        a partially written guide.
+        """
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=".epg-", suffix=".xml.tmp", dir=directory
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh, phase("serialize"):
+                self.write_stream(epg_data, fh)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.filename)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
@@ -0,0 +1,92 @@
+"""
+Benchmark the /guide layout step against the whole request on a large lineup.
+
+The cache is seeded with synthetic 30 minute programmes and a fake HDHomeRun
+device answers on localhost, so nothing is fetched upstream. Each run clears
+the rendered fragments, so every card is laid out and rendered again.
+
+Usage: python scripts/bench_guide.py [--channels 150] [--days 7]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Allow running from a checkout without installing the package
+sys.path.insert(0, ROOT)
+
+from bench_workers import seed_cache, start_device  # noqa: E402
+
+
+def time_layout(guide, programmes, window_starts, window_seconds, repeat):
+    """Best time of grouping and laying out every (channel, window) cell."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = guide.group_by_window(programmes, window_starts, window_seconds)
+        for windows in rows.values():
+            for window_start, progs in windows.items():
+                guide.layout_window(progs, window_start)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--channels", type=int, default=150)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "epg_cache.db")
+        device = start_device(seed_cache(db_path, args.channels, args.days))
+        os.environ.update(
+            {
+                "HDHOMERUN_HOST": f"127.0.0.1:{device.server_address[1]}",
+                "HDHOMERUN_CACHE_DB_PATH": db_path,
+                "HDHOMERUN_EPG_DAYS": str(args.days),
+                "HDHOMERUN_SEARCH_ENABLED": "false",
+                "HDHOMERUN_DEBUG_MODE": "off",
+            }
+        )
+        from fastapi.testclient import TestClient
+
+        import app.main
+        from hdhomerun_epg import guide
+        from hdhomerun_epg.cache import plan_chunk_starts
+        from hdhomerun_epg.client import HDHomeRunClient
+
+        window_starts = plan_chunk_starts(args.days, app.main.GUIDE_CHUNK_HOURS)
+        window_seconds = app.main.GUIDE_CHUNK_HOURS * 3600
+        epg_data = HDHomeRunClient(host=app.main.settings.host).fetch_epg_data(
+            days=args.days, hours=app.main.GUIDE_CHUNK_HOURS
+        )
+        programmes = epg_data["programmes"]
+        print(
+            f"{args.channels} channels, {args.days} days, {len(programmes)} programmes"
+        )
+
+        layout = time_layout(
+            guide, programmes, window_starts, window_seconds, args.repeat
+        )
+        print(f"layout pass       {layout * 1000:8.1f}ms")
+
+        client = TestClient(app.main.app)
+        best = None
+        for _ in range(args.repeat):
+            app.main.guide_fragments.clear()
+            breakdown = client.get("/guide", params={"debug": "timing"}).json()
+            if best is None or breakdown["total_ms"] < best["total_ms"]:
+                best = breakdown
+        for name, entry in best["phases"].items():
+            print(f"  {name:<15} {entry['ms']:8.1f}ms")
+        print(f"/guide, cold      {best['total_ms']:8.1f}ms")
+        device.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark serial vs. multiprocess XMLTV rendering on a synthetic lineup.
+
+Usage: python scripts/bench_render.py [--channels 150] [--days 7]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Allow running from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hdhomerun_epg.xmltv import XMLTVGenerator  # noqa: E402
+
+
+def build_epg(channels: int, days: int) -> dict:
+    start = int(time.time()) // 3600 * 3600
+    slots = days * 48  # 30 minute programmes
+    return {
+        "channels": [
+            {"GuideNumber": f"{c}.1", "GuideName": f"Channel {c}", "ImageURL": ""}
+            for c in range(channels)
+        ],
+        "programmes": [
+            {
+                "GuideNumber": f"{c}.1",
+                "StartTime": start + s * 1800,
+                "EndTime": start + (s + 1) * 1800,
+                "Title": f"Programme {s}",
+                "EpisodeTitle": "Episode",
+                "Synopsis": "A synthetic synopsis " * 5,
+                "EpisodeNumber": "S02E05",
+                "Filter": ["Movies", "Drama"],
+                "OriginalAirdate": start - 86400 * 30,
+            }
+            for c in range(channels)
+            for s in range(slots)
+        ],
+    }
+
+
+def time_render(epg_data: dict, workers: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        XMLTVGenerator().generate(epg_data, workers=workers, min_parallel=1)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--channels", type=int, default=150)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    epg_data = build_epg(args.channels, args.days)
+    cores = os.cpu_count() or 1
+    print(
+        f"{len(epg_data['programmes'])} programmes, {args.channels} channels, {cores} cores"
+    )
+
+    serial = time_render(epg_data, workers=0, repeat=args.repeat)
+    print(f"serial      {serial:7.3f}s")
+    workers = 2
+    while workers <= cores:
+        # Warm the pool so process start-up is not counted
+        time_render(epg_data, workers=workers, repeat=1)
+        elapsed = time_render(epg_data, workers=workers, repeat=args.repeat)
+        print(f"workers={workers:<3} {elapsed:7.3f}s  speedup x{serial / elapsed:.2f}")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
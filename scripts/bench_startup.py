@@ -0,0 +1,89 @@
+"""
+Benchmark cold-start cost: module import time in a fresh interpreter and the
+time from launching the server until it answers its first request.
+
+Usage: python scripts/bench_startup.py [--repeat 5] [--port 8765]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = (
+    "hdhomerun_epg",
+    "hdhomerun_epg.config",
+    "hdhomerun_epg.cli",
+    "hdhomerun_epg.client",
+    "app.main",
+)
+
+
+def time_import(module: str, repeat: int) -> float:
+    """Median seconds to import `module` in a fresh interpreter."""
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - started)"
+    )
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def time_first_response(path: str, port: int, repeat: int) -> float:
+    """Median seconds from spawning uvicorn until `path` answers."""
+    url = f"http://127.0.0.1:{port}{path}"
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            while True:
+                try:
+                    urllib.request.urlopen(url, timeout=1).read()
+                    break
+                except OSError:
+                    if server.poll() is not None:
+                        raise RuntimeError("server exited during start-up")
+                    time.sleep(0.01)
+            samples.append(time.perf_counter() - started)
+        finally:
+            server.terminate()
+            server.wait()
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    for module in MODULES:
+        elapsed = time_import(module, args.repeat)
+        print(f"import {module:<22} {elapsed * 1000:8.1f}ms")
+
+    elapsed = time_first_response("/healthcheck", args.port, args.repeat)
+    print(f"first response /healthcheck    {elapsed * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
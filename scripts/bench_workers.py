@@ -0,0 +1,188 @@
+"""
+Benchmark request throughput against the number of uvicorn worker processes.
+
+Each run serves a pre-seeded cache (so nothing is fetched upstream) and a
+fake HDHomeRun device on localhost, with the file-backed render cache shared
+by all workers. Run it on a host with at least as many cores as workers,
+since the load generator needs a core of its own.
+
+Usage: python scripts/bench_workers.py [--workers 1 2 4] [--seconds 10]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Allow running from a checkout without installing the package
+sys.path.insert(0, ROOT)
+
+from hdhomerun_epg.cache import CacheManager, plan_chunk_starts  # noqa: E402
+
+CHUNK_HOURS = 4  # Same grid as /guide, so every endpoint is served from cache
+PATHS = ("/epg.xml", "/epg.xml?hours=12", "/guide")
+
+
+def seed_cache(db_path: str, channels: int, days: int) -> list:
+    lineup = [
+        {"GuideNumber": f"{c}.1", "GuideName": f"Ch {c}"} for c in range(channels)
+    ]
+    cache = CacheManager(db_path)
+    for start in plan_chunk_starts(days + 1, CHUNK_HOURS):
+        end = start + CHUNK_HOURS * 3600
+        cache.save_chunk(
+            start,
+            end,
+            [
+                {
+                    "GuideNumber": ch["GuideNumber"],
+                    "Guide": [
+                        {
+                            "StartTime": t,
+                            "EndTime": t + 1800,
+                            "Title": f"Programme {t // 1800 % 97}",
+                            "Synopsis": "A synthetic synopsis " * 5,
+                        }
+                        for t in range(start, end, 1800)
+                    ],
+                }
+                for ch in lineup
+            ],
+        )
+    return lineup
+
+
+def start_device(lineup: list) -> ThreadingHTTPServer:
+    """Answer discover.json and lineup.json like a tuner would."""
+    bodies = {
+        "/discover.json": json.dumps({"DeviceAuth": "benchmark"}).encode(),
+        "/lineup.json": json.dumps(lineup).encode(),
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = bodies.get(self.path)
+            self.send_response(200 if body else 404)
+            self.send_header("Content-Length", str(len(body or b"")))
+            self.end_headers()
+            self.wfile.write(body or b"")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_load(port: int, seconds: float, concurrency: int) -> list:
+    """Request PATHS round-robin from `concurrency` clients; return latencies."""
+    deadline = time.monotonic() + seconds
+
+    def client(offset: int) -> list:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        latencies = []
+        i = offset
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            conn.request("GET", PATHS[i % len(PATHS)])
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                raise RuntimeError(f"{PATHS[i % len(PATHS)]}: HTTP {response.status}")
+            latencies.append(time.perf_counter() - started)
+            i += 1
+        conn.close()
+        return latencies
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(client, range(concurrency)))
+    return [latency for latencies in results for latency in latencies]
+
+
+def bench(workers: int, env: dict, port: int, seconds: float, concurrency: int):
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/healthcheck").read()
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("server exited during start-up")
+                time.sleep(0.05)
+        # Warm every worker's imports and fragments before measuring
+        run_load(port, 2, concurrency)
+        latencies = run_load(port, seconds, concurrency)
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)]
+    print(
+        f"workers={workers:<3} {len(latencies) / seconds:8.1f} req/s  "
+        f"p50 {statistics.median(latencies) * 1000:7.1f}ms  p95 {p95 * 1000:7.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--days", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "epg_cache.db")
+        device = start_device(seed_cache(db_path, args.channels, args.days))
+        env = {
+            **os.environ,
+            "HDHOMERUN_HOST": f"127.0.0.1:{device.server_address[1]}",
+            "HDHOMERUN_CACHE_DB_PATH": db_path,
+            "HDHOMERUN_EPG_DAYS": str(args.days),
+            "HDHOMERUN_EPG_HOURS": str(CHUNK_HOURS),
+            "HDHOMERUN_RENDER_CACHE_DIR": os.path.join(tmp, "render"),
+            "HDHOMERUN_DEBUG_MODE": "off",
+        }
+        print(
+            f"{args.channels} channels, {args.days} days, "
+            f"{args.concurrency} clients, {os.cpu_count() or 1} cores"
+        )
+        for workers in args.workers:
+            bench(workers, env, args.port, args.seconds, args.concurrency)
+        device.shutdown()
+
+
+if __name__ == "__main__":
+    main()
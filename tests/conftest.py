@@ -1,5 +1,14 @@
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
+
 from hdhomerun_epg.config import settings
+from hdhomerun_epg.delivery import get_publisher
+from hdhomerun_epg.images import get_image_cache
+from hdhomerun_epg.ratelimit import get_upstream_limiter
 
 
 @pytest.fixture
@@ -11,7 +20,268 @@ def mock_settings(monkeypatch):
     return settings
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch, tmp_path):
+    # Keep routes that open the default cache from writing into the checkout
+    monkeypatch.setattr(settings, "cache_db_path", str(tmp_path / "default.db"))
+    import app.main
+    from app.main import guide_fragments, last_good, render_cache
+
+    render_cache.clear()
+    guide_fragments.clear()
+    last_good.clear()
+    monkeypatch.setattr(app.main, "now_next_index", None)
+    monkeypatch.setattr(app.main, "warmup_done", threading.Event())
+    monkeypatch.setattr(app.main, "was_ready", threading.Event())
+    # Every test starts with a full upstream token bucket
+    get_upstream_limiter.cache_clear()
+    monkeypatch.setattr(settings, "image_cache_dir", str(tmp_path / "images"))
+    get_image_cache.cache_clear()
+    get_publisher.cache_clear()
+
+
 @pytest.fixture
 def temp_db_path(tmp_path):
     d = tmp_path / "test_epg_cache.db"
     return str(d)
+
+
+class RedisStandIn(socketserver.ThreadingTCPServer):
+    """
+    Minimal in-process server speaking the Redis protocol, implementing just
+    the commands the cache backends use.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RedisStandInHandler)
+        self.data = {}
+        self.expiry = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def _live(self, key):
+        if key in self.expiry and self.expiry[key] <= time.time():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return self.data.get(key)
+
+    def state(self, key):
+        """What WATCH compares: the key's value and expiry."""
+        return self._live(key), self.expiry.get(key)
+
+    def execute(self, command, args):
+        live = self._live
+        if command in ("PING",):
+            return "PONG"
+        if command in ("CLIENT", "SELECT"):
+            return "OK"
+        if command == "GET":
+            return live(args[0])
+        if command == "SET":
+            key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+            if b"NX" in options and live(key) is not None:
+                return None
+            self.data[key] = value
+            self.expiry.pop(key, None)
+            if b"PX" in options:
+                ttl = int(args[2 + options.index(b"PX") + 1]) / 1000
+                self.expiry[key] = time.time() + ttl
+            return "OK"
+        if command in ("INCR", "INCRBY"):
+            value = int(live(args[0]) or 0) + (int(args[1]) if args[1:] else 1)
+            self.data[args[0]] = str(value).encode()
+            return value
+        if command == "PEXPIRE":
+            if live(args[0]) is None:
+                return 0
+            self.expiry[args[0]] = time.time() + int(args[1]) / 1000
+            return 1
+        if command == "DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if command == "HSET":
+            h = self.data.setdefault(args[0], {})
+            pairs = list(zip(args[1::2], args[2::2]))
+            new = sum(field not in h for field, _ in pairs)
+            h.update(pairs)
+            return new
+        if command == "HMGET":
+            h = live(args[0]) or {}
+            return [h.get(field) for field in args[1:]]
+        if command == "HSTRLEN":
+            return len((live(args[0]) or {}).get(args[1], b""))
+        if command == "SADD":
+            s = self.data.setdefault(args[0], set())
+            new = len(set(args[1:]) - s)
+            s.update(args[1:])
+            return new
+        if command == "SREM":
+            s = live(args[0]) or set()
+            removed = len(s & set(args[1:]))
+            s.difference_update(args[1:])
+            return removed
+        if command == "SMEMBERS":
+            return sorted(live(args[0]) or set())
+        raise ValueError(f"unknown command '{command}'")
+
+
+class _RedisStandInHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _encode(self, value):
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, str):
+            return b"+" + value.encode() + b"\r\n"
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(map(self._encode, value))
+        return b"$%d\r\n" % len(value) + value + b"\r\n"
+
+    def handle(self):
+        queued = None  # Commands buffered between MULTI and EXEC
+        watched = {}  # WATCHed keys and their state when watched
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            command = args[0].decode().upper()
+            if command in ("WATCH", "UNWATCH", "DISCARD"):
+                with self.server.lock:
+                    if command == "WATCH":
+                        watched.update(
+                            (key, self.server.state(key)) for key in args[1:]
+                        )
+                    else:
+                        watched, queued = {}, None
+                self.wfile.write(b"+OK\r\n")
+                continue
+            if command == "MULTI":
+                queued = []
+                self.wfile.write(b"+OK\r\n")
+                continue
+            if queued is not None and command != "EXEC":
+                queued.append((command, args[1:]))
+                self.wfile.write(b"+QUEUED\r\n")
+                continue
+
+            batch = queued if command == "EXEC" else [(command, args[1:])]
+            queued = None
+            with self.server.lock:
+                if command == "EXEC":
+                    # WATCH holds until EXEC, across the reads in between
+                    changed = any(
+                        self.server.state(key) != state
+                        for key, state in watched.items()
+                    )
+                    watched = {}
+                    if changed:
+                        self.wfile.write(b"*-1\r\n")
+                        continue
+                try:
+                    results = [self.server.execute(c, a) for c, a in batch]
+                    reply = self._encode(results if command == "EXEC" else results[0])
+                except ValueError as e:
+                    reply = b"-ERR " + str(e).encode() + b"\r\n"
+            self.wfile.write(reply)
+
+
+@pytest.fixture
+def redis_standin():
+    server = RedisStandIn()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class ImageStandIn(ThreadingHTTPServer):
+    """Local stand-in for the artwork CDN, counting requests per path."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ImageStandInHandler)
+        # path -> (content type, body)
+        self.files = {}
+        self.hits = {}
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class _ImageStandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+        content_type, body = self.server.files.get(self.path, ("text/plain", b""))
+        self.send_response(200 if self.path in self.server.files else 404)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def image_standin(monkeypatch):
+    server = ImageStandIn()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "image_proxy_hosts", "127.0.0.1")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class WebhookStandIn(ThreadingHTTPServer):
+    """Local stand-in for a push consumer, recording what was POSTed."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _WebhookStandInHandler)
+        # (headers, body) per request
+        self.received = []
+        self.status = 200
+
+    def url(self, path="/hook"):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class _WebhookStandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append((dict(self.headers), body))
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def webhook_standin():
+    server = WebhookStandIn()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
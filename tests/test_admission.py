@@ -0,0 +1,44 @@
+import threading
+import time
+
+from hdhomerun_epg.admission import AdmissionGate, LastKnownGood
+
+
+def test_gate_turns_away_builds_over_limit_and_queue():
+    gate = AdmissionGate(limit=1, queue=1)
+    queued = []
+
+    def wait_for_slot():
+        with gate.admit() as admitted:
+            queued.append(admitted)
+
+    with gate.admit() as first:
+        assert first
+        waiter = threading.Thread(target=wait_for_slot)
+        waiter.start()
+        while gate.waiting == 0:
+            time.sleep(0.01)
+        # Slot and queue are both taken
+        with gate.admit() as third:
+            assert not third
+    waiter.join(timeout=5)
+
+    assert queued == [True]
+    assert gate.rejected == 1
+
+
+def test_unlimited_gate_admits_everything():
+    gate = AdmissionGate(limit=0)
+    with gate.admit() as a, gate.admit() as b:
+        assert a and b
+
+
+def test_last_known_good_keeps_newest_variants():
+    store = LastKnownGood(max_entries=2)
+    store.put("a", b"1")
+    store.put("b", b"2")
+    store.put("c", b"3")
+
+    assert store.get("a") is None
+    content, built_at = store.get("c")
+    assert content == b"3" and built_at <= time.time()
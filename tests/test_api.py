@@ -1,3 +1,6 @@
+import time
+
+import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch
 from app.main import app
@@ -67,6 +70,7 @@ def test_tv_guide_endpoint(monkeypatch):
                     "StartTime": now + 60,
                     "EndTime": now + 3660,
                     "Title": "Test Prog",
+                    "Synopsis": "Only loaded when clicked",
                 }
             ],
         }
@@ -78,3 +82,601 @@ def test_tv_guide_endpoint(monkeypatch):
     assert "text/html" in response.headers["content-type"]
     assert "TV Guide" in response.text
     assert "Test Prog" in response.text
+    assert "Only loaded when clicked" not in response.text
+    assert "cdn.tailwindcss.com" not in response.text
+
+
+def test_cache_coverage_endpoint(monkeypatch, temp_db_path):
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    response = client.get("/cache/coverage")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["chunks"] == []
+    assert all(gap["reason"] == "missing" for gap in body["gaps"])
+
+
+def test_epg_filtered_variants_cached_independently(monkeypatch, temp_db_path):
+    from hdhomerun_epg import client as lib_client
+    from hdhomerun_epg.cache import CacheManager
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    monkeypatch.setattr(settings, "epg_days", 1)
+
+    # Warm cache so the data signature is known before fetching
+    cm = CacheManager(temp_db_path)
+    hdhr = lib_client.HDHomeRunClient("test")
+    for start in hdhr.plan_chunks(1, settings.epg_hours):
+        cm.save_chunk(start, start + settings.epg_hours * 3600, [])
+
+    calls = []
+
+    def mock_fetch(self, days, hours, epg_filter=None, fetch_hours=None, **kwargs):
+        calls.append(epg_filter)
+        return {"channels": [], "programmes": []}
+
+    monkeypatch.setattr(lib_client.HDHomeRunClient, "fetch_epg_data", mock_fetch)
+
+    assert client.get("/epg.xml").status_code == 200
+    assert client.get("/epg.xml?channels=5.1,6.1&hours=12").status_code == 200
+    assert client.get("/epg.xml").status_code == 200
+    assert client.get("/epg.xml?channels=6.1,5.1&hours=12").status_code == 200
+
+    assert len(calls) == 2
+    assert calls[1].channels == {"5.1", "6.1"} and calls[1].hours == 12
+
+
+def test_epg_rejects_invalid_guide_number_range():
+    with patch("hdhomerun_epg.client.HDHomeRunClient.fetch_epg_data") as mock_fetch:
+        for params in ("guide_min=abc", "guide_max=5.x", "guide_min=5.1&guide_max=-"):
+            response = client.get(f"/epg.xml?{params}")
+            assert response.status_code == 400
+            assert "Invalid GuideNumber" in response.json()["error"]
+    mock_fetch.assert_not_called()
+
+
+def test_epg_timing_breakdown(monkeypatch):
+    with patch("hdhomerun_epg.client.HDHomeRunClient.fetch_epg_data") as mock_fetch:
+        mock_fetch.return_value = {"channels": [], "programmes": []}
+
+        response = client.get("/epg.xml?debug=timing")
+        assert response.status_code == 200
+        assert "serialize" in response.json()["phases"]
+
+        response = client.get("/epg.xml?debug=1")
+        assert response.headers["content-type"] == "application/xml"
+        assert "serialize;dur=" in response.headers["Server-Timing"]
+
+
+def test_guide_fragments_reused_until_chunks_change(monkeypatch, temp_db_path):
+    import time
+
+    from app.main import GUIDE_CHUNK_HOURS
+    from hdhomerun_epg import client as lib_client
+    from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    monkeypatch.setattr(settings, "epg_days", 1)
+    starts = plan_chunk_starts(1, GUIDE_CHUNK_HOURS)
+    cm = CacheManager(temp_db_path)
+    for start in starts:
+        cm.save_chunk(start, start + GUIDE_CHUNK_HOURS * 3600, [])
+
+    now = int(time.time())
+    title = {"value": "First Title"}
+
+    def mock_fetch(self, days, hours):
+        return {
+            "channels": [{"GuideNumber": "1", "GuideName": "TEST", "ImageURL": ""}],
+            "programmes": [
+                {
+                    "GuideNumber": "1",
+                    "StartTime": now,
+                    "EndTime": now + 1800,
+                    "Title": title["value"],
+                }
+            ],
+        }
+
+    monkeypatch.setattr(lib_client.HDHomeRunClient, "fetch_epg_data", mock_fetch)
+
+    assert "First Title" in client.get("/guide").text
+    # Same chunk versions: the cached fragment is served, not re-rendered
+    title["value"] = "Second Title"
+    assert "First Title" in client.get("/guide").text
+
+    # A refreshed chunk changes the version and the fragment is rebuilt
+    cm.save_chunk(
+        starts[0],
+        starts[0] + GUIDE_CHUNK_HOURS * 3600,
+        [{"GuideNumber": "1", "Guide": [{"StartTime": now, "Title": "New"}]}],
+    )
+    assert "Second Title" in client.get("/guide").text
+
+
+def test_now_next_served_from_index(monkeypatch, temp_db_path):
+    import time
+
+    from app.main import refresh_now_next
+    from hdhomerun_epg import client as lib_client
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    assert client.get("/now-next").status_code == 503
+
+    now = int(time.time())
+    calls = []
+
+    def mock_fetch(self, days, hours, epg_filter=None, fetch_hours=None, **kwargs):
+        calls.append(epg_filter)
+        return {
+            "channels": [{"GuideNumber": "1", "GuideName": "TEST"}],
+            "programmes": [
+                {
+                    "GuideNumber": "1",
+                    "StartTime": now - 60,
+                    "EndTime": now + 60,
+                    "Title": "On",
+                },
+                {
+                    "GuideNumber": "1",
+                    "StartTime": now + 60,
+                    "EndTime": now + 120,
+                    "Title": "Up",
+                },
+            ],
+        }
+
+    monkeypatch.setattr(lib_client.HDHomeRunClient, "fetch_epg_data", mock_fetch)
+    assert refresh_now_next() is True
+    # Unchanged chunks: the index is kept
+    assert refresh_now_next() is False
+    assert len(calls) == 1 and calls[0].hours == settings.now_next_horizon_hours
+
+    body = client.get("/now-next?channels=1").json()
+    assert body["channels"][0]["now"]["Title"] == "On"
+    assert body["channels"][0]["next"]["Title"] == "Up"
+    assert len(calls) == 1
+
+
+def test_search_endpoint(monkeypatch, temp_db_path):
+    import time
+
+    from hdhomerun_epg.cache import CacheManager
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    now = int(time.time())
+    CacheManager.from_settings(settings).save_chunk(
+        now,
+        now + 3600,
+        [
+            {
+                "GuideNumber": "5.1",
+                "Guide": [
+                    {"StartTime": now, "EndTime": now + 1800, "Title": "Quiz Night"}
+                ],
+            }
+        ],
+    )
+
+    body = client.get("/search?q=quiz").json()
+    assert [r["Title"] for r in body["results"]] == ["Quiz Night"]
+    assert client.get("/search?q=quiz&channels=7.1").json()["results"] == []
+
+
+def test_progressive_epg_returns_near_term_and_fills_in_background(monkeypatch):
+    import time
+    from hdhomerun_epg import client as lib_client
+
+    monkeypatch.setattr(settings, "progressive_hours", 6)
+    calls = []
+
+    def mock_fetch(self, days, hours, epg_filter=None, fetch_hours=None, **kwargs):
+        calls.append((fetch_hours, kwargs.get("background", False)))
+        until = int(time.time()) + 6 * 3600
+        return {
+            "channels": [],
+            "programmes": [],
+            "coverage": {"until": until, "end": until + 86400, "complete": False},
+        }
+
+    monkeypatch.setattr(lib_client.HDHomeRunClient, "fetch_epg_data", mock_fetch)
+
+    response = client.get("/epg.xml")
+    assert response.status_code == 200
+    assert response.headers["X-EPG-Complete"] == "false"
+    assert float(response.headers["X-EPG-Coverage-Hours"]) == pytest.approx(6, abs=0.1)
+    # The response only waited for the near term; the rest was fetched
+    # afterwards at background priority
+    assert calls == [(6, False), (None, True)]
+
+
+def test_image_proxy_serves_cached_artwork(image_standin):
+    image_standin.files["/logo.png"] = ("image/png", b"\x89PNG fake")
+    logo = image_standin.url("/logo.png")
+
+    response = client.get("/image", params={"url": logo})
+    assert response.status_code == 200
+    assert response.content == b"\x89PNG fake"
+    assert response.headers["content-type"] == "image/png"
+
+    response = client.get(
+        "/image",
+        params={"url": logo},
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+    assert image_standin.hits["/logo.png"] == 1
+
+    # Not an open proxy
+    response = client.get("/image", params={"url": "http://example.com/x.png"})
+    assert response.status_code == 400
+
+
+def test_image_proxy_redirects_when_cache_fails(image_standin):
+    logo = image_standin.url("/logo.png")
+
+    with patch(
+        "hdhomerun_epg.images.ImageCache.get", side_effect=PermissionError("denied")
+    ):
+        response = client.get("/image", params={"url": logo}, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == logo
+
+
+def test_epg_icons_point_at_image_proxy(image_standin, monkeypatch):
+    logo = image_standin.url("/logo.png")
+    with patch("hdhomerun_epg.client.HDHomeRunClient.fetch_epg_data") as mock_fetch:
+        mock_fetch.return_value = {
+            "channels": [{"GuideNumber": "5.1", "GuideName": "A", "ImageURL": logo}],
+            "programmes": [],
+        }
+        response = client.get("/epg.xml")
+
+    assert 'src="http://testserver/image?url=http%3A%2F%2F127.0.0.1' in response.text
+
+
+def test_static_assets_are_versioned_and_cached():
+    from app.main import static_url
+
+    url = static_url("app.css")
+    assert "?v=" in url and url in client.get("/").text
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert "text/css" in response.headers["content-type"]
+    assert "immutable" in response.headers["cache-control"]
+
+
+def test_templates_only_use_classes_in_stylesheet():
+    import glob
+    import re
+
+    css = open("app/static/app.css", encoding="utf-8").read()
+    defined = {
+        re.sub(r"\\(.)", r"\1", name) for name in re.findall(r"\.((?:\\.|[\w-])+)", css)
+    }
+    # Markers for scripts and group selectors, not styles
+    hooks = {"dark", "group", "group/channel", "channel-row", "guide-track"}
+
+    for path in glob.glob("app/templates/*.html") + ["app/static/guide.js"]:
+        source = open(path, encoding="utf-8").read()
+        # Jinja conditionals inside class attributes are removed first
+        source = re.sub(r"{%.*?%}", " ", source)
+        used = set()
+        for attr in re.findall(r'class(?:Name)?\s*=\s*"([^"]*)"', source):
+            used.update(attr.split())
+        for args in re.findall(r"classList\.(?:add|remove)\(([^)]*)\)", source):
+            used.update(re.findall(r'"([^"]+)"', args))
+        assert used - defined - hooks == set(), path
+
+
+def test_programme_details_loaded_on_demand(monkeypatch, temp_db_path):
+    from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+    from app.main import GUIDE_CHUNK_HOURS
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    window = plan_chunk_starts(settings.epg_days, GUIDE_CHUNK_HOURS)[1]
+    programme = {
+        "StartTime": window + 600,
+        "EndTime": window + 4200,
+        "Title": "Documentary",
+        "Synopsis": "All about owls",
+    }
+    CacheManager(temp_db_path).save_chunk(
+        window,
+        window + GUIDE_CHUNK_HOURS * 3600,
+        [{"GuideNumber": "5.1", "GuideName": "PBS", "Guide": [programme]}],
+    )
+
+    response = client.get(f"/programme/5.1/{window + 600}")
+    assert response.status_code == 200
+    assert response.json()["Synopsis"] == "All about owls"
+    assert response.json()["GuideName"] == "PBS"
+    assert client.get(f"/programme/5.1/{window + 601}").status_code == 404
+
+
+def test_programme_details_without_cache(monkeypatch):
+    from hdhomerun_epg.cache import plan_chunk_starts
+    from hdhomerun_epg.client import HDHomeRunClient
+    from app.main import GUIDE_CHUNK_HOURS
+
+    monkeypatch.setattr(settings, "cache_enabled", False)
+    window = plan_chunk_starts(settings.epg_days, GUIDE_CHUNK_HOURS)[1]
+    chunk = [
+        {
+            "GuideNumber": "5.1",
+            "GuideName": "PBS",
+            "Guide": [{"StartTime": window + 600, "Synopsis": "All about owls"}],
+        }
+    ]
+
+    with patch.object(HDHomeRunClient, "fetch_chunk", return_value=chunk) as fetch:
+        response = client.get(f"/programme/5.1/{window + 600}")
+    assert response.status_code == 200
+    assert response.json()["Synopsis"] == "All about owls"
+    fetch.assert_called_once_with(window, GUIDE_CHUNK_HOURS)
+
+
+def test_snapshot_export_and_import(monkeypatch, tmp_path):
+    import time
+
+    from hdhomerun_epg.cache import CacheManager
+
+    now = int(time.time())
+    source_db = str(tmp_path / "source.db")
+    data = [{"GuideNumber": "5.1", "Guide": [{"Title": "Warm", "StartTime": now}]}]
+    CacheManager(source_db).save_chunk(now, now + 3600, data)
+
+    monkeypatch.setattr(settings, "cache_db_path", source_db)
+    response = client.get("/snapshot")
+    assert response.status_code == 200
+    assert response.headers["x-snapshot-chunks"] == "1"
+
+    target_db = str(tmp_path / "target.db")
+    monkeypatch.setattr(settings, "cache_db_path", target_db)
+    result = client.post("/snapshot", content=response.content).json()
+    assert result["imported"] == 1
+    assert CacheManager(target_db).get_chunk(now) == data
+
+    assert client.post("/snapshot", content=b"garbage").status_code == 400
+
+
+def test_overloaded_epg_serves_last_good_or_503(monkeypatch):
+    import app.main
+    from hdhomerun_epg import client as lib_client
+    from hdhomerun_epg.admission import AdmissionGate
+
+    monkeypatch.setattr(settings, "cache_enabled", False)
+    monkeypatch.setattr(app.main, "build_gate", AdmissionGate(limit=1))
+
+    def mock_fetch(self, days, hours, epg_filter=None, **kwargs):
+        return {
+            "channels": [{"GuideNumber": "5.1", "GuideName": "Five"}],
+            "programmes": [],
+        }
+
+    monkeypatch.setattr(lib_client.HDHomeRunClient, "fetch_epg_data", mock_fetch)
+
+    # Another build holds the only slot
+    with app.main.build_gate.admit():
+        response = client.get("/epg.xml")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "10"
+
+    fresh = client.get("/epg.xml")
+    assert fresh.status_code == 200 and "x-epg-fallback" not in fresh.headers
+
+    with app.main.build_gate.admit():
+        response = client.get("/epg.xml")
+        assert response.status_code == 200
+        assert response.content == fresh.content
+        assert response.headers["x-epg-fallback"] == "overloaded"
+        assert int(response.headers["age"]) >= 0
+        # Other variants have no fallback of their own
+        assert client.get("/epg.xml?hours=6").status_code == 503
+
+
+def test_ready_waits_for_warm_up(monkeypatch):
+    import app.main
+    from hdhomerun_epg import client as lib_client
+
+    monkeypatch.setattr(settings, "cache_enabled", False)
+    monkeypatch.setattr(lib_client, "lineup_fetched_at", None)
+
+    def mock_fetch(self, days, hours, epg_filter=None, **kwargs):
+        lib_client.lineup_fetched_at = time.time()
+        return {
+            "channels": [{"GuideNumber": "5.1", "GuideName": "Five"}],
+            "programmes": [],
+        }
+
+    monkeypatch.setattr(lib_client.HDHomeRunClient, "fetch_epg_data", mock_fetch)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    checks = response.json()["checks"]
+    assert not any(check["ok"] for check in checks.values())
+
+    app.main.warm_up()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+
+
+def test_ready_requires_cached_guide_hours(monkeypatch):
+    import app.main
+    from hdhomerun_epg import client as lib_client
+    from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+
+    monkeypatch.setattr(settings, "epg_days", 1)
+    monkeypatch.setattr(settings, "epg_hours", 4)
+    monkeypatch.setattr(settings, "readiness_min_hours", 13)
+    monkeypatch.setattr(settings, "readiness_keep_hours", 5)
+    monkeypatch.setattr(lib_client, "lineup_fetched_at", time.time())
+    app.main.warmup_done.set()
+    app.main.last_good.put(("epg.xml",), b"<tv/>")
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["coverage"]["ok"] is False
+
+    cache = CacheManager(settings.cache_db_path)
+    start_times = plan_chunk_starts(1, 4)
+    for start in start_times:
+        cache.save_chunk(start, start + 4 * 3600, [])
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["checks"]["coverage"]["complete"] is True
+
+    # Once ready, 8 to 12 hours left is enough (hysteresis), under 4 is not
+    cache.backend.delete(start_times[3:])
+    assert client.get("/ready").status_code == 200
+    cache.backend.delete(start_times[1:])
+    assert client.get("/ready").status_code == 503
+
+    # Having dropped out, the worker needs the full 13 hours again
+    for start in start_times[1:3]:
+        cache.save_chunk(start, start + 4 * 3600, [])
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["coverage"]["min_hours"] == 13
+
+
+def test_history_window(monkeypatch, tmp_path):
+    from hdhomerun_epg.cache import CacheManager
+
+    monkeypatch.setattr(settings, "archive_dir", str(tmp_path / "archive"))
+    now = int(time.time())
+    data = [
+        {
+            "GuideNumber": "5.1",
+            "Guide": [{"Title": "Earlier", "StartTime": now - 7200, "EndTime": now}],
+        }
+    ]
+    cache = CacheManager.from_settings(settings)
+    cache.save_chunk(now - 7200, now - 3600, data)
+    cache.enforce_retention(retention_seconds=0)
+
+    response = client.get("/history", params={"start": now - 10800, "end": now})
+    assert [p["Title"] for p in response.json()["programmes"]] == ["Earlier"]
+    assert client.get("/history", params={"start": now, "end": now}).status_code == 400
+
+
+def test_push_epg_delivers_changed_guide_only(monkeypatch, tmp_path):
+    import app.main
+    from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+
+    target = tmp_path / "pushed.xml"
+    monkeypatch.setattr(settings, "push_sinks", str(target))
+    monkeypatch.setattr(settings, "epg_days", 1)
+    monkeypatch.setattr(settings, "epg_hours", 4)
+    monkeypatch.setattr(settings, "image_proxy_enabled", False)
+    cache = CacheManager(settings.cache_db_path)
+    for start in plan_chunk_starts(1, 4):
+        cache.save_chunk(
+            start,
+            start + 4 * 3600,
+            [
+                {
+                    "GuideNumber": "5.1",
+                    "Guide": [{"Title": "Pushed", "StartTime": start}],
+                }
+            ],
+        )
+    lineup = [{"GuideNumber": "5.1", "GuideName": "Five"}]
+
+    with (
+        patch(
+            "hdhomerun_epg.client.HDHomeRunClient.fetch_channels", return_value=lineup
+        ),
+        patch("hdhomerun_epg.client.HDHomeRunClient.discover_device_auth"),
+    ):
+        assert app.main.push_epg()["pushed"] == 1
+        assert b"Pushed" in target.read_bytes()
+        assert app.main.push_epg()["unchanged"] == 1
+
+
+def test_push_epg_skips_partial_guide(monkeypatch, tmp_path):
+    import app.main
+    from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+
+    target = tmp_path / "pushed.xml"
+    monkeypatch.setattr(settings, "push_sinks", str(target))
+    monkeypatch.setattr(settings, "epg_days", 1)
+    monkeypatch.setattr(settings, "epg_hours", 4)
+    monkeypatch.setattr(settings, "progressive_hours", 4)
+    monkeypatch.setattr(settings, "image_proxy_enabled", False)
+    # The horizon fill is running in another worker
+    monkeypatch.setattr(app.main, "fill_epg_horizon", lambda: None)
+    start = plan_chunk_starts(1, 4)[0]
+    CacheManager(settings.cache_db_path).save_chunk(
+        start,
+        start + 4 * 3600,
+        [{"GuideNumber": "5.1", "Guide": [{"Title": "Near", "StartTime": start}]}],
+    )
+    lineup = [{"GuideNumber": "5.1", "GuideName": "Five"}]
+
+    with (
+        patch(
+            "hdhomerun_epg.client.HDHomeRunClient.fetch_channels", return_value=lineup
+        ),
+        patch("hdhomerun_epg.client.HDHomeRunClient.discover_device_auth"),
+    ):
+        assert app.main.push_epg() is None
+    assert not target.exists()
+
+
+def test_each_replica_indexes_a_shared_cache_for_search(monkeypatch, redis_standin):
+    import app.main
+    from hdhomerun_epg.backends import RedisBackend
+    from hdhomerun_epg.cache import CacheManager
+
+    monkeypatch.setattr(settings, "cache_backend", "redis")
+    monkeypatch.setattr(settings, "cache_redis_url", redis_standin.url)
+    now = int(time.time())
+    # Saved by another replica, into its own search index
+    CacheManager(backend=RedisBackend(redis_standin.url)).save_chunk(
+        now,
+        now + 3600,
+        [
+            {
+                "GuideNumber": "5.1",
+                "Guide": [{"StartTime": now, "EndTime": now + 1800, "Title": "Quiz"}],
+            }
+        ],
+    )
+    assert client.get("/search?q=quiz").json()["results"] == []
+
+    # Maintenance is left to the role holder, search indexing is not
+    assert CacheManager.from_settings(settings).search_is_local
+    app.main.sync_local_search()
+    assert [r["Title"] for r in client.get("/search?q=quiz").json()["results"]] == [
+        "Quiz"
+    ]
+
+
+def test_render_cache_keys_on_versions_read_before_fetching(monkeypatch):
+    import app.main
+    from hdhomerun_epg import client as lib_client
+    from hdhomerun_epg.cache import CacheManager, plan_chunk_starts
+
+    monkeypatch.setattr(settings, "epg_days", 1)
+    monkeypatch.setattr(settings, "epg_hours", 4)
+    monkeypatch.setattr(settings, "image_proxy_enabled", False)
+    cache = CacheManager(settings.cache_db_path)
+    start_times = plan_chunk_starts(1, 4)
+    for start in start_times:
+        cache.save_chunk(start, start + 4 * 3600, [])
+    before = cache.get_signature(start_times, settings.cache_ttl_seconds)
+
+    def mock_fetch(self, days, hours, epg_filter=None, **kwargs):
+        # Another worker refreshes a chunk while this render is under way
+        cache.save_chunk(start_times[0], start_times[0] + 4 * 3600, [{"a": 1}])
+        return {"channels": [], "programmes": []}
+
+    monkeypatch.setattr(lib_client.HDHomeRunClient, "fetch_epg_data", mock_fetch)
+    assert client.get("/epg.xml").status_code == 200
+
+    after = cache.get_signature(start_times, settings.cache_ttl_seconds)
+    variant = (app.main.EPGFilter().cache_key(), "")
+    assert app.main.render_cache.get((*variant, before)) is not None
+    assert app.main.render_cache.get((*variant, after)) is None
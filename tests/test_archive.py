@@ -0,0 +1,52 @@
+import time
+
+from hdhomerun_epg.archive import GuideArchive, day_of
+from hdhomerun_epg.cache import CacheManager
+
+DAY = 86400
+
+
+def _chunk(title, start, guide_number="5.1"):
+    return [
+        {
+            "GuideNumber": guide_number,
+            "GuideName": "Five",
+            "Guide": [{"Title": title, "StartTime": start, "EndTime": start + 1800}],
+        }
+    ]
+
+
+def test_retention_moves_past_chunks_to_daily_archive(tmp_path):
+    archive = GuideArchive(str(tmp_path / "archive"))
+    cm = CacheManager(str(tmp_path / "cache.db"), archive=archive)
+    now = int(time.time())
+    old = now - 3 * DAY
+    cm.save_chunk(old, old + 3600, _chunk("Old", old))
+    cm.save_chunk(now - 7200, now - 3600, _chunk("Recent", now - 7200))
+    cm.save_chunk(now, now + 3600, _chunk("Now", now))
+
+    assert cm.enforce_retention(retention_seconds=1800) == 2
+    assert [c["start_time"] for c in cm.get_status()] == [now]
+    assert archive.days() == sorted({day_of(old), day_of(now - 7200)})
+
+    history = cm.get_history(old - 60, now + 60)
+    assert [p["Title"] for p in history] == ["Old", "Recent", "Now"]
+    assert history[0]["GuideNumber"] == "5.1" and history[0]["GuideName"] == "Five"
+    assert cm.get_history(old - 60, now + 60, channels=["7.1"]) == []
+
+    # Archiving is append-only: a chunk archived again keeps its first copy
+    assert archive.append([{**cm.backend.get(now), "start_time": old}]) == 0
+    assert [p["Title"] for p in cm.get_history(old, old + 60)] == ["Old"]
+
+
+def test_prune_drops_whole_days(tmp_path):
+    archive = GuideArchive(str(tmp_path), retention_days=2)
+    now = int(time.time())
+    cm = CacheManager(str(tmp_path / "cache.db"))
+    for age in (5, 3, 1):
+        start = now - age * DAY
+        cm.save_chunk(start, start + 3600, _chunk("Past", start))
+        archive.append([cm.backend.get(start)])
+
+    assert archive.prune(now) == 2
+    assert archive.days() == [day_of(now - DAY)]
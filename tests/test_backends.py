@@ -0,0 +1,181 @@
+import time
+import pytest
+from hdhomerun_epg.backends import RedisBackend, SQLiteBackend
+from hdhomerun_epg.cache import CacheManager
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backend(request, temp_db_path):
+    if request.param == "sqlite":
+        return SQLiteBackend(temp_db_path)
+    standin = request.getfixturevalue("redis_standin")
+    return RedisBackend(standin.url, prefix="test:")
+
+
+def test_backend_roundtrip(backend):
+    cm = CacheManager(backend=backend)
+    data = [{"GuideNumber": "1.1", "Guide": [{"StartTime": 0, "EndTime": 10}]}]
+    cm.save_chunk(0, 10, data)
+
+    assert cm.get_chunk(0, ttl_seconds=3600) == data
+    assert cm.get_coverage()[0]["channels"] == {"1.1": 10}
+    assert [c["start_time"] for c in cm.get_status()] == [0]
+
+    cm.clear_cache()
+    assert cm.get_chunk(0) is None
+    assert cm.get_status() == []
+
+
+def test_backend_retention(backend):
+    cm = CacheManager(backend=backend)
+    now = int(time.time())
+    cm.save_chunk(now - 7200, now - 3600, [])
+    cm.save_chunk(now, now + 3600, [])
+
+    assert cm.enforce_retention(retention_seconds=60) == 1
+    assert [c["start_time"] for c in cm.get_status()] == [now]
+
+
+def test_change_feed(backend):
+    cm = CacheManager(backend=backend)
+    show = {"StartTime": 0, "EndTime": 10, "Title": "A"}
+    cm.save_chunk(0, 10, [{"GuideNumber": "1.1", "Guide": [show]}])
+    version = cm.get_versions([0])[0]
+
+    # Identical refresh: no change recorded, version kept
+    cm.save_chunk(0, 10, [{"GuideNumber": "1.1", "Guide": [show]}])
+    assert cm.get_versions([0])[0] == version
+    assert cm.get_changes(since=version)["changes"] == []
+
+    cm.save_chunk(0, 10, [{"GuideNumber": "1.1", "Guide": [{**show, "Title": "B"}]}])
+    feed = cm.get_changes(since=version)
+    assert feed["version"] == cm.get_versions([0])[0] > version
+    assert not feed["truncated"]
+    assert [p["Title"] for p in feed["changes"][0]["modified"]] == ["B"]
+
+
+def test_change_feed_pages_through_limit(backend):
+    cm = CacheManager(backend=backend)
+    for n in range(5):
+        cm.save_chunk(0, 10, [{"GuideNumber": "1.1", "Guide": [{"StartTime": n}]}])
+
+    seen, since = [], 0
+    while True:
+        feed = cm.get_changes(since=since, limit=2)
+        if not feed["changes"]:
+            break
+        assert not feed["truncated"]
+        seen += [change["seq"] for change in feed["changes"]]
+        since = feed["version"]
+    assert seen == [1, 2, 3, 4, 5]
+
+
+def test_refresh_lease_is_exclusive(backend):
+    first = CacheManager(backend=backend)
+    second = CacheManager(backend=backend)
+
+    assert first.acquire_refresh_lease(100, ttl_seconds=30)
+    assert not second.acquire_refresh_lease(100, ttl_seconds=30)
+
+    first.release_refresh_lease(100)
+    assert second.acquire_refresh_lease(100, ttl_seconds=30)
+
+
+def test_lease_renewal_extends_expiry(backend):
+    first = CacheManager(backend=backend)
+    second = CacheManager(backend=backend)
+
+    assert first.acquire_refresh_lease(100, ttl_seconds=0.5)
+    time.sleep(0.3)
+    assert first.acquire_refresh_lease(100, ttl_seconds=0.5)  # Renewal
+    time.sleep(0.3)
+    # Past the first expiry, but within the renewed one
+    assert not second.acquire_refresh_lease(100, ttl_seconds=0.5)
+    time.sleep(0.3)
+    assert second.acquire_refresh_lease(100, ttl_seconds=0.5)
+
+
+def test_role_is_held_by_one_process(backend, monkeypatch):
+    from hdhomerun_epg import cache as cache_module
+
+    cm = CacheManager(backend=backend)
+    monkeypatch.setattr(cache_module, "process_owner", lambda: "worker-1")
+    assert cm.acquire_role("refresher", ttl_seconds=30)
+    assert cm.acquire_role("refresher", ttl_seconds=30)  # Renewal
+
+    monkeypatch.setattr(cache_module, "process_owner", lambda: "worker-2")
+    assert not cm.acquire_role("refresher", ttl_seconds=30)
+
+    monkeypatch.setattr(cache_module, "process_owner", lambda: "worker-1")
+    cm.release_role("refresher")
+    monkeypatch.setattr(cache_module, "process_owner", lambda: "worker-2")
+    assert cm.acquire_role("refresher", ttl_seconds=30)
+
+
+def test_shared_values(backend):
+    assert backend.get_value("push:sink") is None
+    backend.set_value("push:sink", "abc")
+    backend.set_value("push:sink", "def")
+    assert backend.get_value("push:sink") == "def"
+
+
+def test_shared_token_bucket(backend):
+    assert backend.take_token("upstream", rate_per_second=1, burst=2) == 0
+    assert backend.take_token("upstream", rate_per_second=1, burst=2) == 0
+    assert 0.5 < backend.take_token("upstream", rate_per_second=1, burst=2) <= 1
+    assert backend.take_token("other", rate_per_second=1, burst=2) == 0
+
+
+def test_counter_is_created_with_expiry(backend):
+    assert backend.incr_counter("budget", ttl_seconds=60) == 1
+    assert backend.incr_counter("budget", ttl_seconds=60) == 2
+    assert backend.get_counter("budget") == 2
+
+
+def test_redis_counter_never_lacks_expiry(redis_standin):
+    backend = RedisBackend(redis_standin.url, prefix="test:")
+    backend.incr_counter("budget", ttl_seconds=60)
+    value, expires = redis_standin.state(b"test:counter:budget")
+    assert value == b"1" and expires is not None
+
+
+def test_sqlite_uses_wal(temp_db_path):
+    import sqlite3
+
+    SQLiteBackend(temp_db_path)
+    with sqlite3.connect(temp_db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_replicas_share_chunks(redis_standin):
+    writer = CacheManager(backend=RedisBackend(redis_standin.url))
+    reader = CacheManager(backend=RedisBackend(redis_standin.url))
+
+    writer.save_chunk(0, 10, [{"GuideNumber": "2.1", "Guide": []}])
+    assert reader.get_chunk(0, ttl_seconds=3600) == [
+        {"GuideNumber": "2.1", "Guide": []}
+    ]
+
+
+def test_replicas_number_changes_without_gaps(redis_standin):
+    import threading
+
+    def write(replica):
+        cm = CacheManager(backend=RedisBackend(redis_standin.url))
+        for n in range(5):
+            cm.save_chunk(
+                replica,
+                replica + 10,
+                [{"GuideNumber": "1", "Guide": [{"StartTime": n}]}],
+            )
+
+    threads = [threading.Thread(target=write, args=(r,)) for r in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reader = CacheManager(backend=RedisBackend(redis_standin.url))
+    feed = reader.get_changes(since=0)
+    assert [change["seq"] for change in feed["changes"]] == list(range(1, 21))
+    assert max(reader.get_versions([0, 1, 2, 3]).values()) == feed["version"] == 20
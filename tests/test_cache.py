@@ -1,7 +1,7 @@
 import time
 import sqlite3
 import os
-from hdhomerun_epg.cache import CacheManager
+from hdhomerun_epg.cache import CacheManager, chunk_coverage, diff_chunk
 
 
 def test_cache_init(temp_db_path):
@@ -63,3 +63,176 @@ def test_clear_cache(temp_db_path):
     with sqlite3.connect(temp_db_path) as conn:
         cursor = conn.execute("SELECT count(*) FROM epg_chunks")
         assert cursor.fetchone()[0] == 0
+
+
+def test_coverage_index(temp_db_path):
+    cm = CacheManager(temp_db_path)
+    data = [
+        {
+            "GuideNumber": "1.1",
+            "Guide": [
+                {"StartTime": 900, "EndTime": 1500},
+                {"StartTime": 1500, "EndTime": 2100},
+            ],
+        },
+        {"GuideNumber": "2.1", "Guide": [{"StartTime": 1000, "EndTime": 1600}]},
+    ]
+    cm.save_chunk(1000, 2000, data)
+
+    coverage = cm.get_coverage([1000])
+    assert coverage[0]["channels"] == {"1.1": 1000, "2.1": 600}
+
+
+def test_find_gaps(temp_db_path):
+    cm = CacheManager(temp_db_path)
+    full = {"GuideNumber": "1.1", "Guide": [{"StartTime": 1000, "EndTime": 2000}]}
+    cm.save_chunk(1000, 2000, [full, {"GuideNumber": "2.1", "Guide": []}])
+    cm.save_chunk(
+        2000,
+        3000,
+        [{"GuideNumber": "1.1", "Guide": [{"StartTime": 2000, "EndTime": 3000}]}],
+    )
+
+    gaps = cm.find_gaps([1000, 2000, 3000])
+    by_start = {g["start_time"]: g for g in gaps}
+
+    assert by_start[1000]["partial_channels"] == ["2.1"]
+    assert by_start[2000]["missing_channels"] == ["2.1"]
+    assert by_start[3000]["reason"] == "missing"
+
+
+def test_auto_vacuum_incremental(temp_db_path):
+    CacheManager(temp_db_path)
+    with sqlite3.connect(temp_db_path) as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def test_retention_deletes_old_chunks(temp_db_path):
+    cm = CacheManager(temp_db_path)
+    now = int(time.time())
+    cm.save_chunk(now - 7200, now - 3600, [{"a": 1}])
+    cm.save_chunk(now, now + 3600, [{"a": 2}])
+
+    assert cm.enforce_retention(retention_seconds=1800) == 1
+    assert [c["start_time"] for c in cm.get_status()] == [now]
+
+
+def test_size_eviction_prefers_past_lru(temp_db_path):
+    cm = CacheManager(temp_db_path)
+    now = int(time.time())
+    payload = [{"x": str(i) * 100} for i in range(50)]
+    cm.save_chunk(now - 3000, now - 2000, payload)
+    cm.save_chunk(now - 2000, now - 1000, payload)
+    cm.save_chunk(now, now + 1000, payload)
+
+    # The older past chunk was read recently, so the other past chunk goes first
+    with sqlite3.connect(temp_db_path) as conn:
+        conn.execute("UPDATE epg_chunks SET last_accessed = 0")
+    cm.get_chunk(now - 3000)
+
+    size = cm.get_status()[0]["size_bytes"]
+    deleted = cm.enforce_retention(86400, max_bytes=2 * size, policy="lru")
+
+    assert deleted == 1
+    assert [c["start_time"] for c in cm.get_status()] == [now - 3000, now]
+
+
+def test_cache_hits_touch_last_accessed_sparingly(temp_db_path, monkeypatch):
+    cm = CacheManager(temp_db_path)
+    now = int(time.time())
+    cm.save_chunk(now, now + 1000, [])
+    updates = []
+    with monkeypatch.context() as m:
+        m.setattr(cm.backend, "update", lambda *a, **k: updates.append(k))
+        # Saved just now, so reads leave last_accessed alone
+        for _ in range(5):
+            assert cm.get_chunk(now) == []
+    assert updates == []
+
+    with sqlite3.connect(temp_db_path) as conn:
+        conn.execute("UPDATE epg_chunks SET last_accessed = ?", (now - 3600,))
+    cm.get_chunk(now)
+    assert cm.get_status()[0]["last_accessed"] >= now
+
+
+def test_maintenance_reclaims_pages(temp_db_path):
+    cm = CacheManager(temp_db_path)
+    cm.save_chunk(1, 2, [{"x": os.urandom(50000).hex()}])
+    cm.clear_cache()
+
+    result = cm.run_maintenance(retention_seconds=86400)
+    assert result["free_pages"] == 0
+
+
+def test_diff_chunk():
+    old = [
+        {
+            "GuideNumber": "5.1",
+            "Guide": [
+                {"StartTime": 0, "Title": "Kept"},
+                {"StartTime": 10, "Title": "Renamed"},
+                {"StartTime": 20, "Title": "Dropped"},
+            ],
+        }
+    ]
+    new = [
+        {
+            "GuideNumber": "5.1",
+            "Guide": [
+                {"StartTime": 0, "Title": "Kept"},
+                {"StartTime": 10, "Title": "New name"},
+                {"StartTime": 30, "Title": "Added"},
+            ],
+        }
+    ]
+
+    assert diff_chunk(old, new) == {
+        "added": [{"GuideNumber": "5.1", "StartTime": 30, "Title": "Added"}],
+        "removed": [{"GuideNumber": "5.1", "StartTime": 20}],
+        "modified": [{"GuideNumber": "5.1", "StartTime": 10, "Title": "New name"}],
+    }
+
+
+def test_change_feed_reports_trimmed_history(temp_db_path):
+    cm = CacheManager(temp_db_path)
+    cm.save_chunk(0, 10, [{"GuideNumber": "1", "Guide": [{"StartTime": 0}]}])
+    cm.save_chunk(0, 10, [{"GuideNumber": "1", "Guide": [{"StartTime": 5}]}])
+    cm.backend.trim_changes(before=int(time.time()) + 1)
+
+    feed = cm.get_changes(since=0)
+    assert feed == {"version": 2, "truncated": True, "changes": []}
+
+
+def test_failed_chunk_write_records_no_change(temp_db_path):
+    cm = CacheManager(temp_db_path)
+    with sqlite3.connect(temp_db_path) as conn:
+        conn.execute(
+            "CREATE TRIGGER full BEFORE INSERT ON epg_chunks BEGIN SELECT RAISE(ABORT, 'disk full'); END"
+        )
+    cm.save_chunk(0, 10, [{"GuideNumber": "1", "Guide": [{"StartTime": 0}]}])
+
+    assert cm.get_chunk(0) is None
+    assert cm.get_changes(since=0) == {"version": 0, "truncated": False, "changes": []}
+
+
+def test_chunk_coverage_stops_at_first_missing_chunk():
+    starts = [0, 3600, 7200, 10800]
+
+    coverage = chunk_coverage(starts, {0, 3600, 10800}, hours=1)
+    assert coverage == {"until": 7200, "end": 14400, "complete": False}
+
+    coverage = chunk_coverage(starts, starts, hours=1, horizon_end=9000)
+    assert coverage == {"until": 9000, "end": 9000, "complete": True}
+
+
+def test_horizon_coverage_ignores_stale_chunks(temp_db_path):
+    cm = CacheManager(temp_db_path)
+    now = int(time.time())
+    starts = [now, now + 3600, now + 7200]
+    cm.save_chunk(starts[0], starts[1], [])
+    cm.save_chunk(starts[1], starts[2], [], fetched_at=now - 7200)
+    cm.save_chunk(starts[2], starts[2] + 3600, [])
+
+    coverage = cm.get_horizon_coverage(starts, 1, ttl_seconds=3600)
+    assert coverage == {"until": starts[1], "end": now + 10800, "complete": False}
+    assert cm.get_horizon_coverage(starts, 1, ttl_seconds=86400)["complete"]
@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+from hdhomerun_epg import cli
+from hdhomerun_epg.cache import CacheManager
+from hdhomerun_epg.client import EPGStream, HDHomeRunClient
+from hdhomerun_epg.config import settings
+
+
+def _warm_cache(db_path, days, hours):
+    cm = CacheManager(db_path)
+    for start in HDHomeRunClient("test").plan_chunks(days, hours):
+        cm.save_chunk(start, start + hours * 3600, [])
+
+
+def _stream(channels):
+    """A stream over no chunks, listing `channels`."""
+    return lambda *args, **kwargs: EPGStream(
+        HDHomeRunClient("test"), channels, [], 4, None
+    )
+
+
+class _FailingStream:
+    """A stream whose upstream fetch fails before any programme is read."""
+
+    error = None
+    programme_count = 0
+
+    def listed_channels(self):
+        return [{"GuideNumber": "1.1", "GuideName": "C1"}]
+
+    def __iter__(self):
+        self.error = "upstream timed out"
+        return iter(())
+
+
+def test_generate_skips_unchanged_output(tmp_path, monkeypatch, temp_db_path):
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    _warm_cache(temp_db_path, days=1, hours=4)
+    output = str(tmp_path / "epg.xml")
+    channels = [{"GuideNumber": "1.1", "GuideName": "C1"}]
+
+    with patch.object(
+        HDHomeRunClient, "stream_epg_data", side_effect=_stream(channels)
+    ) as mock_fetch:
+        args = ["-o", output, "--days", "1", "--chunk-hours", "4"]
+        assert cli.main(args) == 0
+        assert cli.main(args) == 0
+        assert mock_fetch.call_count == 1
+
+        # A different variant of the document is not considered up to date
+        assert cli.main(args + ["--channels", "1.1"]) == 0
+        assert mock_fetch.call_count == 2
+
+        assert cli.main(args + ["--channels", "1.1", "--force"]) == 0
+        assert mock_fetch.call_count == 3
+
+    assert os.path.exists(output)
+    assert open(output, encoding="utf-8").read().startswith("<?xml")
+
+
+def test_generate_without_warm_cache_always_writes(tmp_path, monkeypatch):
+    output = str(tmp_path / "epg.xml")
+    monkeypatch.setattr(settings, "cache_enabled", False)
+
+    with patch.object(
+        HDHomeRunClient,
+        "stream_epg_data",
+        side_effect=_stream([]),
+    ) as mock_fetch:
+        assert cli.main(["generate", "-o", output]) == 0
+        assert cli.main(["generate", "-o", output]) == 0
+
+    assert mock_fetch.call_count == 2
+    assert not os.path.exists(output + ".version")
+
+
+def test_package_import_is_lazy():
+    code = (
+        "import sys, hdhomerun_epg.cli; "
+        "print(any(m in sys.modules for m in ('requests', 'hdhomerun_epg.client')))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "False"
+
+
+def test_failed_fetch_keeps_existing_output(tmp_path, monkeypatch, temp_db_path):
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    (tmp_path / "out").mkdir()
+    output = tmp_path / "out" / "epg.xml"
+    output.write_text("<tv>good</tv>")
+
+    with patch.object(
+        HDHomeRunClient, "stream_epg_data", side_effect=lambda *a, **k: _FailingStream()
+    ):
+        assert cli.main(["generate", "-o", str(output)]) == 1
+
+    assert output.read_text() == "<tv>good</tv>"
+    assert os.listdir(tmp_path / "out") == ["epg.xml"]
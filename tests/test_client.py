@@ -80,3 +80,204 @@ def test_fetch_epg_integration_logic(temp_db_path, monkeypatch):
 
     # Real integration tests are harder without extensive mocking of time
     # But basic structure is tested via mocks above
+
+
+def test_backfill_gaps_refetches_only_holes(temp_db_path, monkeypatch):
+    from hdhomerun_epg.cache import CacheManager
+    from hdhomerun_epg.config import settings
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    monkeypatch.setattr(settings, "backfill_min_age_seconds", 0)
+
+    client = HDHomeRunClient("1.2.3.4")
+    client.device_auth = "TEST"
+    starts = client.plan_chunks(days=1, hours=12)
+
+    cm = CacheManager(temp_db_path)
+    for start in starts:
+        guide = [{"Title": "Show", "StartTime": start, "EndTime": start + 43200}]
+        channels = [{"GuideNumber": "5.1", "Guide": guide}]
+        if start == starts[0]:
+            channels.append({"GuideNumber": "6.1", "Guide": guide})
+        cm.save_chunk(start, start + 43200, channels)
+
+    with patch("requests.Session") as mock_session_cls:
+        mock_session_cls.return_value.get.return_value.json.return_value = []
+        result = client.backfill_gaps(days=1, hours=12)
+
+    # Only the window missing channel 6.1 is re-requested
+    assert result["refetched"] == starts[1:]
+    assert mock_session_cls.return_value.get.call_count == len(starts) - 1
+
+
+def test_waits_for_chunk_refreshed_by_other_replica(temp_db_path, monkeypatch):
+    from hdhomerun_epg.cache import CacheManager
+    from hdhomerun_epg.config import settings
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    client = HDHomeRunClient("1.2.3.4")
+    client.device_auth = "TEST"
+
+    cache = CacheManager(temp_db_path)
+    other_replica = CacheManager(temp_db_path)
+    assert other_replica.acquire_refresh_lease(1000)
+
+    segment = [{"GuideNumber": "5.1", "Guide": []}]
+    monkeypatch.setattr(
+        cache,
+        "wait_for_chunk",
+        lambda *args: other_replica.save_chunk(1000, 2000, segment) or segment,
+    )
+
+    session = MagicMock()
+    assert client._refresh_segment(session, 1000, 1, cache) == segment
+    session.get.assert_not_called()
+
+
+def test_filter_is_pushed_into_fetch_plan(temp_db_path, monkeypatch):
+    from hdhomerun_epg.config import settings
+    from hdhomerun_epg.filters import EPGFilter
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+
+    client = HDHomeRunClient("1.2.3.4")
+    client.device_auth = "TEST"
+    client.fetch_channels = MagicMock(
+        return_value=[{"GuideNumber": "5.1"}, {"GuideNumber": "6.1"}]
+    )
+
+    with patch("requests.Session") as mock_session_cls:
+        mock_session = mock_session_cls.return_value
+        mock_session.get.return_value.json.return_value = [
+            {"GuideNumber": gn, "Guide": [{"Title": "Show", "StartTime": 0}]}
+            for gn in ("5.1", "6.1")
+        ]
+        epg_data = client.fetch_epg_data(
+            days=4, hours=2, epg_filter=EPGFilter(channels={"6.1"}, hours=3)
+        )
+
+    # Only the chunks covering the next 3 hours are requested: up to three
+    # 2-hour chunks depending on how far into the current chunk we are
+    assert mock_session.get.call_count <= 3
+    assert [ch["GuideNumber"] for ch in epg_data["channels"]] == ["6.1"]
+    assert {p["GuideNumber"] for p in epg_data["programmes"]} == {"6.1"}
+
+
+def test_deferred_chunk_falls_back_to_stale_cache(temp_db_path, monkeypatch):
+    from hdhomerun_epg.cache import CacheManager
+    from hdhomerun_epg.config import settings
+    from hdhomerun_epg.ratelimit import UpstreamDeferred, get_upstream_limiter
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+    monkeypatch.setattr(settings, "cache_ttl_seconds", 0)
+
+    client = HDHomeRunClient("1.2.3.4")
+    client.device_auth = "TEST"
+    client.fetch_channels = MagicMock(return_value=[{"GuideNumber": "5.1"}])
+    start = client.plan_chunks(days=1, hours=24)[0]
+    stale = [{"GuideNumber": "5.1", "Guide": [{"Title": "Old", "StartTime": start}]}]
+    CacheManager(temp_db_path).save_chunk(start, start + 86400, stale)
+
+    limiter = get_upstream_limiter()
+    monkeypatch.setattr(
+        limiter, "acquire", MagicMock(side_effect=UpstreamDeferred("budget"))
+    )
+    with patch("requests.Session") as mock_session_cls:
+        epg_data = client.fetch_epg_data(days=1, hours=24)
+
+    mock_session_cls.return_value.get.assert_not_called()
+    assert [p["Title"] for p in epg_data["programmes"]] == ["Old"]
+
+
+def test_fetch_chunk_without_cache(monkeypatch):
+    from hdhomerun_epg.config import settings
+
+    monkeypatch.setattr(settings, "cache_enabled", False)
+    client = HDHomeRunClient("1.2.3.4")
+    client.device_auth = "TEST"
+    start = client.plan_chunks(days=1, hours=4)[0]
+    chunk = [{"GuideNumber": "5.1", "Guide": [{"StartTime": start}]}]
+
+    with patch("requests.Session") as mock_session_cls:
+        mock_session_cls.return_value.get.return_value.json.return_value = chunk
+        assert client.fetch_chunk(start, 4) == chunk
+
+    url = mock_session_cls.return_value.get.call_args[0][0]
+    assert url.endswith(f"&Start={start}")
+    mock_session_cls.return_value.close.assert_called_once()
+
+
+def test_fetch_hours_serves_far_chunks_from_cache_only(temp_db_path, monkeypatch):
+    from hdhomerun_epg.cache import CacheManager
+    from hdhomerun_epg.config import settings
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+
+    client = HDHomeRunClient("1.2.3.4")
+    client.device_auth = "TEST"
+    client.fetch_channels = MagicMock(return_value=[{"GuideNumber": "5.1"}])
+    starts = client.plan_chunks(days=1, hours=6)
+    # Only the last window is cached; the ones in between are not
+    last = [
+        {"GuideNumber": "5.1", "Guide": [{"Title": "Late", "StartTime": starts[-1]}]}
+    ]
+    CacheManager(temp_db_path).save_chunk(starts[-1], starts[-1] + 6 * 3600, last)
+
+    with patch("requests.Session") as mock_session_cls:
+        mock_session = mock_session_cls.return_value
+        mock_session.get.return_value.json.return_value = [
+            {"GuideNumber": "5.1", "Guide": [{"Title": "Soon", "StartTime": starts[0]}]}
+        ]
+        epg_data = client.fetch_epg_data(days=1, hours=6, fetch_hours=0)
+
+    # Only the window airing now is fetched
+    assert mock_session.get.call_count == 1
+    assert [p["Title"] for p in epg_data["programmes"]] == ["Soon", "Late"]
+    assert epg_data["coverage"]["until"] == starts[1]
+    assert not epg_data["coverage"]["complete"]
+
+
+def test_stream_yields_chunks_and_drops_overlap(temp_db_path, monkeypatch):
+    from hdhomerun_epg.cache import CacheManager
+    from hdhomerun_epg.config import settings
+
+    monkeypatch.setattr(settings, "cache_db_path", temp_db_path)
+
+    client = HDHomeRunClient("1.2.3.4")
+    client.device_auth = "TEST"
+    client.fetch_channels = MagicMock(return_value=[{"GuideNumber": "5.1"}])
+    first, second = client.plan_chunks(days=1, hours=12)[:2]
+    # A programme running across the boundary is listed in both chunks
+    spanning = {"Title": "Film", "StartTime": second - 600, "EndTime": second + 3000}
+    cache = CacheManager(temp_db_path)
+    cache.save_chunk(
+        first,
+        second,
+        [
+            {
+                "GuideNumber": "5.1",
+                "Guide": [{"Title": "News", "StartTime": first}, spanning],
+            }
+        ],
+    )
+    cache.save_chunk(
+        second,
+        second + 12 * 3600,
+        [
+            {
+                "GuideNumber": "5.1",
+                "Guide": [
+                    dict(spanning),
+                    {"Title": "Late", "StartTime": second + 3000},
+                ],
+            }
+        ],
+    )
+
+    with patch("requests.Session"):
+        stream = client.stream_epg_data(days=1, hours=12, fetch_hours=0)
+        titles = [p["Title"] for p in stream]
+
+    assert titles == ["News", "Film", "Late"]
+    assert stream.programme_count == 3
+    assert stream.coverage["complete"]
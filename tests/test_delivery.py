@@ -0,0 +1,74 @@
+import gzip
+import hashlib
+import stat
+
+import pytest
+
+from hdhomerun_epg.cache import CacheManager
+from hdhomerun_epg.delivery import (
+    FileSink,
+    Publisher,
+    WebhookSink,
+    parse_sinks,
+)
+
+
+def test_parse_sinks():
+    sinks = parse_sinks("https://jellyfin:8096/hook, /shared/epg.xml,file:///tmp/x.xml")
+    assert [type(sink) for sink in sinks] == [WebhookSink, FileSink, FileSink]
+    assert sinks[2].path == "/tmp/x.xml"
+    assert parse_sinks("") == []
+    with pytest.raises(ValueError):
+        parse_sinks("ftp://example.com/epg.xml")
+
+
+def test_webhook_gets_gzip_body_once_per_change(webhook_standin):
+    publisher = Publisher([WebhookSink(webhook_standin.url())])
+
+    assert publisher.publish(b"<tv>1</tv>")["pushed"] == 1
+    assert publisher.publish(b"<tv>1</tv>") == {
+        "pushed": 0,
+        "unchanged": 1,
+        "failed": 0,
+    }
+    headers, body = webhook_standin.received[0]
+    assert gzip.decompress(body) == b"<tv>1</tv>"
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["X-EPG-SHA256"] == hashlib.sha256(b"<tv>1</tv>").hexdigest()
+
+    # A failed push is retried on the next publish
+    webhook_standin.status = 500
+    assert publisher.publish(b"<tv>2</tv>")["failed"] == 1
+    webhook_standin.status = 200
+    assert publisher.publish(b"<tv>2</tv>")["pushed"] == 1
+    assert len(webhook_standin.received) == 3
+
+
+def test_file_sink_skips_identical_content_after_restart(tmp_path):
+    path = tmp_path / "epg.xml"
+    assert Publisher([FileSink(str(path))]).publish(b"<tv/>")["pushed"] == 1
+    assert path.read_bytes() == b"<tv/>"
+    mtime = path.stat().st_mtime_ns
+
+    # A new process compares against what the file already holds
+    assert Publisher([FileSink(str(path))]).publish(b"<tv/>")["unchanged"] == 1
+    assert path.stat().st_mtime_ns == mtime
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_file_sink_is_world_readable(tmp_path):
+    path = tmp_path / "epg.xml"
+    FileSink(str(path)).push(b"<tv/>", hashlib.sha256(b"<tv/>").hexdigest())
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+
+
+def test_webhook_not_repushed_when_role_moves(webhook_standin, temp_db_path):
+    # Two workers sharing a cache take turns holding the refresher role
+    first = Publisher([WebhookSink(webhook_standin.url())], CacheManager(temp_db_path))
+    second = Publisher([WebhookSink(webhook_standin.url())], CacheManager(temp_db_path))
+
+    assert first.publish(b"<tv>1</tv>")["pushed"] == 1
+    assert second.publish(b"<tv>1</tv>")["unchanged"] == 1
+    assert second.publish(b"<tv>2</tv>")["pushed"] == 1
+    assert first.publish(b"<tv>2</tv>")["unchanged"] == 1
+    assert len(webhook_standin.received) == 2
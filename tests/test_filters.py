@@ -0,0 +1,40 @@
+import pytest
+
+from hdhomerun_epg.filters import EPGFilter, parse_guide_number
+
+
+def test_parse_guide_number():
+    assert parse_guide_number("5.1") == (5, 1)
+    assert parse_guide_number("10") == (10,)
+    assert parse_guide_number("abc") == ()
+
+
+def test_channel_list_and_favorites():
+    f = EPGFilter(channels=frozenset({"5.1", "7.1"}), favorites_only=True)
+    assert f.matches_channel({"GuideNumber": "5.1", "Favorite": 1})
+    assert not f.matches_channel({"GuideNumber": "5.1"})
+    assert not f.matches_channel({"GuideNumber": "6.1", "Favorite": 1})
+
+
+def test_guide_number_range_is_numeric():
+    f = EPGFilter(guide_min="5.2", guide_max="10.1")
+    assert f.matches_channel({"GuideNumber": "9.1"})
+    assert f.matches_channel({"GuideNumber": "10.1"})
+    assert not f.matches_channel({"GuideNumber": "5.1"})
+    assert not f.matches_channel({"GuideNumber": "100.1"})
+
+
+def test_invalid_guide_number_bounds_are_rejected():
+    with pytest.raises(ValueError):
+        EPGFilter(guide_min="abc")
+    with pytest.raises(ValueError):
+        EPGFilter(guide_max="5.")
+
+
+def test_cache_key_distinguishes_variants():
+    assert EPGFilter().is_empty
+    assert EPGFilter(hours=24).cache_key() != EPGFilter().cache_key()
+    assert (
+        EPGFilter(channels=frozenset({"1", "2"})).cache_key()
+        == EPGFilter(channels=frozenset({"2", "1"})).cache_key()
+    )
@@ -0,0 +1,73 @@
+import datetime
+import time
+
+import pytest
+
+from hdhomerun_epg import guide
+
+WINDOW = 4 * 3600
+STARTS = [0, WINDOW, 2 * WINDOW]
+
+
+def _prog(gn, start, end):
+    return {"GuideNumber": gn, "StartTime": start, "EndTime": end, "Title": "P"}
+
+
+def test_group_by_window_clamps_to_first_and_last_window():
+    programmes = [
+        _prog("1", -3600, 1800),  # already airing
+        _prog("1", -7200, -3600),  # already over
+        _prog("1", WINDOW + 60, WINDOW + 1800),
+        _prog("2", 5 * WINDOW, 5 * WINDOW + 1800),  # past the horizon
+    ]
+    rows = guide.group_by_window(programmes, STARTS, WINDOW)
+
+    assert {k: len(v) for k, v in rows["1"].items()} == {0: 1, WINDOW: 1}
+    assert list(rows["2"]) == [2 * WINDOW]
+
+
+def test_layout_window_is_relative_to_window_start():
+    cards = guide.layout_window(
+        [
+            _prog("1", WINDOW + 3600, WINDOW + 5400),
+            _prog("1", WINDOW - 600, WINDOW + 600),
+        ],
+        WINDOW,
+    )
+
+    # Sorted, clipped to the window and positioned from its start
+    assert [(c.left_px, c.width_px) for c in cards] == [(0, 46), (300, 146)]
+
+
+@pytest.mark.skipif(not hasattr(time, "tzset"), reason="needs time.tzset")
+def test_clock_times_match_local_time_across_dst(monkeypatch):
+    monkeypatch.setenv("TZ", "Europe/Rome")
+    time.tzset()
+    guide.utc_offset.cache_clear()
+    try:
+        # 2023-03-26 00:00 UTC: clocks go from 02:00 to 03:00 an hour later
+        night = 1679788800
+        for timestamps in ([night, night + 1800], [night + 1800, night + 5400]):
+            assert guide.clock_times(timestamps) == [
+                datetime.datetime.fromtimestamp(t).strftime("%H:%M") for t in timestamps
+            ]
+        assert guide.clock_times([night + 3540, night + 3600]) == ["01:59", "03:00"]
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+        guide.utc_offset.cache_clear()
+
+
+def test_fragment_key_follows_chunk_versions():
+    versions = {0: 100, WINDOW: 200}
+
+    assert guide.fragment_key("1", WINDOW, STARTS, WINDOW, versions) == (
+        "1",
+        WINDOW,
+        False,
+        False,
+        (100, 200),
+    )
+    # Unknown chunk versions mean the fragment is not cacheable
+    assert guide.fragment_key("1", 2 * WINDOW, STARTS, WINDOW, versions) is None
+    assert guide.fragment_key("1", 0, STARTS, WINDOW, {0: 1})[4] == (1,)
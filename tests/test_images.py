@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+from hdhomerun_epg.config import settings
+from hdhomerun_epg.images import (
+    ImageCache,
+    ImageProxyError,
+    get_image_cache,
+    proxy_url,
+)
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+def test_proxy_url_rewrites_only_allowed_hosts():
+    hosts = {"img.hdhomerun.com"}
+    logo = "https://img.hdhomerun.com/channels/US1.png"
+
+    assert proxy_url(logo, hosts, "http://epg.lan:8000/", width=96) == (
+        "http://epg.lan:8000/image?url="
+        "https%3A%2F%2Fimg.hdhomerun.com%2Fchannels%2FUS1.png&w=96"
+    )
+    assert proxy_url("https://example.com/a.png", hosts) == "https://example.com/a.png"
+    assert proxy_url("", hosts) == ""
+
+
+def test_image_cache_fetches_each_image_once(tmp_path, image_standin):
+    image_standin.files["/logo.png"] = ("image/png", PNG)
+    image_standin.files["/same-logo.png"] = ("image/png", PNG)
+    cache = ImageCache(str(tmp_path))
+
+    assert cache.get(image_standin.url("/logo.png"))[:2] == (PNG, "image/png")
+    assert cache.get(image_standin.url("/logo.png"))[0] == PNG
+    assert image_standin.hits["/logo.png"] == 1
+
+    # Identical content under another URL is stored once
+    cache.get(image_standin.url("/same-logo.png"))
+    assert len(os.listdir(tmp_path / "blobs")) == 1
+
+
+def test_image_cache_evicts_least_recently_used(tmp_path, image_standin):
+    for name in "abc":
+        image_standin.files[f"/{name}.png"] = ("image/png", PNG + name.encode())
+    cache = ImageCache(str(tmp_path), max_bytes=2 * (len(PNG) + 1))
+
+    cache.get(image_standin.url("/a.png"))
+    cache.get(image_standin.url("/b.png"))
+    # Make "b" the least recently used regardless of timestamp resolution
+    for entry in os.scandir(tmp_path / "blobs"):
+        with open(entry.path, "rb") as f:
+            if f.read().endswith(b"b"):
+                os.utime(entry.path, ns=(0, 0))
+    cache.get(image_standin.url("/c.png"))
+
+    assert cache.size_bytes() <= cache.max_bytes
+    cache.get(image_standin.url("/a.png"))
+    cache.get(image_standin.url("/b.png"))
+    assert image_standin.hits == {"/a.png": 1, "/b.png": 2, "/c.png": 1}
+
+
+def test_unwritable_image_cache_still_serves_images(tmp_path, image_standin):
+    image_standin.files["/logo.png"] = ("image/png", PNG)
+    (tmp_path / "not-a-dir").write_bytes(b"")
+    cache = ImageCache(str(tmp_path / "not-a-dir" / "images"))
+
+    assert cache.get(image_standin.url("/logo.png"))[:2] == (PNG, "image/png")
+    assert cache.get(image_standin.url("/logo.png"))[0] == PNG
+    assert image_standin.hits["/logo.png"] == 2
+
+
+def test_image_cache_defaults_to_cache_db_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "image_cache_dir", "")
+    monkeypatch.setattr(settings, "cache_db_path", str(tmp_path / "epg_cache.db"))
+    get_image_cache.cache_clear()
+
+    assert get_image_cache().directory == str(tmp_path / "image_cache")
+
+
+def test_image_cache_refuses_non_images(tmp_path, image_standin):
+    image_standin.files["/page.html"] = ("text/html", b"<html></html>")
+    cache = ImageCache(str(tmp_path))
+
+    with pytest.raises(ImageProxyError):
+        cache.get(image_standin.url("/page.html"))
+    with pytest.raises(ImageProxyError):
+        cache.get(image_standin.url("/missing.png"))
+
+
+def test_thumbnails_are_resized(tmp_path, image_standin):
+    Image = pytest.importorskip("PIL.Image")
+    import io
+
+    out = io.BytesIO()
+    Image.new("RGB", (800, 400)).save(out, "JPEG")
+    image_standin.files["/art.jpg"] = ("image/jpeg", out.getvalue())
+    cache = ImageCache(str(tmp_path))
+
+    data, content_type, _ = cache.get(image_standin.url("/art.jpg"), width=240)
+    assert content_type == "image/jpeg"
+    assert Image.open(io.BytesIO(data)).size == (240, 120)
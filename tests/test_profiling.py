@@ -0,0 +1,57 @@
+import time
+from hdhomerun_epg import profiling
+
+
+def test_phase_without_recording_is_noop():
+    with profiling.phase("anything"):
+        pass
+
+
+def test_recording_accumulates_phases():
+    with profiling.recording() as recorder:
+        for _ in range(2):
+            with profiling.phase("cache_io"):
+                time.sleep(0.001)
+        with profiling.phase("serialize"):
+            pass
+
+    assert recorder.phases["cache_io"]["count"] == 2
+    assert recorder.phases["cache_io"]["seconds"] > 0
+    assert set(recorder.breakdown()["phases"]) == {"cache_io", "serialize"}
+    header = recorder.server_timing()
+    assert header.startswith("cache_io;dur=")
+    assert "total;dur=" in header
+
+
+def test_profile_written_only_for_slow_blocks(tmp_path):
+    with profiling.profile_if_slow("fast", 10000, str(tmp_path)):
+        pass
+    assert list(tmp_path.iterdir()) == []
+
+    with profiling.profile_if_slow("slow", 1, str(tmp_path)):
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+
+    (profile,) = tmp_path.iterdir()
+    assert profile.name.startswith("slow-")
+    assert "test_profile_written_only_for_slow_blocks" in profile.read_text()
+
+
+def test_cache_write_is_not_counted_as_diff(temp_db_path, monkeypatch):
+    from hdhomerun_epg.cache import CacheManager
+
+    cm = CacheManager(temp_db_path)
+    cm.save_chunk(0, 10, [])
+    update = cm.backend.update
+
+    def slow_update(*args, **kwargs):
+        time.sleep(0.05)
+        update(*args, **kwargs)
+
+    monkeypatch.setattr(cm.backend, "update", slow_update)
+    with profiling.recording() as recorder:
+        cm.save_chunk(0, 10, [])  # Unchanged: only renews fetched_at
+
+    assert recorder.phases["cache_io"]["seconds"] >= 0.05
+    assert recorder.phases["diff"]["seconds"] < 0.05
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from hdhomerun_epg.cache import CacheManager
+from hdhomerun_epg.ratelimit import (
+    PriorityTokenBucket,
+    UpstreamDeferred,
+    UpstreamLimiter,
+)
+
+
+def test_bucket_allows_burst_then_paces():
+    bucket = PriorityTokenBucket(rate_per_second=20, burst=3)
+    assert all(bucket.acquire(0) < 0.01 for _ in range(3))
+    waited = bucket.acquire(0)
+    assert 0.02 < waited < 0.5
+
+
+def test_bucket_serves_highest_priority_first():
+    bucket = PriorityTokenBucket(rate_per_second=20, burst=1)
+    bucket.acquire(0)  # Empty the bucket so everyone below has to queue
+
+    served = []
+
+    def take(priority):
+        bucket.acquire(priority)
+        served.append(priority)
+
+    threads = [threading.Thread(target=take, args=(p,)) for p in (3, 2, 1)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.005)
+    for thread in threads:
+        thread.join()
+
+    assert served == [1, 2, 3]
+
+
+def test_bucket_timeout_defers():
+    bucket = PriorityTokenBucket(rate_per_second=0.1, burst=1)
+    bucket.acquire(0)
+    with pytest.raises(UpstreamDeferred):
+        bucket.acquire(0, timeout=0.05)
+    assert bucket.queued == 0
+
+
+def test_far_horizon_windows_leave_budget_for_near_term(temp_db_path):
+    cache = CacheManager(temp_db_path)
+    limiter = UpstreamLimiter(rate_per_minute=0, daily_budget=5, far_budget_share=0.6)
+    far = int(time.time()) + 3 * 86400
+    near = int(time.time())
+
+    limiter.acquire(far, cache)
+    limiter.acquire(far, cache)
+    limiter.acquire(far, cache)
+    with pytest.raises(UpstreamDeferred):
+        limiter.acquire(far, cache)
+
+    limiter.acquire(near, cache)
+    limiter.acquire(near, cache)
+    with pytest.raises(UpstreamDeferred):
+        limiter.acquire(near, cache)
+
+    # The budget lives in the cache, so another process sees it used up
+    assert UpstreamLimiter(daily_budget=5).budget_used(cache) == 5
+    stats = limiter.stats(cache)
+    assert stats["requests"] == 5
+    assert stats["deferred"] == 2
+
+
+def test_workers_share_one_bucket(temp_db_path):
+    # Two processes' limiters on one cache: the burst is shared, not doubled
+    first = UpstreamLimiter(rate_per_minute=6, burst=2, max_wait_seconds=0.05)
+    second = UpstreamLimiter(rate_per_minute=6, burst=2, max_wait_seconds=0.05)
+    cache = CacheManager(temp_db_path)
+
+    first.acquire(0, cache)
+    second.acquire(0, cache)
+    with pytest.raises(UpstreamDeferred):
+        first.acquire(0, cache)
+    assert second.stats(cache)["tokens"] < 1
@@ -0,0 +1,30 @@
+import os
+
+from hdhomerun_epg.render_cache import FileRenderCache
+
+
+def test_file_render_cache_is_shared_between_instances(tmp_path):
+    # Two instances on one directory stand in for two worker processes
+    first = FileRenderCache(str(tmp_path), max_entries=2)
+    second = FileRenderCache(str(tmp_path), max_entries=2)
+
+    first.put(("channels=;hours=", "sig1"), b"<tv/>")
+    assert second.get(("channels=;hours=", "sig1")) == b"<tv/>"
+    assert second.get(("channels=;hours=", "sig2")) is None
+
+    second.clear()
+    assert first.get(("channels=;hours=", "sig1")) is None
+
+
+def test_file_render_cache_evicts_least_recently_used(tmp_path):
+    cache = FileRenderCache(str(tmp_path), max_entries=2)
+    cache.put("a", b"A")
+    cache.put("b", b"B")
+    # Make "a" the most recently used regardless of timestamp resolution
+    os.utime(cache._path("b"), ns=(0, 0))
+    assert cache.get("a") == b"A"
+    cache.put("c", b"C")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"A" and cache.get("c") == b"C"
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
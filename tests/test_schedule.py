@@ -0,0 +1,53 @@
+from hdhomerun_epg.schedule import ScheduleIndex
+
+
+def _epg():
+    return {
+        "channels": [
+            {"GuideNumber": "1.1", "GuideName": "One"},
+            {"GuideNumber": "2.1", "GuideName": "Two"},
+        ],
+        "programmes": [
+            {"GuideNumber": "1.1", "StartTime": 200, "EndTime": 300, "Title": "C"},
+            {"GuideNumber": "1.1", "StartTime": 0, "EndTime": 100, "Title": "A"},
+            {"GuideNumber": "1.1", "StartTime": 100, "EndTime": 200, "Title": "B"},
+            # Same slot again from an overlapping chunk
+            {"GuideNumber": "1.1", "StartTime": 100, "EndTime": 200, "Title": "B"},
+            {"GuideNumber": "2.1", "StartTime": 150, "EndTime": 250, "Title": "X"},
+        ],
+    }
+
+
+def test_lookup_finds_current_and_next():
+    index = ScheduleIndex(_epg())
+
+    result = index.lookup("1.1", 150)
+    assert result["now"]["Title"] == "B"
+    assert result["next"]["Title"] == "C"
+
+    # Boundaries: a programme starts exactly when the previous one ends
+    assert index.lookup("1.1", 100)["now"]["Title"] == "B"
+    assert index.lookup("1.1", 300) == {"now": None, "next": None}
+
+
+def test_lookup_before_and_between_programmes():
+    index = ScheduleIndex(_epg())
+
+    assert index.lookup("2.1", 50) == {
+        "now": None,
+        "next": {"StartTime": 150, "EndTime": 250, "Title": "X"},
+    }
+    assert index.lookup("9.9", 50) == {"now": None, "next": None}
+
+
+def test_now_next_for_selected_channels():
+    rows = ScheduleIndex(_epg()).now_next(160, ["2.1"])
+
+    assert rows == [
+        {
+            "GuideNumber": "2.1",
+            "GuideName": "Two",
+            "now": {"StartTime": 150, "EndTime": 250, "Title": "X"},
+            "next": None,
+        }
+    ]
@@ -0,0 +1,73 @@
+import time
+
+from hdhomerun_epg.cache import CacheManager
+from hdhomerun_epg.search import SearchIndex, to_match_query
+
+
+def _chunk(*programmes):
+    return [
+        {
+            "GuideNumber": "5.1",
+            "GuideName": "Five",
+            "Guide": [
+                {"StartTime": start, "EndTime": start + 1800, "Title": title, **extra}
+                for start, title, extra in programmes
+            ],
+        }
+    ]
+
+
+def _cache(db_path):
+    return CacheManager(db_path, search=SearchIndex(db_path))
+
+
+def test_to_match_query_quotes_words():
+    assert to_match_query('Star "Trek') == '"Star" "Trek"*'
+    assert to_match_query("  - ") is None
+
+
+def test_search_finds_titles_and_synopses(temp_db_path):
+    now = int(time.time())
+    cm = _cache(temp_db_path)
+    cm.save_chunk(
+        now,
+        now + 7200,
+        _chunk(
+            (now, "Nature Hour", {"Synopsis": "Penguins of Antarctica"}),
+            (now + 3600, "Evening News", {}),
+        ),
+    )
+    # The same showing cached again in an overlapping chunk
+    cm.save_chunk(now + 3600, now + 10800, _chunk((now + 3600, "Evening News", {})))
+
+    assert [r["Title"] for r in cm.search_programmes("penguin")] == ["Nature Hour"]
+    results = cm.search_programmes("news")
+    assert len(results) == 1
+    assert results[0]["GuideName"] == "Five"
+    assert cm.search_programmes("news", channels=["7.1"]) == []
+
+
+def test_refresh_and_eviction_update_index(temp_db_path):
+    now = int(time.time())
+    cm = _cache(temp_db_path)
+    cm.save_chunk(now, now + 3600, _chunk((now, "Old Title", {})))
+    cm.save_chunk(now, now + 3600, _chunk((now, "New Title", {})))
+
+    assert cm.search_programmes("old") == []
+    assert len(cm.search_programmes("new")) == 1
+
+    cm.clear_cache()
+    assert cm.search_programmes("new") == []
+
+
+def test_sync_indexes_chunks_saved_without_search(temp_db_path):
+    now = int(time.time())
+    CacheManager(temp_db_path).save_chunk(
+        now, now + 3600, _chunk((now, "Late Show", {}))
+    )
+    cm = _cache(temp_db_path)
+    assert cm.search_programmes("late") == []
+
+    assert cm.sync_search_index() == 1
+    assert len(cm.search_programmes("late")) == 1
+    assert cm.sync_search_index() == 0
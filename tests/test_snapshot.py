@@ -0,0 +1,43 @@
+import io
+import time
+
+import pytest
+
+from hdhomerun_epg.cache import CacheManager
+from hdhomerun_epg.snapshot import SnapshotError, export_snapshot, import_snapshot
+
+
+def _chunk(title):
+    return [{"GuideNumber": "5.1", "Guide": [{"Title": title, "StartTime": 0}]}]
+
+
+def test_snapshot_round_trip_keeps_fetch_times(tmp_path):
+    source = CacheManager(str(tmp_path / "source.db"))
+    now = int(time.time())
+    source.save_chunk(now, now + 3600, _chunk("Now"), fetched_at=now - 600)
+    source.save_chunk(now + 3600, now + 7200, _chunk("Later"))
+    source.save_chunk(now - 7200, now - 3600, _chunk("Expired"))
+
+    snapshot = io.BytesIO()
+    assert export_snapshot(source, snapshot) == 2
+
+    target = CacheManager(str(tmp_path / "target.db"))
+    snapshot.seek(0)
+    assert import_snapshot(target, snapshot) == {"imported": 2, "skipped": 0}
+    assert target.get_chunk(now) == _chunk("Now")
+    assert target.backend.get(now)["fetched_at"] == now - 600
+    assert target.get_chunk(now - 7200) is None
+
+    # Importing again changes nothing, and neither does an older snapshot
+    snapshot.seek(0)
+    assert import_snapshot(target, snapshot) == {"imported": 0, "skipped": 2}
+    target.save_chunk(now, now + 3600, _chunk("Newer"))
+    snapshot.seek(0)
+    import_snapshot(target, snapshot)
+    assert target.get_chunk(now) == _chunk("Newer")
+
+
+def test_import_rejects_other_files(tmp_path):
+    cache = CacheManager(str(tmp_path / "cache.db"))
+    with pytest.raises(SnapshotError):
+        import_snapshot(cache, io.BytesIO(b"not a snapshot"))
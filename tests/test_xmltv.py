@@ -114,3 +114,116 @@ def test_xmltv_new_logic():
     prog_none = root_none.find("programme")
     assert prog_none.find("new") is None
     assert prog_none.find("previously-shown") is not None
+
+
+def test_parallel_render_is_byte_identical():
+    epg_data = {
+        "channels": [
+            {"GuideNumber": f"{i}.1", "GuideName": f"C{i}", "ImageURL": ""}
+            for i in range(5)
+        ],
+        "programmes": [
+            {
+                "GuideNumber": f"{i % 5}.1",
+                "StartTime": 1700000000 + i * 1800,
+                "EndTime": 1700001800 + i * 1800,
+                "Title": f"Show {i} & <friends>",
+                "EpisodeNumber": "S01E02",
+                "Filter": ["News"],
+            }
+            for i in range(200)
+        ],
+    }
+
+    serial = XMLTVGenerator().generate(epg_data)
+    parallel = XMLTVGenerator().generate(epg_data, workers=2, min_parallel=1)
+
+    assert parallel == serial
+
+
+def test_write_to_file_matches_tree_output(tmp_path):
+    epg_data = {
+        "channels": [{"GuideNumber": "1.1", "GuideName": "C1", "ImageURL": "x"}],
+        "programmes": [
+            {
+                "GuideNumber": "1.1",
+                "StartTime": 1700000000,
+                "EndTime": 1700001800,
+                "Title": "Show",
+                "Filter": ["News", "Talk"],
+            }
+        ],
+    }
+
+    # Reference: build the full tree, indent it and write it in one go
+    reference = XMLTVGenerator()
+    reference.generate(epg_data)
+    tree = ET.ElementTree(reference.root)
+    ET.indent(tree, space="\t", level=0)
+    expected_path = tmp_path / "expected.xml"
+    tree.write(expected_path, encoding="UTF-8", xml_declaration=True)
+
+    output = tmp_path / "epg.xml"
+    XMLTVGenerator(str(output)).write_to_file(epg_data)
+
+    assert output.read_bytes() == expected_path.read_bytes()
+    # Only the final file remains, no temporary leftovers
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["epg.xml", "expected.xml"]
+
+
+def test_local_timezone_comes_from_tzlocal(monkeypatch):
+    import pytz
+    import tzlocal
+    from hdhomerun_epg import xmltv
+
+    monkeypatch.setattr(
+        tzlocal, "get_localzone", lambda: pytz.timezone("America/New_York")
+    )
+    xmltv.get_local_tz.cache_clear()
+    try:
+        assert xmltv.get_local_tz() == pytz.timezone("America/New_York")
+    finally:
+        xmltv.get_local_tz.cache_clear()
+
+
+def test_generate_consumes_programme_iterator():
+    epg_data = {
+        "channels": [{"GuideNumber": "1.1", "GuideName": "C1"}],
+        "programmes": [
+            {
+                "GuideNumber": "1.1",
+                "Title": f"Show {i}",
+                "StartTime": i * 1800,
+                "EndTime": (i + 1) * 1800,
+            }
+            for i in range(2500)
+        ],
+    }
+    expected = XMLTVGenerator().generate(epg_data)
+    streamed = {**epg_data, "programmes": iter(epg_data["programmes"])}
+    assert XMLTVGenerator().generate(streamed) == expected
+
+
+def test_render_pool_is_created_once_across_threads():
+    import threading
+
+    from hdhomerun_epg import xmltv
+
+    xmltv.shutdown_render_pool()
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def get_pool():
+        barrier.wait()
+        pools.append(xmltv._get_render_pool(2))
+
+    threads = [threading.Thread(target=get_pool) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert len(pools) == 8 and len({id(pool) for pool in pools}) == 1
+    finally:
+        xmltv.shutdown_render_pool()
+    assert xmltv._render_pool is None